@@ -1,7 +1,8 @@
 """Application settings and environment configuration."""
 
 import os
-from typing import List, Optional
+import tempfile
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings
 
 
@@ -18,6 +19,97 @@ class Settings(BaseSettings):
     google_api_key: Optional[str] = None
     emergent_llm_key: Optional[str] = None
 
+    # Provider API base URLs (point at scripts/mock_llm_server.py for load tests)
+    openai_base_url: str = "https://api.openai.com/v1"
+    anthropic_base_url: str = "https://api.anthropic.com/v1"
+    gemini_base_url: str = "https://generativelanguage.googleapis.com/v1beta"
+    emergent_base_url: str = "https://api.emergentagent.com/v1"
+
+    # AI HTTP connection pools (shared per provider for the process lifetime)
+    ai_http2: bool = True
+    ai_pool_max_connections: int = 20
+    ai_pool_max_keepalive: int = 10
+    ai_pool_keepalive_expiry: float = 30.0
+
+    # AI routing: "provider:model" candidates, fastest healthy one is used first
+    ai_routes: List[str] = [
+        "openai:gpt-4o",
+        "anthropic:claude-3-5-sonnet-latest",
+        "gemini:gemini-1.5-pro",
+        "emergent:gpt-4o",
+    ]
+    # Reply length cap for turns sent to ai_routes
+    ai_max_tokens: int = 1000
+    ai_route_attempt_timeout: float = 10.0
+    ai_route_total_budget: float = 20.0
+    ai_route_ewma_alpha: float = 0.2
+    ai_route_max_error_rate: float = 0.5
+    # Seconds for an idle route's error rate to halve, so unhealthy routes get retried
+    ai_route_error_half_life: float = 30.0
+    ai_route_hedge_enabled: bool = False
+    ai_route_hedge_min_delay: float = 0.5
+
+    # Per-provider circuit breaker
+    ai_breaker_failure_threshold: int = 5
+    ai_breaker_reset_timeout: float = 30.0
+
+    # Per-provider adaptive concurrency limit and 429 retries
+    ai_concurrency_initial: int = 10
+    ai_concurrency_min: int = 1
+    ai_concurrency_max: int = 50
+    ai_queue_max: int = 100
+    ai_queue_max_wait: float = 5.0
+    ai_retry_max_attempts: int = 2
+    ai_retry_max_delay: float = 5.0
+
+    # Complexity-based model routing ("complexity", or "fixed" to send every turn to ai_routes)
+    ai_routing_policy: str = "complexity"
+    # Fast tier for greetings and short, simple questions
+    ai_routes_simple: List[str] = [
+        "openai:gpt-4o-mini",
+        "anthropic:claude-3-5-haiku-latest",
+        "gemini:gemini-1.5-flash",
+        "emergent:gpt-4o-mini",
+    ]
+    ai_simple_max_tokens: int = 300
+    ai_simple_max_words: int = 25
+    ai_simple_max_history: int = 3
+    # USD per million (input, output) tokens for cost metrics, matched by model-name prefix;
+    # prompt-cache reads and writes are counted at the input price (an upper bound)
+    ai_model_prices: Dict[str, List[float]] = {
+        "gpt-4o-mini": [0.15, 0.6],
+        "gpt-4o": [2.5, 10.0],
+        "claude-3-5-haiku": [0.8, 4.0],
+        "claude-3-5-sonnet": [3.0, 15.0],
+        "gemini-1.5-flash": [0.075, 0.3],
+        "gemini-1.5-pro": [1.25, 5.0],
+    }
+
+    # Exact-match response cache ("memory", or "mongo" to share across workers)
+    response_cache_enabled: bool = True
+    response_cache_backend: str = "memory"
+    response_cache_max_entries: int = 1000
+    response_cache_ttl_seconds: int = 3600
+    response_cache_first_turn_only: bool = True
+
+    # Semantic response cache (needs optional numpy + fastembed packages)
+    semantic_cache_enabled: bool = False
+    semantic_cache_model: str = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+    semantic_cache_threshold: float = 0.92
+    semantic_cache_capacity: int = 5000
+
+    # Service catalog knowledge base (only relevant sections go into the prompt)
+    knowledge_enabled: bool = True
+    # Catalog Markdown file ("" = bundled knowledge/catalog.md)
+    knowledge_catalog_path: str = ""
+    knowledge_top_k: int = 2
+    knowledge_min_score: float = 0.5
+    knowledge_reload_interval: float = 5.0
+
+    # FAQ fast path: short, clear questions answered from the catalog without the LLM
+    faq_enabled: bool = True
+    faq_max_words: int = 12
+
     # Telegram
     telegram_bot_token: Optional[str] = None
     telegram_chat_id: Optional[str] = None
@@ -25,6 +117,9 @@ class Settings(BaseSettings):
     # Sentry (Optional, for error monitoring)
     sentry_dsn: Optional[str] = None
 
+    # Bearer token for /api/metrics (unset = endpoint disabled)
+    metrics_token: Optional[str] = None
+
     # Frontend/CORS
     client_origin_url: str = "http://localhost:3000"
     environment: str = "development"
@@ -33,9 +128,66 @@ class Settings(BaseSettings):
     log_level: str = "INFO"
 
     # AI Chat settings
-    max_context_tokens: int = 3000
+    # Prompt budget: system prompt, catalog sections, history and the current message
+    max_context_tokens: int = 4000
+    # Texts longer than this are tokenized on a worker thread
+    tokenizer_offload_chars: int = 2000
+    tokenizer_warmup_timeout: float = 10.0
+    tokenizer_cache_size: int = 10000
+    # Directory with tiktoken encoding files ("" = bundled memory/encodings)
+    tokenizer_encodings_dir: str = ""
+    # Fail tokenizer warm-up when encoding files are missing instead of downloading them
+    tokenizer_require_bundled: bool = bool(os.getenv("CI"))
+    # Provider tokens per reference-encoding token for models without a public tokenizer
+    tokenizer_estimate_ratios: Dict[str, float] = {"claude": 1.2, "gemini": 1.0}
     max_history_messages: int = 20
+    # End-to-end deadline for a chat turn (context load, LLM, save); also the AI HTTP timeout
     chat_timeout_seconds: int = 30
+    # How often a waiting chat turn checks whether the visitor disconnected
+    chat_disconnect_poll_interval: float = 0.5
+
+    # Admission control: under load, health checks are shed first (cached snapshot),
+    # then chat (canned fallback reply); contact submissions are always admitted
+    admission_enabled: bool = True
+    admission_max_in_flight: int = 100
+    admission_max_loop_lag_ms: float = 250.0
+    # Share of full load at which health checks start being shed
+    admission_low_priority_ratio: float = 0.7
+    admission_lag_interval: float = 0.2
+
+    # Chat history layout: "turns" (document per turn) or "session" (document per session)
+    chat_storage_mode: str = "turns"
+    session_max_turns: int = 50
+
+    # Write-behind buffer: turns are persisted in batches after the reply is sent
+    # (off in serverless functions, where nothing runs between invocations)
+    chat_write_behind_enabled: bool = True
+    chat_write_batch_size: int = 50
+    chat_write_flush_ms: int = 200
+    chat_write_max_pending: int = 5000
+    chat_write_max_retries: int = 3
+    # JSON-lines file for writes that could not be stored ("" = drop them)
+    chat_write_spill_path: str = os.path.join(tempfile.gettempdir(), "chat_write_spill.jsonl")
+    # Running as a serverless function (set by Vercel and AWS Lambda)
+    serverless: bool = bool(os.getenv("VERCEL") or os.getenv("AWS_LAMBDA_FUNCTION_NAME"))
+
+    # Rolling summary of turns that fall out of the context window
+    summary_enabled: bool = True
+    summary_batch_turns: int = 4
+    summary_max_words: int = 150
+
+    # Recall of older turns relevant to the current message (per-session BM25)
+    recall_enabled: bool = True
+    recall_top_k: int = 2
+    recall_max_tokens: int = 600
+    recall_min_score: float = 1.0
+    recall_max_sessions: int = 1000
+    recall_max_turns: int = 200
+
+    # Write-through cache of each session's recent turns
+    context_cache_enabled: bool = True
+    context_cache_max_bytes: int = 32 * 1024 * 1024
+    context_cache_ttl_seconds: int = 300
 
     class Config:
         env_file = ".env"
@@ -2,9 +2,11 @@
 
 import asyncio
 import logging
+import secrets
 from datetime import datetime
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Request
+from typing import Any, Dict, Optional
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from slowapi import Limiter, _rate_limit_exceeded_handler
@@ -15,7 +17,20 @@ from sentry_sdk.integrations.fastapi import FastApiIntegration
 from sentry_sdk.integrations.logging import LoggingIntegration
 
 from config.settings import settings
+from utils.admission import admission
 from utils.database import db_manager
+from utils.ai_clients import ai_registry
+from utils.metrics import metrics
+from utils.prompts import prompts
+from utils.response_cache import MongoCacheBackend, response_cache
+from utils.routing_policy import routing_policy
+from utils.semantic_cache import semantic_cache
+from utils.timing import request_timing
+from memory.context_cache import context_cache
+from memory.recall import session_recall
+from memory.summarizer import summarizer
+from memory.tokenizer import tokenizers
+from memory.write_behind import chat_writer
 from routes import chat, contact
 
 # Configure logging
@@ -56,6 +71,44 @@ async def lifespan(app: FastAPI):
     else:
         # Create indexes for performance
         await db_manager.create_indexes()
+        
+        # Share response cache entries across workers
+        if settings.response_cache_enabled and settings.response_cache_backend == "mongo":
+            await response_cache.attach_shared_backend(MongoCacheBackend(db_manager.db))
+        
+        # Persist chat turns in batches after the reply is sent (serverless
+        # instances may freeze between requests, so they write inline)
+        if settings.chat_write_behind_enabled and not settings.serverless:
+            await chat_writer.start(db_manager.db)
+    
+    # Load the embedding model and reload the semantic cache index
+    if settings.semantic_cache_enabled:
+        await semantic_cache.start(
+            db_manager.db if db_connected else None,
+            scope=chat.cache_scope(),
+        )
+    
+    # Load the routed models' tokenizers now so the first chat request does not
+    # pay for it. If loading is slow, startup continues and it finishes in the background.
+    routed_models = [
+        route.model for router in routing_policy.routers().values() for route in router.routes
+    ]
+    try:
+        await asyncio.wait_for(
+            asyncio.shield(tokenizers.warm_up(routed_models)),
+            settings.tokenizer_warmup_timeout,
+        )
+    except asyncio.TimeoutError:
+        logger.warning("Tokenizer warm-up still running, continuing startup")
+    else:
+        # Prompt overhead per routed model is then known before the first request
+        await prompts.warm_up(routed_models)
+    
+    # Open pooled connections to AI providers
+    ai_registry.start()
+    
+    # Sample event-loop lag for admission control
+    admission.start()
     
     logger.info("Backend startup complete")
     
@@ -63,6 +116,10 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down NeuroExpert backend...")
+    await admission.stop()
+    await summarizer.drain()
+    await chat_writer.stop()
+    await ai_registry.close()
     await db_manager.disconnect()
     logger.info("Backend shutdown complete")
 
@@ -114,21 +171,48 @@ app.add_middleware(
 # Request logging middleware
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    """Log all requests with timing."""
-    start_time = datetime.utcnow()
+    """Log all requests with a per-phase timing breakdown.
+    
+    Phases recorded on the request path (context load, token counting, LLM,
+    DB save, Telegram) are sent back in a ``Server-Timing`` header and
+    logged as structured fields.
+    """
+    with request_timing() as timing:
+        response = await call_next(request)
     
-    response = await call_next(request)
+    response.headers["Server-Timing"] = timing.header()
+    origin = request.headers.get("origin")
+    if origin in allowed_origins:
+        # Lets the frontend origin read the timings (devtools, PerformanceServerTiming)
+        response.headers["Timing-Allow-Origin"] = origin
     
-    process_time = (datetime.utcnow() - start_time).total_seconds()
+    fields = timing.fields()
+    phases = " ".join(f"{name}={ms}ms" for name, ms in fields.items() if name != "total")
     logger.info(
         f"{request.method} {request.url.path} - "
         f"Status: {response.status_code} - "
-        f"Time: {process_time:.3f}s"
+        f"Time: {fields['total'] / 1000:.3f}s"
+        + (f" - {phases}" if phases else ""),
+        extra={
+            "method": request.method,
+            "path": request.url.path,
+            "status": response.status_code,
+            "duration_ms": fields["total"],
+            "timings": fields,
+        },
     )
     
     return response
 
 
+# Admission control middleware (registered last, so it wraps request logging)
+@app.middleware("http")
+async def track_in_flight(request: Request, call_next):
+    """Count in-flight requests for load shedding."""
+    with admission.track():
+        return await call_next(request)
+
+
 # Include routers
 app.include_router(chat.router)
 app.include_router(contact.router)
@@ -147,6 +231,8 @@ async def root():
         "endpoints": {
             "health": "/api/health",
             "chat": "/api/chat",
+            "chat_stream": "/api/chat/stream",
+            "metrics": "/api/metrics",
             "contact": "/api/contact"
         }
     }
@@ -155,8 +241,11 @@ async def root():
 # Health check endpoint
 @app.get("/api/health")
 async def health_check():
-    """Comprehensive health check for all services."""
-    try:
+    """Comprehensive health check for all services.
+    
+    Under load the last report is returned instead of probing the database.
+    """
+    async def build_report() -> Dict[str, Any]:
         # Database health
         db_health = await db_manager.health_check()
         
@@ -171,8 +260,12 @@ async def health_check():
                 "database": db_health,
                 "api": {"status": "healthy"}
             },
+            "admission": admission.snapshot(),
             "version": "3.0.0"
         }
+    
+    try:
+        return await admission.health_report("api", build_report)
     except Exception as e:
         logger.error(f"Health check failed: {e}")
         return JSONResponse(
@@ -185,6 +278,28 @@ async def health_check():
         )
 
 
+def require_metrics_token(authorization: Optional[str] = Header(None)):
+    """Allow only requests bearing ``settings.metrics_token`` (all are refused when unset)."""
+    expected = f"Bearer {settings.metrics_token}" if settings.metrics_token else None
+    if expected is None or not secrets.compare_digest((authorization or "").encode(), expected.encode()):
+        raise HTTPException(status_code=401, detail="Metrics token required")
+
+
+# Metrics endpoint
+@app.get("/api/metrics", dependencies=[Depends(require_metrics_token)])
+async def get_metrics():
+    """In-process counters, gauges and latency histograms (requires the metrics token)."""
+    metrics.set_gauge("response_cache_entries", len(response_cache))
+    metrics.set_gauge("semantic_cache_entries", len(semantic_cache))
+    metrics.set_gauge("context_cache_sessions", len(context_cache))
+    metrics.set_gauge("context_cache_bytes", context_cache.size)
+    metrics.set_gauge("context_recall_sessions", len(session_recall))
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        **metrics.snapshot()
+    }
+
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
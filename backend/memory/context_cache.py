@@ -0,0 +1,154 @@
+"""In-process write-through cache of each session's recent chat turns."""
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from config.settings import settings
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Rough per-turn bookkeeping overhead (dict, keys, ints) on top of the text
+TURN_OVERHEAD_BYTES = 200
+
+
+def turn_size(turn: Dict[str, object]) -> int:
+    """Approximate memory footprint of a cached turn in bytes."""
+    return (
+        len(str(turn.get("user_message", "")).encode("utf-8"))
+        + len(str(turn.get("ai_response", "")).encode("utf-8"))
+        + TURN_OVERHEAD_BYTES
+    )
+
+
+def summary_size(summary: Optional[Dict[str, object]]) -> int:
+    if not summary:
+        return 0
+    return len(str(summary.get("summary", "")).encode("utf-8")) + TURN_OVERHEAD_BYTES
+
+
+class _SessionEntry:
+    """Recent turns of one session, oldest first, and its rolling summary."""
+
+    def __init__(self, turns: List[Dict[str, object]], summary: Optional[Dict[str, object]], expires_at: float):
+        self.turns = turns
+        self.summary = summary
+        self.size = sum(turn_size(turn) for turn in turns) + summary_size(summary)
+        self.expires_at = expires_at
+
+
+class SessionContextCache:
+    """LRU + TTL cache of recent turns per session, bounded in bytes.
+
+    ``get_context`` fills an entry from MongoDB on a miss and
+    ``save_message`` appends to it after each insert (write-through), so a
+    conversation served by one worker skips the history query on every
+    turn after the first. Entries hold at most ``max_turns`` turns and
+    expire after ``ttl_seconds`` to bound staleness when another worker
+    serves the same session.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float, max_turns: int):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.max_turns = max_turns
+        self.size = 0
+        self._entries: "OrderedDict[str, _SessionEntry]" = OrderedDict()
+
+    def _live_entry(self, session_id: str) -> Optional[_SessionEntry]:
+        entry = self._entries.get(session_id)
+        if entry is not None and entry.expires_at < time.monotonic():
+            self._remove(session_id)
+            entry = None
+        return entry
+
+    def get(self, session_id: str) -> Optional[List[Dict[str, object]]]:
+        """Cached recent turns (oldest first), or None on a miss."""
+        entry = self._live_entry(session_id)
+        if entry is None:
+            metrics.increment("context_cache_misses")
+            return None
+        self._entries.move_to_end(session_id)
+        metrics.increment("context_cache_hits")
+        return list(entry.turns)
+
+    def get_summary(self, session_id: str) -> Optional[Dict[str, object]]:
+        """Cached rolling summary of a session (None if not cached)."""
+        entry = self._live_entry(session_id)
+        return entry.summary if entry is not None else None
+
+    def set_summary(self, session_id: str, summary: Dict[str, object]):
+        """Replace the summary of a cached session."""
+        entry = self._entries.get(session_id)
+        if entry is None:
+            return
+        delta = summary_size(summary) - summary_size(entry.summary)
+        entry.summary = summary
+        entry.size += delta
+        self.size += delta
+        self._evict()
+
+    def put(
+        self,
+        session_id: str,
+        turns: List[Dict[str, object]],
+        summary: Optional[Dict[str, object]] = None,
+    ):
+        """Store the recent turns (and summary) loaded from the database."""
+        self._remove(session_id)
+        entry = _SessionEntry(list(turns[-self.max_turns:]), summary, time.monotonic() + self.ttl_seconds)
+        self._entries[session_id] = entry
+        self.size += entry.size
+        self._evict()
+
+    def append(self, session_id: str, turn: Dict[str, object]) -> bool:
+        """Write a new turn through to a cached session.
+
+        Sessions that are not cached are left alone so a partial history is
+        never served; the next read loads them from the database.
+        """
+        entry = self._entries.get(session_id)
+        if entry is None:
+            return False
+        entry.turns.append(turn)
+        entry.size += turn_size(turn)
+        self.size += turn_size(turn)
+        while len(entry.turns) > self.max_turns:
+            dropped = entry.turns.pop(0)
+            entry.size -= turn_size(dropped)
+            self.size -= turn_size(dropped)
+        entry.expires_at = time.monotonic() + self.ttl_seconds
+        self._entries.move_to_end(session_id)
+        self._evict()
+        return True
+
+    def invalidate(self, session_id: str):
+        self._remove(session_id)
+
+    def _remove(self, session_id: str):
+        entry = self._entries.pop(session_id, None)
+        if entry is not None:
+            self.size -= entry.size
+
+    def _evict(self):
+        while self.size > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self.size -= entry.size
+            metrics.increment("context_cache_evictions")
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Global session context cache
+context_cache = SessionContextCache(
+    max_bytes=settings.context_cache_max_bytes,
+    ttl_seconds=settings.context_cache_ttl_seconds,
+    max_turns=settings.max_history_messages,
+)
+
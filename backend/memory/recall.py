@@ -0,0 +1,117 @@
+"""Per-session full-text recall of older turns relevant to the current message."""
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from config.settings import settings
+from utils.bm25 import BM25Index
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def turn_key(turn: Dict[str, Any]) -> Tuple[Any, str]:
+    """Identity of a turn within its session.
+
+    Not its running total: queued turns only get one when they are written.
+    """
+    return turn["timestamp"], turn["user_message"]
+
+
+class _SessionIndex:
+    """BM25 index over a session's turns, keyed by ``turn_key``."""
+
+    def __init__(self, expires_at: float):
+        self.index = BM25Index()
+        self.turns: "OrderedDict[Any, Dict[str, Any]]" = OrderedDict()
+        self.expires_at = expires_at
+
+
+class SessionRecall:
+    """LRU of per-session BM25 indexes used to recall relevant older turns.
+
+    Only the customer's side of each turn is indexed. That is where the facts
+    worth recalling are (business type, budget, deadlines), and the
+    assistant's sales replies would otherwise match almost any question.
+    An index is built from MongoDB the first time a session is read by this
+    worker and then grows as ``save_message`` runs. Each index holds at most
+    ``max_turns`` turns and expires after ``ttl_seconds``, so turns saved by
+    other workers are picked up.
+    """
+
+    def __init__(self, max_sessions: int, max_turns: int, ttl_seconds: float):
+        self.max_sessions = max_sessions
+        self.max_turns = max_turns
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, _SessionIndex]" = OrderedDict()
+
+    def _live(self, session_id: str) -> Optional[_SessionIndex]:
+        entry = self._sessions.get(session_id)
+        if entry is not None and entry.expires_at < time.monotonic():
+            del self._sessions[session_id]
+            entry = None
+        return entry
+
+    def has(self, session_id: str) -> bool:
+        return self._live(session_id) is not None
+
+    def build(self, session_id: str, turns: Iterable[Dict[str, Any]]):
+        """Index a session's stored turns (oldest first), replacing any previous index."""
+        self._sessions.pop(session_id, None)
+        entry = _SessionIndex(time.monotonic() + self.ttl_seconds)
+        self._sessions[session_id] = entry
+        for turn in turns:
+            self._add(entry, turn)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    def add(self, session_id: str, turn: Dict[str, Any]) -> bool:
+        """Index a newly saved turn of a session that is already indexed."""
+        entry = self._live(session_id)
+        if entry is None:
+            return False
+        self._add(entry, turn)
+        self._sessions.move_to_end(session_id)
+        return True
+
+    def _add(self, entry: _SessionIndex, turn: Dict[str, Any]):
+        key = turn_key(turn)
+        entry.index.add(key, turn["user_message"])
+        entry.turns[key] = turn
+        while len(entry.turns) > self.max_turns:
+            oldest, _ = entry.turns.popitem(last=False)
+            entry.index.remove(oldest)
+
+    def search(
+        self,
+        session_id: str,
+        query: str,
+        limit: int,
+        exclude: Iterable[Any] = (),
+        min_score: float = 0.0,
+    ) -> List[Dict[str, Any]]:
+        """Best matching turns (by relevance) whose ``turn_key`` is not in ``exclude``."""
+        entry = self._live(session_id)
+        if entry is None:
+            return []
+        self._sessions.move_to_end(session_id)
+        hits = entry.index.search(query, limit, exclude=exclude, min_score=min_score)
+        metrics.increment("context_recall_searches")
+        if hits:
+            metrics.increment("context_recall_hits", len(hits))
+        return [entry.turns[key] for key, _ in hits]
+
+    def clear(self):
+        self._sessions.clear()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+# Global per-session recall indexes
+session_recall = SessionRecall(
+    max_sessions=settings.recall_max_sessions,
+    max_turns=settings.recall_max_turns,
+    ttl_seconds=settings.context_cache_ttl_seconds,
+)
@@ -0,0 +1,83 @@
+"""Running token totals (``cum_tokens``) of chat_messages turns.
+
+Each turn stores the session's cumulative token count up to and including
+itself, so the context window is a range scan on ``(session_id, cum_tokens)``.
+Totals come from a per-session counter in ``chat_token_counters``, kept
+apart from the ``chat_sessions`` history layout. Totals are assigned when
+turns are written (in the write-behind flush, off the request path), with
+one atomic counter update per session for a whole batch.
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from pymongo import ReturnDocument
+
+# Fields of a turn projected when only its position is needed
+MARKER_PROJECTION = {"_id": 0, "cum_tokens": 1}
+
+# Newest turn first: running total, then timestamp for turns without one
+NEWEST_FIRST = [("cum_tokens", -1), ("timestamp", -1)]
+
+
+async def latest_turn_marker(turns, session_id: str) -> Optional[Dict[str, Any]]:
+    """``cum_tokens`` of the session's newest turn ({} for legacy turns, None if empty).
+
+    Covered by the (session_id, cum_tokens, timestamp) index, so no
+    document is read.
+    """
+    return await turns.find_one({"session_id": session_id}, MARKER_PROJECTION, sort=NEWEST_FIRST)
+
+
+async def assign_cum_tokens(counters, turns, documents: List[Dict[str, Any]]):
+    """Set ``cum_tokens`` on the turn documents (oldest first) that lack it.
+
+    Documents that already have a total (a retried batch) keep it.
+    """
+    by_session: Dict[str, List[Dict[str, Any]]] = {}
+    for document in documents:
+        if document.get("cum_tokens") is None:
+            by_session.setdefault(document["session_id"], []).append(document)
+    await asyncio.gather(*(
+        _reserve(counters, turns, session_id, session_documents)
+        for session_id, session_documents in by_session.items()
+    ))
+
+
+async def _reserve(counters, turns, session_id: str, documents: List[Dict[str, Any]]):
+    """Advance the session's counter by the documents' tokens and number them from it."""
+    tokens = [document["tokens_user"] + document["tokens_ai"] for document in documents]
+    total = await _increment(counters, turns, session_id, sum(tokens))
+    total -= sum(tokens)
+    for document, turn_tokens in zip(documents, tokens):
+        total += turn_tokens
+        document["cum_tokens"] = total
+
+
+async def _increment(counters, turns, session_id: str, tokens: int) -> int:
+    """Add ``tokens`` to the session's counter atomically and return the new total.
+
+    A session without a counter yet starts from its newest stored turn.
+    """
+    now = datetime.utcnow()
+    doc = await counters.find_one_and_update(
+        {"_id": session_id},
+        {"$inc": {"cum_tokens": tokens}, "$set": {"updated_at": now}},
+        projection={"cum_tokens": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    if doc is None:
+        latest = await latest_turn_marker(turns, session_id)
+        seed = (latest or {}).get("cum_tokens") or 0
+        # Another worker may create the counter first: $ifNull keeps its value
+        doc = await counters.find_one_and_update(
+            {"_id": session_id},
+            [{"$set": {
+                "cum_tokens": {"$add": [{"$ifNull": ["$cum_tokens", seed]}, tokens]},
+                "updated_at": now,
+            }}],
+            projection={"cum_tokens": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+    return doc["cum_tokens"]
@@ -3,79 +3,161 @@
 import asyncio
 import logging
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple
+from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorClient
-# tiktoken import moved to inside class to prevent import errors
 from config.settings import settings
+from memory.context_cache import context_cache
+from memory.recall import session_recall, turn_key
+from memory.running_totals import NEWEST_FIRST, assign_cum_tokens, latest_turn_marker
+from memory.summarizer import summarizer
+from memory.tokenizer import tokenizers
+from memory.write_behind import chat_writer
 
 logger = logging.getLogger(__name__)
 
+# Storage layouts (settings.chat_storage_mode)
+TURN_STORAGE = "turns"        # chat_messages: one document per turn
+SESSION_STORAGE = "session"   # chat_sessions: one document per session, capped turns array
+
+_UNKNOWN = object()
+
+# Fields context assembly reads from a chat_messages turn
+TURN_PROJECTION = {
+    "_id": 0,
+    "user_message": 1,
+    "ai_response": 1,
+    "tokens_user": 1,
+    "tokens_ai": 1,
+    "timestamp": 1,
+    "cum_tokens": 1,
+}
+
 
 class SmartContext:
-    """Manages conversation context with token counting and MongoDB storage."""
+    """Manages conversation context with token counting and MongoDB storage.
+    
+    In the default ``turns`` layout each turn is its own ``chat_messages``
+    document and history is read with a sorted index scan. The ``session``
+    layout keeps one ``chat_sessions`` document per session holding the
+    last ``session_max_turns`` turns plus running token totals, so loading
+    context is a single lookup by ``_id``.
+    
+    While the write-behind buffer is running, turns are queued for a
+    batched write instead of being written inline; reads see them through
+    the context cache and the buffer's pending turns.
+    """
 
-    def __init__(self, db_client: Optional[AsyncIOMotorClient]):
-        """Initialize with MongoDB client."""
+    def __init__(self, db_client: Optional[AsyncIOMotorClient], model: Optional[str] = None):
+        """Initialize with MongoDB client and the model whose token budget applies."""
         if db_client:
             self.db = db_client[settings.db_name]
             self.chat_collection = self.db.chat_messages
+            self.session_collection = self.db.chat_sessions
+            self.counter_collection = self.db.chat_token_counters
+            self.summary_collection = self.db.chat_summaries if settings.summary_enabled else None
         else:
             self.db = None
             self.chat_collection = None
-        try:
-            import tiktoken
-            self.encoding = tiktoken.get_encoding("cl100k_base")
-        except Exception as e:
-            logger.warning(f"Failed to load tiktoken encoding: {e}. Using fallback counting.")
-            self.encoding = None
+            self.session_collection = None
+            self.counter_collection = None
+            self.summary_collection = None
+        self.storage_mode = settings.chat_storage_mode
+        self.tokenizer = tokenizers.for_model(model)
+        self.cache = context_cache if settings.context_cache_enabled else None
+        self.recall = session_recall if settings.recall_enabled else None
+        self.writer = chat_writer if settings.chat_write_behind_enabled and chat_writer.running else None
 
     async def save_message(self, session_id: str, user_message: str, ai_response: str) -> bool:
         """Save a conversation turn to MongoDB."""
-        if not self.chat_collection:
+        if self.chat_collection is None:
             return False
             
         try:
+            now = datetime.utcnow()
             document = {
                 "session_id": session_id,
                 "user_message": user_message,
                 "ai_response": ai_response,
-                "timestamp": datetime.utcnow(),
-                "tokens_user": self._count_tokens(user_message),
-                "tokens_ai": self._count_tokens(ai_response),
+                # MongoDB keeps millisecond precision; match it so cached and
+                # reloaded timestamps compare equal
+                "timestamp": now.replace(microsecond=now.microsecond // 1000 * 1000),
+                "tokens_user": await self.tokenizer.count_async(user_message),
+                "tokens_ai": await self.tokenizer.count_async(ai_response),
             }
-            await self.chat_collection.insert_one(document)
+            # One turn dict is shared with the cache and the write-behind
+            # buffer, which fills in its running total when it is written
+            turn = self._turn(document)
+            await self._store_turn(session_id, document, turn)
+            if self.cache is not None:
+                self.cache.append(session_id, turn)
+            if self.recall is not None:
+                self.recall.add(session_id, turn)
             logger.info(f"Saved message for session {session_id}")
             return True
         except Exception as e:
             logger.error(f"Failed to save message: {e}")
             return False
 
-    async def get_context(self, session_id: str) -> List[Dict[str, str]]:
-        """Load conversation history, respecting token limits."""
-        if not self.chat_collection:
+    async def get_context(
+        self, session_id: str, query: Optional[str] = None, reserved_tokens: int = 0
+    ) -> List[Dict[str, str]]:
+        """Load conversation history, respecting token limits.
+        
+        History gets ``max_context_tokens`` minus ``reserved_tokens``, the
+        prompt tokens spent outside history (system prompt, catalog, message).
+        
+        With summaries enabled, turns that no longer fit are folded into a
+        rolling summary in the background, and the summary (if any) comes
+        first as ``{"summary": text}``. Given the current message as
+        ``query``, older turns relevant to it are recalled into the
+        remaining budget ahead of the recent ones.
+        """
+        if self.chat_collection is None:
             return []
             
         try:
-            # Get recent messages in descending order
-            cursor = self.chat_collection.find(
-                {"session_id": session_id}
-            ).sort("timestamp", -1).limit(settings.max_history_messages)
+            turns, summary = await self._load_session(session_id)
             
-            messages = []
+            budget = max(0, settings.max_context_tokens - reserved_tokens)
+            keep_limit = len(turns)
+            if summary is not None:
+                budget -= summary.get("tokens") or 0
+                # Leave room in the loaded window so evicted turns are seen
+                # (and folded) before they drop out of it
+                keep_limit = max(1, settings.max_history_messages - settings.summary_batch_turns)
+            
+            window = []
             total_tokens = 0
             
-            async for doc in cursor:
+            # Walk from the newest turn back
+            for doc in reversed(turns):
                 message_tokens = doc["tokens_user"] + doc["tokens_ai"]
-                if total_tokens + message_tokens > settings.max_context_tokens:
+                if len(window) >= keep_limit or total_tokens + message_tokens > budget:
                     break
                 
                 # Add in chronological order (oldest first)
-                messages.insert(0, {
-                    "user": doc["user_message"],
-                    "assistant": doc["ai_response"]
-                })
+                window.insert(0, doc)
                 total_tokens += message_tokens
             
+            if summary is not None:
+                recent = len(window)
+                carried = self._fold_evicted(session_id, summary, turns[:len(turns) - recent], budget - total_tokens)
+                total_tokens += sum(doc["tokens_user"] + doc["tokens_ai"] for doc in carried)
+                window = carried + window
+            
+            if query and self.recall is not None:
+                recalled = await self._recall_turns(session_id, query, turns, window, budget - total_tokens)
+                total_tokens += sum(doc["tokens_user"] + doc["tokens_ai"] for doc in recalled)
+                window = recalled + window
+            
+            messages = [{"user": doc["user_message"], "assistant": doc["ai_response"]} for doc in window]
+            
+            if summary is not None:
+                if summary.get("summary"):
+                    messages.insert(0, {"summary": summary["summary"]})
+                    total_tokens += summary.get("tokens") or 0
+            
             logger.info(f"Loaded {len(messages)} messages for session {session_id} ({total_tokens} tokens)")
             return messages
             
@@ -83,23 +165,235 @@ class SmartContext:
             logger.error(f"Failed to load context: {e}")
             return []
 
+    @staticmethod
+    def _turn(doc: Dict[str, Any]) -> Dict[str, Any]:
+        """The fields of a stored turn that context assembly needs."""
+        return {
+            "user_message": doc["user_message"],
+            "ai_response": doc["ai_response"],
+            "tokens_user": doc["tokens_user"],
+            "tokens_ai": doc["tokens_ai"],
+            "timestamp": doc["timestamp"],
+            "cum_tokens": doc.get("cum_tokens"),
+        }
+
+    async def _store_turn(self, session_id: str, document: Dict[str, Any], turn: Dict[str, Any]):
+        """Persist one turn in the configured storage layout (or queue it).
+        
+        Queued turns get their running token total when the buffer flushes.
+        """
+        write = self._pending_write(session_id, document, turn)
+        if self.writer is not None:
+            self.writer.enqueue(write)
+        elif "document" in write:
+            await assign_cum_tokens(self.counter_collection, self.chat_collection, [document])
+            turn["cum_tokens"] = document["cum_tokens"]
+            await self.chat_collection.insert_one(document)
+        else:
+            await self.session_collection.update_one(write["filter"], write["update"], upsert=True)
+
+    def _pending_write(self, session_id: str, document: Dict[str, Any], turn: Dict[str, Any]) -> Dict[str, Any]:
+        """The write that stores a turn, in the form ``ChatWriteBehind`` batches."""
+        if self.storage_mode != SESSION_STORAGE:
+            return {"session_id": session_id, "turn": turn, "document": document}
+        # The filter skips a session that already has this turn, so a retried
+        # upsert fails with a duplicate _id instead of pushing the turn twice
+        turn_id = ObjectId()
+        return {
+            "session_id": session_id,
+            "turn": turn,
+            "filter": {"_id": session_id, "turn_ids": {"$ne": turn_id}},
+            "update": {
+                "$push": {
+                    "turns": {"$each": [turn], "$slice": -settings.session_max_turns},
+                    "turn_ids": {"$each": [turn_id], "$slice": -settings.session_max_turns},
+                },
+                "$inc": {
+                    "turn_count": 1,
+                    "total_tokens_user": document["tokens_user"],
+                    "total_tokens_ai": document["tokens_ai"],
+                },
+                "$set": {"updated_at": document["timestamp"]},
+                "$setOnInsert": {"created_at": document["timestamp"]},
+            },
+        }
+
+    async def _latest_turn_marker(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """``cum_tokens`` of the session's newest stored turn (see ``running_totals``)."""
+        return await latest_turn_marker(self.chat_collection, session_id)
+
+    async def _load_recent_turns(
+        self, session_id: str, floor: Optional[int] = None, latest: Any = _UNKNOWN
+    ) -> List[Dict[str, Any]]:
+        """Most recent turns from MongoDB, oldest first.
+        
+        In the turns layout only turns whose running total lies within
+        ``max_context_tokens`` of the newest one are fetched (or, with a
+        summary, everything after ``floor``, its last folded total). Turns
+        stored before running totals existed have none and are always
+        candidates, so ``max_history_messages`` bounds them as before.
+        ``latest`` is the result of ``_latest_turn_marker`` if already known.
+        """
+        if self.storage_mode == SESSION_STORAGE:
+            doc = await self.session_collection.find_one(
+                {"_id": session_id}, {"turns": {"$slice": -settings.max_history_messages}}
+            )
+            return [self._turn(turn) for turn in doc.get("turns", [])] if doc else []
+        
+        if latest is _UNKNOWN:
+            latest = await self._latest_turn_marker(session_id)
+        if latest is None:
+            return []
+        
+        if latest.get("cum_tokens") is None:
+            # Turns saved before running totals existed
+            cursor = self.chat_collection.find(
+                {"session_id": session_id}, TURN_PROJECTION
+            ).sort("timestamp", -1)
+        else:
+            lower = latest["cum_tokens"] - settings.max_context_tokens
+            if floor is not None:
+                lower = min(lower, floor)
+            cursor = self.chat_collection.find(
+                {"session_id": session_id, "cum_tokens": {"$not": {"$lte": lower}}}, TURN_PROJECTION
+            ).sort(NEWEST_FIRST)
+        
+        turns = [self._turn(doc) async for doc in cursor.limit(settings.max_history_messages)]
+        turns.reverse()
+        return turns
+
+    async def _load_session(self, session_id: str) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Recent turns and rolling summary, from the session cache or MongoDB.
+        
+        The summary is None when summaries are disabled.
+        """
+        if self.cache is not None:
+            turns = self.cache.get(session_id)
+            if turns is not None:
+                return turns, self.cache.get_summary(session_id) if self.summary_collection is not None else None
+        
+        if self.summary_collection is not None and self.storage_mode != SESSION_STORAGE:
+            summary, latest = await asyncio.gather(
+                summarizer.load(self.summary_collection, session_id),
+                self._latest_turn_marker(session_id),
+            )
+            # Unsummarized turns are fetched too, so they can be folded
+            turns = await self._load_recent_turns(
+                session_id, floor=summary.get("summarized_cum") or 0, latest=latest
+            )
+        elif self.summary_collection is not None:
+            turns, summary = await asyncio.gather(
+                self._load_recent_turns(session_id),
+                summarizer.load(self.summary_collection, session_id),
+            )
+        else:
+            turns, summary = await self._load_recent_turns(session_id), None
+        
+        if self.writer is not None:
+            turns = self._with_pending(session_id, turns)
+        if self.cache is not None:
+            self.cache.put(session_id, turns, summary)
+        return turns, summary
+
+    async def _recall_turns(
+        self,
+        session_id: str,
+        query: str,
+        loaded: List[Dict[str, Any]],
+        window: List[Dict[str, Any]],
+        budget: int,
+    ) -> List[Dict[str, Any]]:
+        """Older turns outside ``window`` relevant to ``query``, oldest first."""
+        if not self.recall.has(session_id):
+            older = self._has_older_turns(loaded)
+            self.recall.build(session_id, await self._load_recall_turns(session_id) if older else loaded)
+        
+        budget = min(budget, settings.recall_max_tokens)
+        recalled = []
+        for doc in self.recall.search(
+            session_id,
+            query,
+            settings.recall_top_k,
+            exclude=[turn_key(doc) for doc in window],
+            min_score=settings.recall_min_score,
+        ):
+            tokens = doc["tokens_user"] + doc["tokens_ai"]
+            if tokens <= budget:
+                recalled.append(doc)
+                budget -= tokens
+        recalled.sort(key=lambda doc: doc["timestamp"])
+        return recalled
+
+    @staticmethod
+    def _has_older_turns(turns: List[Dict[str, Any]]) -> bool:
+        """Whether the session has stored turns before the loaded ones."""
+        if not turns:
+            return False
+        first = turns[0]
+        if first.get("cum_tokens") is not None:
+            return first["cum_tokens"] > first["tokens_user"] + first["tokens_ai"]
+        return len(turns) >= settings.max_history_messages
+
+    async def _load_recall_turns(self, session_id: str) -> List[Dict[str, Any]]:
+        """Up to ``recall_max_turns`` of a session's stored turns, oldest first."""
+        if self.storage_mode == SESSION_STORAGE:
+            doc = await self.session_collection.find_one(
+                {"_id": session_id}, {"turns": {"$slice": -settings.recall_max_turns}}
+            )
+            return [self._turn(turn) for turn in doc.get("turns", [])] if doc else []
+        
+        cursor = self.chat_collection.find({"session_id": session_id}, TURN_PROJECTION).sort("timestamp", -1)
+        turns = [self._turn(doc) async for doc in cursor.limit(settings.recall_max_turns)]
+        turns.reverse()
+        return turns
+
+    def _with_pending(self, session_id: str, turns: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Append turns still waiting in the write-behind buffer (read-your-writes)."""
+        stored = {turn["timestamp"] for turn in turns}
+        pending = [turn for turn in self.writer.pending_turns(session_id) if turn["timestamp"] not in stored]
+        return (turns + pending)[-settings.max_history_messages:] if pending else turns
+
+    def _fold_evicted(
+        self, session_id: str, summary: Dict[str, Any], evicted: List[Dict[str, Any]], room: int
+    ) -> List[Dict[str, Any]]:
+        """Handle turns evicted from the window that the summary does not cover yet.
+        
+        They stay in the window (and are returned) until ``summary_batch_turns``
+        of them have piled up or they no longer fit in ``room`` tokens; then a
+        summary update folding them in is scheduled instead.
+        """
+        until = summary.get("summarized_until")
+        pending = [turn for turn in evicted if until is None or turn["timestamp"] > until]
+        if not pending:
+            return []
+        tokens = sum(turn["tokens_user"] + turn["tokens_ai"] for turn in pending)
+        if len(pending) < settings.summary_batch_turns and tokens <= room:
+            return pending
+        
+        def on_update(updated: Dict[str, Any]):
+            if self.cache is not None:
+                self.cache.set_summary(session_id, updated)
+        
+        summarizer.schedule(self.summary_collection, session_id, summary, pending, on_update)
+        return []
+
     def _count_tokens(self, text: str) -> int:
-        """Count tokens in text using tiktoken."""
-        try:
-            if self.encoding:
-                return len(self.encoding.encode(text))
-            return len(text) // 4
-        except Exception:
-            # Fallback: rough estimation (1 token ≈ 4 chars)
-            return len(text) // 4
+        """Count tokens in text with the model's shared tokenizer."""
+        return self.tokenizer.count(text)
 
     async def cleanup_old_messages(self, days: int = 30) -> int:
         """Remove messages older than specified days."""
         try:
             cutoff_date = datetime.utcnow() - timedelta(days=days)
+            if self.storage_mode == SESSION_STORAGE:
+                result = await self.session_collection.delete_many({"updated_at": {"$lt": cutoff_date}})
+                logger.info(f"Cleaned up {result.deleted_count} inactive sessions")
+                return result.deleted_count
             result = await self.chat_collection.delete_many({
                 "timestamp": {"$lt": cutoff_date}
             })
+            # Running-total counters of sessions with no recent turns
+            await self.counter_collection.delete_many({"updated_at": {"$lt": cutoff_date}})
             logger.info(f"Cleaned up {result.deleted_count} old messages")
             return result.deleted_count
         except Exception as e:
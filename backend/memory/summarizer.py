@@ -0,0 +1,144 @@
+"""Incremental rolling summaries of long conversations."""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from config.settings import settings
+from memory.tokenizer import tokenizers
+from utils.deadline import detached_context
+from utils.metrics import metrics
+from utils.prompts import prompts
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_TEMPLATE = prompts.get("summary")
+
+# Prefix of the system message that carries the summary in the prompt
+SUMMARY_HEADER = "Краткое содержание начала разговора:"
+
+GenerateFn = Callable[[List[Dict[str, str]]], Awaitable[Tuple[str, str]]]
+
+
+def build_summary_messages(summary: str, turns: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """Prompt that folds ``turns`` into the existing ``summary``."""
+    dialogue = "\n".join(
+        f"Клиент: {turn['user_message']}\nКонсультант: {turn['ai_response']}" for turn in turns
+    )
+    return [
+        {"role": "system", "content": SUMMARY_TEMPLATE.render(max_words=settings.summary_max_words)},
+        {"role": "user", "content": (
+            f"Текущее резюме:\n{summary or '(пусто)'}\n\n"
+            f"Новые реплики:\n{dialogue}\n\n"
+            "Обновлённое резюме:"
+        )},
+    ]
+
+
+class ConversationSummarizer:
+    """Folds turns that fall out of the context window into a per-session summary.
+
+    Each fold sends only the previous summary and the newly evicted turns
+    to the LLM, so the cost of a fold does not grow with the length of
+    the conversation. Summaries live in the ``chat_summaries`` collection,
+    keyed by session id, with ``summarized_until`` marking the timestamp
+    of the last folded turn. Folds run in the background, one per session
+    at a time.
+    """
+
+    def __init__(self, generate: Optional[GenerateFn] = None):
+        self._generate = generate
+        self._running: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def generate(self, messages: List[Dict[str, str]]) -> Tuple[str, str]:
+        if self._generate is None:
+            # Imported lazily: the router pulls in every provider client
+            from utils.ai_router import ai_router
+            self._generate = ai_router.generate
+        return await self._generate(messages)
+
+    @staticmethod
+    async def load(collection, session_id: str) -> Dict[str, Any]:
+        """The stored summary document, or an empty one."""
+        doc = await collection.find_one(
+            {"_id": session_id}, {"summary": 1, "summarized_until": 1, "summarized_cum": 1, "tokens": 1}
+        )
+        return doc or {"summary": "", "summarized_until": None, "summarized_cum": None, "tokens": 0}
+
+    def schedule(
+        self,
+        collection,
+        session_id: str,
+        current: Dict[str, Any],
+        turns: List[Dict[str, Any]],
+        on_update: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> Optional[asyncio.Task]:
+        """Fold ``turns`` in the background unless a fold is already running."""
+        if session_id in self._running:
+            return None
+        self._running.add(session_id)
+        # Folding outlives the request that triggered it: not bound by its deadline
+        task = asyncio.create_task(
+            self.fold(collection, session_id, current, turns, on_update), context=detached_context()
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        task.add_done_callback(lambda _: self._running.discard(session_id))
+        return task
+
+    async def fold(
+        self,
+        collection,
+        session_id: str,
+        current: Dict[str, Any],
+        turns: List[Dict[str, Any]],
+        on_update: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Merge ``turns`` (oldest first) into ``current`` and store the result."""
+        try:
+            summary, _ = await self.generate(build_summary_messages(current.get("summary", ""), turns))
+            summary = summary.strip()
+            updated = {
+                "summary": summary,
+                "summarized_until": turns[-1]["timestamp"],
+                # Turns still queued for writing have no running total yet;
+                # an earlier folded turn's total is a safe (lower) floor
+                "summarized_cum": next(
+                    (turn["cum_tokens"] for turn in reversed(turns) if turn.get("cum_tokens") is not None),
+                    current.get("summarized_cum"),
+                ),
+                "tokens": await tokenizers.for_model(None).count_async(summary),
+            }
+            # Only advance from the state this fold started from, so a
+            # concurrent fold on another worker cannot be overwritten
+            result = await collection.update_one(
+                {"_id": session_id, "summarized_until": current.get("summarized_until")},
+                {
+                    "$set": {**updated, "updated_at": datetime.utcnow()},
+                    "$inc": {"turns_folded": len(turns)},
+                },
+                upsert=current.get("summarized_until") is None,
+            )
+            if not result.matched_count and result.upserted_id is None:
+                logger.info(f"Summary for session {session_id} was advanced elsewhere, dropping fold")
+                return None
+            metrics.increment("context_summary_folds")
+            metrics.increment("context_summary_turns", len(turns))
+            logger.info(f"Folded {len(turns)} turns into summary for session {session_id}")
+            if on_update is not None:
+                on_update(updated)
+            return updated
+        except Exception as e:
+            metrics.increment("context_summary_errors")
+            logger.error(f"Failed to update summary for session {session_id}: {e}")
+            return None
+
+    async def drain(self):
+        """Wait for folds in progress (used on shutdown)."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+# Global summarizer instance
+summarizer = ConversationSummarizer()
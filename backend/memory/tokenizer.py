@@ -0,0 +1,301 @@
+"""Process-wide, model-aware token counting shared by every chat request.
+
+OpenAI models are counted with their own tiktoken encoding (``o200k_base``
+for gpt-4o and newer, ``cl100k_base`` for gpt-4 / gpt-3.5). Claude and
+Gemini have no public offline tokenizer, so their counts are estimated
+from a reference encoding scaled by a calibrated ratio.
+
+Encoding files ship with the package in ``memory/encodings``, so cold
+starts never download them. A missing file is downloaded by tiktoken on
+first use (or counting falls back to an estimate); with
+``tokenizer_require_bundled`` (on in CI) warming up fails instead.
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from config.settings import settings
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+BUNDLED_ENCODINGS_DIR = Path(__file__).parent / "encodings"
+
+# Bundled encoding files, by tiktoken's cache name (SHA-1 of the download URL)
+BUNDLED_ENCODING_FILES = {
+    "o200k_base": "fb374d419588a4632f3f557e76b4b70aebbca790",
+    "cl100k_base": "9b5ad71b2ce5302211f9c61530b329a4922fc6a4",
+}
+
+DEFAULT_ENCODING = "cl100k_base"
+
+# Model families without a public tokenizer -> reference encoding for estimates
+ESTIMATED_FAMILIES = {
+    "claude": "cl100k_base",
+    "gemini": "o200k_base",
+}
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Small dedicated pool so large texts never block the event loop."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="tokenizer")
+    return _executor
+
+
+def encodings_dir() -> Path:
+    return Path(settings.tokenizer_encodings_dir) if settings.tokenizer_encodings_dir else BUNDLED_ENCODINGS_DIR
+
+
+def use_bundled_encodings():
+    """Point tiktoken's file cache at the bundled encodings directory.
+
+    An explicit ``TIKTOKEN_CACHE_DIR`` in the environment wins.
+    """
+    os.environ.setdefault("TIKTOKEN_CACHE_DIR", str(encodings_dir()))
+
+
+def missing_bundled_encodings() -> List[str]:
+    """Encodings whose file is not in the encodings directory."""
+    directory = encodings_dir()
+    return [name for name, file in BUNDLED_ENCODING_FILES.items() if not (directory / file).is_file()]
+
+
+class TokenCountCache:
+    """Thread-safe LRU of token counts keyed by (text hash, encoding)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[bytes, str], int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(text: str, encoding: str) -> Tuple[bytes, str]:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest(), encoding
+
+    def get(self, key: Tuple[bytes, str]) -> Optional[int]:
+        with self._lock:
+            count = self._entries.get(key)
+            if count is not None:
+                self._entries.move_to_end(key)
+        metrics.increment("tokenizer_cache_hits" if count is not None else "tokenizer_cache_misses")
+        return count
+
+    def set(self, key: Tuple[bytes, str], count: int):
+        with self._lock:
+            self._entries[key] = count
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class Tokenizer:
+    """Lazily loaded tiktoken encoding, loaded once per process.
+
+    Loading an encoding parses a BPE file of several megabytes, so it is
+    done once (normally during application startup via ``warm_up``) and
+    never on the request path: until it is loaded, ``count`` returns the
+    ~4 characters per token estimate and starts the load in the
+    background. Counting texts longer than ``offload_chars`` runs on a
+    small dedicated thread pool so a large paste does not stall the event
+    loop. If tiktoken or its encoding file is unavailable, counts fall
+    back to the same estimate.
+    """
+
+    def __init__(
+        self,
+        encoding_name: str = DEFAULT_ENCODING,
+        offload_chars: int = 2000,
+        cache: Optional[TokenCountCache] = None,
+    ):
+        self.encoding_name = encoding_name
+        self.offload_chars = offload_chars
+        self.cache = cache
+        self._encoding: Any = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._load_future: Optional[Future] = None
+
+    @property
+    def name(self) -> str:
+        return self.encoding_name
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def load(self):
+        """Load the encoding (blocking, thread-safe, at most once)."""
+        with self._lock:
+            if self._loaded:
+                return
+            try:
+                import tiktoken
+                use_bundled_encodings()
+                self._encoding = tiktoken.get_encoding(self.encoding_name)
+                logger.info(f"Tokenizer {self.encoding_name} loaded")
+            except Exception as e:
+                logger.warning(f"Failed to load tiktoken encoding {self.encoding_name}: {e}. Using fallback counting.")
+                self._encoding = None
+            self._loaded = True
+
+    async def warm_up(self):
+        """Load the encoding off the event loop and run a first encode."""
+        await self._ensure_loaded()
+        await self.count_async("Прогрев токенизатора")
+
+    def _start_load(self) -> Future:
+        """Load the encoding on the tokenizer pool (started at most once)."""
+        if self._load_future is None:
+            self._load_future = get_executor().submit(self.load)
+        return self._load_future
+
+    def _ensure_loaded(self) -> "asyncio.Future":
+        return asyncio.wrap_future(self._start_load())
+
+    def _estimate(self, text: str) -> int:
+        # Rough estimation (1 token ≈ 4 chars)
+        return len(text) // 4
+
+    def _encode_count(self, text: str) -> int:
+        try:
+            if self._encoding is not None:
+                return len(self._encoding.encode(text))
+        except Exception:
+            pass
+        return self._estimate(text)
+
+    def count(self, text: str) -> int:
+        """Count tokens synchronously; an uncached estimate until the encoding is loaded."""
+        if not self.loaded:
+            self._start_load()
+            return self._estimate(text)
+        if self.cache is None:
+            return self._encode_count(text)
+        key = TokenCountCache.key(text, self.name)
+        count = self.cache.get(key)
+        if count is None:
+            count = self._encode_count(text)
+            self.cache.set(key, count)
+        return count
+
+    async def count_async(self, text: str) -> int:
+        """Count tokens without blocking the event loop on load or large texts."""
+        if not self.loaded:
+            await self._ensure_loaded()
+        if len(text) <= self.offload_chars:
+            return self.count(text)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_executor(), self.count, text)
+
+
+class EstimatedTokenizer(Tokenizer):
+    """Token estimate for a model family without a public tokenizer.
+
+    Counts with a reference encoding and scales by ``ratio``, the observed
+    ratio of provider-reported input tokens to the reference count (see
+    the ``llm_tokens`` metric to recalibrate).
+    """
+
+    def __init__(self, family: str, reference: Tokenizer, ratio: float, cache: Optional[TokenCountCache] = None):
+        super().__init__(reference.encoding_name, reference.offload_chars, cache)
+        self.family = family
+        self.reference = reference
+        self.ratio = ratio
+
+    @property
+    def name(self) -> str:
+        return f"{self.family}~{self.reference.encoding_name}"
+
+    @property
+    def loaded(self) -> bool:
+        return self.reference.loaded
+
+    def load(self):
+        self.reference.load()
+
+    def _start_load(self) -> Future:
+        return self.reference._start_load()
+
+    def _estimate(self, text: str) -> int:
+        return math.ceil(self.reference._estimate(text) * self.ratio)
+
+    def _encode_count(self, text: str) -> int:
+        return math.ceil(self.reference._encode_count(text) * self.ratio)
+
+
+class TokenizerRegistry:
+    """One tokenizer per encoding / model family, shared process-wide."""
+
+    def __init__(self, offload_chars: int, cache_size: int, ratios: Dict[str, float]):
+        self.offload_chars = offload_chars
+        self.ratios = ratios
+        self.cache = TokenCountCache(cache_size)
+        self._tokenizers: Dict[str, Tokenizer] = {}
+
+    def get_encoding(self, encoding_name: str) -> Tokenizer:
+        tokenizer = self._tokenizers.get(encoding_name)
+        if tokenizer is None:
+            tokenizer = Tokenizer(encoding_name, self.offload_chars, self.cache)
+            self._tokenizers[encoding_name] = tokenizer
+        return tokenizer
+
+    def for_model(self, model: Optional[str]) -> Tokenizer:
+        """Tokenizer for a model name (default encoding when unknown)."""
+        if not model:
+            return self.get_encoding(DEFAULT_ENCODING)
+        for family, reference in ESTIMATED_FAMILIES.items():
+            if model.startswith(family):
+                key = f"{family}~{reference}"
+                tokenizer = self._tokenizers.get(key)
+                if tokenizer is None:
+                    tokenizer = EstimatedTokenizer(
+                        family, self.get_encoding(reference), self.ratios.get(family, 1.0), self.cache
+                    )
+                    self._tokenizers[key] = tokenizer
+                return tokenizer
+        try:
+            import tiktoken
+            return self.get_encoding(tiktoken.encoding_name_for_model(model))
+        except Exception:
+            return self.get_encoding(DEFAULT_ENCODING)
+
+    async def warm_up(self, models: Iterable[str]):
+        """Load every encoding the given models need, in parallel.
+
+        Raises RuntimeError if bundled encoding files are missing and
+        ``tokenizer_require_bundled`` is set.
+        """
+        missing = missing_bundled_encodings()
+        if missing:
+            message = (
+                f"Bundled tiktoken encodings missing: {', '.join(missing)} "
+                f"(run scripts/fetch_tiktoken_encodings.py and commit the files)"
+            )
+            if settings.tokenizer_require_bundled:
+                raise RuntimeError(message)
+            logger.warning(message)
+        encodings = {self.for_model(model).encoding_name for model in models}
+        encodings.add(DEFAULT_ENCODING)
+        await asyncio.gather(*(self.get_encoding(name).warm_up() for name in encodings))
+
+
+# Global tokenizer registry (warmed up in the application lifespan)
+tokenizers = TokenizerRegistry(
+    offload_chars=settings.tokenizer_offload_chars,
+    cache_size=settings.tokenizer_cache_size,
+    ratios=settings.tokenizer_estimate_ratios,
+)
@@ -0,0 +1,306 @@
+"""Write-behind buffer that persists chat turns in batches off the request path."""
+
+import asyncio
+import glob
+import itertools
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+from bson import ObjectId, json_util
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from config.settings import settings
+from memory.running_totals import assign_cum_tokens
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not on Windows
+    fcntl = None
+
+DUPLICATE_KEY_ERROR = 11000
+
+# Backoff before the n-th retry of a failed batch: RETRY_BASE_DELAY * 2**(n-1)
+RETRY_BASE_DELAY = 0.1
+
+
+class ChatWriteBehind:
+    """Buffers turn writes and flushes them as ``insert_many`` / ``bulk_write`` batches.
+
+    ``SmartContext.save_message`` enqueues a pending write (a turn document
+    for ``chat_messages`` or an upsert for ``chat_sessions``) and returns
+    immediately. A background task flushes the buffer every
+    ``flush_interval`` seconds, or as soon as ``batch_size`` writes are
+    waiting. Failed batches are retried with backoff. Writes that still fail,
+    and writes arriving while ``max_pending`` are already buffered, are
+    appended to a JSON-lines spill file that is replayed on the next start.
+    Spill file I/O runs in a thread; appends and replays take an exclusive
+    ``flock`` (where available), so several workers can share one spill file.
+    Serverless functions do not start the buffer, and turns are written inline.
+
+    Turn documents get their running token totals (``cum_tokens``) here,
+    with one counter update per session and batch, so saving a turn never
+    waits for MongoDB.
+
+    Until a turn is in MongoDB it is served from the session context cache,
+    or from ``pending_turns`` when the session is not cached.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        flush_interval: float,
+        max_pending: int,
+        max_retries: int,
+        spill_path: str,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.spill_path = spill_path
+        self.db = None
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._inflight: List[Dict[str, Any]] = []
+        self._overflow: List[Dict[str, Any]] = []
+        self._spill_task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done() and not self._stopping
+
+    async def start(self, db):
+        """Replay spilled writes and start the background flusher."""
+        self.db = db
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._stopping = False
+        await self._replay_spill()
+        self._task = asyncio.create_task(self._run())
+        logger.info("Chat write-behind started")
+
+    async def stop(self):
+        """Flush everything still buffered (used on shutdown)."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+        if self._spill_task is not None:
+            await self._spill_task
+        logger.info("Chat write-behind stopped")
+
+    def enqueue(self, write: Dict[str, Any]):
+        """Queue a write built by ``SmartContext``; never blocks."""
+        if "document" in write:
+            # A fixed _id makes a retried insert of the same turn a no-op
+            write["document"].setdefault("_id", ObjectId())
+        if len(self._buffer) >= self.max_pending:
+            self._overflow.append(write)
+            if self._spill_task is None or self._spill_task.done():
+                self._spill_task = asyncio.create_task(self._spill_overflow())
+            return
+        self._buffer.append(write)
+        metrics.set_gauge("chat_write_pending", len(self._buffer))
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    def pending_turns(self, session_id: str) -> List[Dict[str, Any]]:
+        """Turns of a session not yet confirmed by MongoDB, oldest first."""
+        return [
+            write["turn"] for write in itertools.chain(self._inflight, self._buffer)
+            if write["session_id"] == session_id
+        ]
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+        await self.flush()
+
+    async def flush(self):
+        """Write out everything buffered, one batch at a time."""
+        async with self._lock:
+            while self._buffer:
+                batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+                self._inflight = batch
+                started = time.perf_counter()
+                failed: List[Dict[str, Any]] = []
+                try:
+                    failed = await self._write_with_retry(batch)
+                    if failed:
+                        await self._spill(failed, reason="write_failed")
+                finally:
+                    self._inflight = []
+                    metrics.set_gauge("chat_write_pending", len(self._buffer))
+                metrics.increment("chat_write_batches")
+                metrics.increment("chat_write_turns", len(batch) - len(failed))
+                metrics.observe("chat_write_batch_ms", (time.perf_counter() - started) * 1000)
+
+    async def _write_with_retry(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Write ``batch`` in order; returns the writes that could not be stored."""
+        attempt = 0
+        while batch:
+            # Consecutive writes of the same kind go out as one bulk call
+            kind = "document" in batch[0]
+            run = list(itertools.takewhile(lambda write: ("document" in write) == kind, batch))
+            try:
+                await self._write_run(run)
+                batch = batch[len(run):]
+                continue
+            except BulkWriteError as e:
+                # Ordered bulk writes stop at the first error; skip what was stored
+                error = (e.details.get("writeErrors") or [{}])[0]
+                done = error.get("index", 0)
+                if error.get("code") == DUPLICATE_KEY_ERROR:
+                    # Stored by an earlier attempt whose reply was lost (turn
+                    # inserts have fixed _ids, session upserts skip known turn_ids)
+                    batch = batch[done + 1:]
+                    continue
+                batch = batch[done:]
+                logger.warning(f"Chat write batch failed: {error.get('errmsg', e)}")
+            except Exception as e:
+                logger.warning(f"Chat write batch failed: {e}")
+            attempt += 1
+            if attempt > self.max_retries:
+                logger.error(f"Giving up on {len(batch)} chat writes after {self.max_retries} retries")
+                return batch
+            metrics.increment("chat_write_retries")
+            await asyncio.sleep(RETRY_BASE_DELAY * 2 ** (attempt - 1))
+        return []
+
+    async def _write_run(self, run: List[Dict[str, Any]]):
+        if "document" in run[0]:
+            documents = [write["document"] for write in run]
+            await assign_cum_tokens(self.db.chat_token_counters, self.db.chat_messages, documents)
+            for write in run:
+                write["turn"]["cum_tokens"] = write["document"]["cum_tokens"]
+            await self.db.chat_messages.insert_many(documents, ordered=True)
+        else:
+            await self.db.chat_sessions.bulk_write(
+                [UpdateOne(write["filter"], write["update"], upsert=True) for write in run], ordered=True
+            )
+
+    async def _spill_overflow(self):
+        while self._overflow:
+            writes, self._overflow = self._overflow, []
+            await self._spill(writes, reason="overflow")
+
+    async def _spill(self, writes: List[Dict[str, Any]], reason: str):
+        """Append writes to the spill file (they are lost if none is configured)."""
+        if not self.spill_path:
+            metrics.increment("chat_write_dropped", len(writes), reason=reason)
+            logger.error(f"Dropped {len(writes)} chat writes ({reason}), no spill file configured")
+            return
+        lines = [json_util.dumps(write, ensure_ascii=False) + "\n" for write in writes]
+        try:
+            await asyncio.to_thread(self._append_spill, lines)
+            metrics.increment("chat_write_spilled", len(writes), reason=reason)
+            logger.warning(f"Spilled {len(writes)} chat writes to {self.spill_path} ({reason})")
+        except OSError as e:
+            metrics.increment("chat_write_dropped", len(writes), reason=reason)
+            logger.error(f"Failed to spill {len(writes)} chat writes: {e}")
+
+    def _append_spill(self, lines: List[str]):
+        while True:
+            with open(self.spill_path, "a", encoding="utf-8") as spill:
+                _flock(spill, blocking=True)
+                # A replay may have claimed the file while we waited for the lock
+                try:
+                    current = os.stat(self.spill_path).st_ino == os.fstat(spill.fileno()).st_ino
+                except FileNotFoundError:
+                    current = False
+                if current:
+                    spill.writelines(lines)
+                    return
+
+    async def _replay_spill(self):
+        """Re-queue writes spilled by a previous run and flush them."""
+        if not self.spill_path:
+            return
+        claimed = await asyncio.to_thread(self._claim_spill)
+        if claimed is None:
+            return
+        try:
+            writes = []
+            lines = await asyncio.to_thread(claimed.readlines)
+            for number, line in enumerate(lines, 1):
+                if not line.strip():
+                    continue
+                try:
+                    writes.append(json_util.loads(line))
+                except ValueError as e:
+                    metrics.increment("chat_write_dropped", reason="unparsable")
+                    logger.error(f"Skipping unparsable spilled chat write at {claimed.name}:{number}: {e}")
+            logger.info(f"Replaying {len(writes)} spilled chat writes")
+            self._buffer.extend(writes)
+            await self.flush()
+            os.remove(claimed.name)
+        finally:
+            claimed.close()
+
+    def _claim_spill(self):
+        """Open a spill file for replay, holding its lock until closed.
+
+        The spill file is renamed to a unique ``.replay-<id>`` name so new
+        spills start a fresh file and no other worker replays it. A replay
+        file whose lock is free was left by a worker that died mid-replay;
+        it is taken first, and the spill file waits for the next start.
+        """
+        for path in sorted(glob.glob(f"{glob.escape(self.spill_path)}.replay*")):
+            claimed = self._lock_spill(path, blocking=False)
+            if claimed is not None:
+                return claimed
+        replay_path = f"{self.spill_path}.replay-{ObjectId()}"
+        try:
+            os.replace(self.spill_path, replay_path)
+        except FileNotFoundError:
+            return None
+        # Waits for an append that opened the file before the rename
+        return self._lock_spill(replay_path, blocking=True)
+
+    @staticmethod
+    def _lock_spill(path: str, blocking: bool):
+        try:
+            spill = open(path, encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        try:
+            _flock(spill, blocking)
+        except BlockingIOError:
+            spill.close()
+            return None
+        if not os.path.exists(path):
+            # Replayed and removed by another worker while we waited
+            spill.close()
+            return None
+        return spill
+
+
+def _flock(spill, blocking: bool):
+    """Lock a spill file exclusively (a no-op without ``fcntl``: one worker per spill file)."""
+    if fcntl is not None:
+        fcntl.flock(spill, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+# Global write-behind buffer (started in the application lifespan)
+chat_writer = ChatWriteBehind(
+    batch_size=settings.chat_write_batch_size,
+    flush_interval=settings.chat_write_flush_ms / 1000,
+    max_pending=settings.chat_write_max_pending,
+    max_retries=settings.chat_write_max_retries,
+    spill_path=settings.chat_write_spill_path,
+)
@@ -1,16 +1,39 @@
 """Chat API routes with AI integration and context management."""
 
 import asyncio
+import json
 import logging
+import time
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Set, Tuple
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from memory.smart_context import SmartContext
-from utils.ai_clients import get_ai_client, AIClientError
+from memory.summarizer import SUMMARY_HEADER
+from memory.tokenizer import tokenizers
+from utils.ai_clients import AIClientError, ai_registry
+from utils.admission import admission
+from utils.ai_router import ai_router
 from utils.database import db_manager
+from utils.deadline import (
+    ClientDisconnected,
+    DeadlineExceeded,
+    cancel_on_disconnect,
+    request_deadline,
+    within_deadline,
+)
+from utils.faq import faq_engine
+from utils.knowledge_base import knowledge_base
+from utils.metrics import metrics
+from utils.prompts import prompts
+from utils.response_cache import make_cache_key, response_cache
+from utils.routing_policy import RoutingDecision, routing_policy
+from utils.semantic_cache import semantic_cache
+from utils.single_flight import SingleFlight
+from utils.timing import current_timing, phase
 from config.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -34,6 +57,197 @@ class ChatResponse(BaseModel):
     timestamp: str
 
 
+# Reported as the model when a canned fallback reply was used
+FALLBACK_MODEL = "fallback"
+
+# Reported as the model when the reply came from the response cache
+CACHE_MODEL = "cache"
+
+# Reported as the model when the FAQ fast path answered from catalog templates
+FAQ_MODEL = "faq"
+
+# Non-standard "client closed request" status for turns cancelled on disconnect
+CLIENT_CLOSED_STATUS = 499
+
+# Coalesces identical concurrent LLM calls (same cache key)
+generate_flight = SingleFlight("chat_generate")
+
+# Keep references to detached background tasks so they are not garbage collected
+_background_tasks: Set[asyncio.Task] = set()
+
+# Sales-oriented base system prompt (prompts/chat_system.md); the service
+# catalog comes from the knowledge base
+SYSTEM_TEMPLATE = prompts.get("chat_system")
+SYSTEM_PROMPT = SYSTEM_TEMPLATE.text
+
+
+# Cache keys change whenever the prompt, the catalog or the routing table changes
+PROMPT_VERSION = SYSTEM_TEMPLATE.version
+ROUTING_KEY = ",".join(settings.ai_routes + settings.ai_routes_simple)
+
+
+def prompt_version() -> str:
+    """Version of everything prompt-side that a cached reply depends on."""
+    knowledge_base.maybe_reload()
+    return f"{PROMPT_VERSION}:{knowledge_base.version}"
+
+
+def cache_scope() -> str:
+    """Semantic cache scope: prompt, catalog and routing versions."""
+    return f"{prompt_version()}:{ROUTING_KEY}"
+
+
+def knowledge_for(message: str) -> str:
+    """Knowledge-base system message for this turn."""
+    return knowledge_base.lookup(message) if settings.knowledge_enabled else knowledge_base.full()
+
+
+async def prompt_overhead(message: str, knowledge: str) -> int:
+    """Prompt tokens outside history: system prompt, catalog sections and the message.
+    
+    The model tier is only decided once the history is loaded (conversation
+    depth is one of its inputs), so the overhead is counted with the primary
+    model of every tier and the largest count is reserved: the history then
+    fits whichever tier answers the turn.
+    """
+    models = {router.primary_model for router in routing_policy.routers().values()}
+    with phase("tokens"):
+        counts = []
+        for model in models:
+            tokenizer = tokenizers.for_model(model)
+            counts.append(
+                SYSTEM_TEMPLATE.tokens(model)
+                + await tokenizer.count_async(knowledge)
+                + await tokenizer.count_async(message)
+            )
+        return max(counts)
+
+
+def build_messages(
+    history: List[Dict[str, str]], message: str, knowledge: Optional[str] = None
+) -> List[Dict[str, str]]:
+    """Assemble provider messages: system prompt, history turns, catalog sections, current message.
+    
+    Everything that stays the same from one turn to the next comes first:
+    the static system prompt (byte-identical), then the summary and earlier
+    turns, so provider prompt caches reuse the whole conversation so far.
+    The catalog sections change with every message and sit right before it.
+    """
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    
+    # Add conversation history (a rolling summary of older turns comes first)
+    for turn in history:
+        if "summary" in turn:
+            messages.append({"role": "system", "content": f"{SUMMARY_HEADER}\n{turn['summary']}"})
+            continue
+        messages.append({"role": "user", "content": turn["user"]})
+        messages.append({"role": "assistant", "content": turn["assistant"]})
+    
+    # Service catalog sections relevant to this message
+    if knowledge is None:
+        knowledge = knowledge_for(message)
+    if knowledge:
+        messages.append({"role": "system", "content": knowledge})
+    
+    # Add current message
+    messages.append({"role": "user", "content": message})
+    return messages
+
+
+async def load_conversation(
+    session_id: str, message: Optional[str] = None, reserved_tokens: int = 0
+) -> Tuple[SmartContext, List[Dict[str, str]]]:
+    """Create the context manager for a session and load its history.
+    
+    ``message`` (the current one) lets relevant older turns be recalled;
+    ``reserved_tokens`` is the prompt overhead history must leave room for.
+    """
+    # Initialize context manager
+    try:
+        smart_context = SmartContext(db_manager.client, model=ai_router.primary_model)
+    except Exception as e:
+        logger.error(f"Failed to initialize SmartContext: {e}")
+        raise HTTPException(status_code=503, detail="Context service unavailable")
+    
+    # Load conversation history (within the request deadline)
+    history = []
+    try:
+        if db_manager.db is not None:
+            with phase("context"):
+                history = await within_deadline(
+                    smart_context.get_context(session_id, query=message, reserved_tokens=reserved_tokens)
+                )
+    except DeadlineExceeded:
+        logger.warning(f"Context load for session {session_id} hit the request deadline")
+        metrics.increment("chat_deadline_exceeded", step="context")
+        history = []
+    except Exception as e:
+        logger.error(f"Failed to load context: {e}")
+        history = []
+    
+    return smart_context, history
+
+
+def get_cache_key(history: List[Dict[str, str]], message: str) -> Optional[str]:
+    """Response cache key for this turn, or None when the turn is not cacheable."""
+    if not settings.response_cache_enabled:
+        return None
+    if history and settings.response_cache_first_turn_only:
+        return None
+    return make_cache_key(message, history, prompt_version(), ROUTING_KEY)
+
+
+async def lookup_cached_reply(
+    history: List[Dict[str, str]], message: str
+) -> Tuple[Optional[str], Optional[str], Any]:
+    """Look a turn up in the exact cache, then the semantic cache.
+
+    Returns ``(reply or None, cache_key, query_embedding)``; the key and
+    embedding are passed back to ``remember_reply`` after a miss.
+    """
+    cache_key = get_cache_key(history, message)
+    if cache_key is None:
+        return None, None, None
+    
+    reply = await response_cache.get(cache_key)
+    if reply is not None:
+        return reply, cache_key, None
+    
+    embedding = None
+    if semantic_cache.enabled and not history:
+        await semantic_cache.set_scope(cache_scope())
+        reply, embedding = await semantic_cache.lookup(message)
+        if reply is not None:
+            # Promote to the exact cache so the next identical question is cheaper
+            await response_cache.set(cache_key, reply)
+    return reply, cache_key, embedding
+
+
+async def remember_reply(cache_key: Optional[str], embedding: Any, message: str, reply: str):
+    """Store a fresh LLM reply in the exact and semantic caches."""
+    if cache_key is None:
+        return
+    await response_cache.set(cache_key, reply)
+    if embedding is not None:
+        await semantic_cache.add(message, reply, embedding)
+
+
+def spawn_background(coro) -> asyncio.Task:
+    """Run a coroutine detached from the request that started it."""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+def answer_faq(history: List[Dict[str, str]], message: str) -> Optional[str]:
+    """Templated catalog answer for a frequent question, or None to ask the LLM."""
+    if not settings.faq_enabled:
+        return None
+    answer = faq_engine.answer(message, first_turn=not history)
+    return answer.text if answer is not None else None
+
+
 def get_fallback_response(message: str) -> str:
     """Provide fallback response for errors - maintains sales-oriented tone."""
     fallbacks = [
@@ -42,10 +256,10 @@ def get_fallback_response(message: str) -> str:
         "Добро пожаловать! ✨ Я помогу подобрать решение для вашего бизнеса. Что вас интересует — разработка, дизайн или AI-решения?",
     ]
     
-    # For completely irrelevant questions - soft redirect
-    irrelevant_keywords = ["погода", "новости", "спорт", "фильмы", "музыка", "политика"]
-    if any(keyword in message.lower() for keyword in irrelevant_keywords):
-        return "Интересный вопрос! 😊 Но я больше специализируюсь на digital-решениях для бизнеса. Могу рассказать, как сайт или AI-ассистент поможет вашему делу. Хотите узнать подробнее?"
+    # Prices, timelines, service lists and off-topic redirects from the FAQ templates
+    answer = faq_engine.answer(message, strict=False)
+    if answer is not None:
+        return answer.text
     
     return fallbacks[hash(message) % len(fallbacks)]
 
@@ -55,181 +269,278 @@ def get_fallback_response(message: str) -> str:
 async def chat(request: Request, body: ChatRequest):
     """Handle chat requests with AI integration and context management.
     
+    The turn runs under a ``settings.chat_timeout_seconds`` deadline. If the
+    visitor disconnects while the LLM is generating, the upstream call is
+    cancelled and the turn is not saved. When the server is overloaded the
+    canned fallback reply is returned without loading or saving history.
     Rate limit: 10 requests per minute per IP address.
     """
     start_time = datetime.utcnow()
+    started = time.perf_counter()
     
-    try:
-        # Validate session ID
-        if not body.session_id:
-            raise HTTPException(status_code=400, detail="Session ID is required")
-        
-        # Initialize context manager
+    # Everything below shares one end-to-end deadline
+    with request_deadline(settings.chat_timeout_seconds):
         try:
-            smart_context = SmartContext(db_manager.client)
-        except Exception as e:
-            logger.error(f"Failed to initialize SmartContext: {e}")
-            raise HTTPException(status_code=503, detail="Context service unavailable")
-        
-        # Load conversation history
-        history = []
-        try:
-            if db_manager.db:
-                history = await smart_context.get_context(body.session_id)
-        except Exception as e:
-            logger.error(f"Failed to load context: {e}")
-            history = []
-        
-        # Build messages for AI
-        messages = []
-        
-        # Add system message - comprehensive sales-oriented prompt
-        system_prompt = """Ты — AI-консультант NeuroExpert, эксперт по digital-трансформации для бизнеса.
-
-## 🏢 О КОМПАНИИ
-NeuroExpert — молодое digital-агентство с фокусом на качество:
-- 10+ успешных кейсов
-- Индивидуальный подход к каждому проекту
-- Работаем с малым и средним бизнесом
-- Честные сроки и прозрачное ценообразование
-
-## 🎯 НАШИ УСЛУГИ
-
-### 1. Разработка сайтов
-- Лендинги (от 50 000 ₽, 2-3 недели)
-- Корпоративные сайты (от 150 000 ₽)
-- Интернет-магазины (от 250 000 ₽)
-- Веб-приложения под ключ
-
-### 2. AI-ассистенты и чат-боты  
-- Умные консультанты для сайта (от 80 000 ₽)
-- Telegram/WhatsApp боты
-- Автоматизация поддержки клиентов
-- Интеграция с CRM
-
-### 3. Цифровой аудит
-- Анализ сайта и конкурентов (от 30 000 ₽)
-- SEO-аудит с рекомендациями
-- UX/UI анализ
-- Аудит безопасности
-
-### 4. Дизайн
-- Фирменный стиль (от 70 000 ₽)
-- UI/UX дизайн интерфейсов
-- Рекламные креативы
-- Презентации
-
-### 5. Техподдержка
-- Абонентское обслуживание сайтов (от 15 000 ₽/мес)
-- Доработки и обновления
-- Мониторинг и защита
-
-## 💬 СТИЛЬ ОБЩЕНИЯ
-1. Говори дружелюбно, но профессионально
-2. Используй эмодзи умеренно для акцентов
-3. Структурируй ответы списками
-4. Давай конкретные примеры
-5. Всегда завершай призывом к действию
-
-## 🎯 ТВОЯ ЦЕЛЬ
-Помочь клиенту понять, какая услуга решит его задачу, и пригласить оставить заявку.
-
-## 📞 ПРИЗЫВЫ К ДЕЙСТВИЮ
-Используй в конце ответов:
-- "Оставьте контакт в форме ниже — свяжемся за 15 минут!"
-- "Хотите обсудить ваш проект? Напишите нам!"
-- "Готовы рассчитать стоимость — просто опишите задачу"
-
-## ⚡ ОБРАБОТКА ВОПРОСОВ НЕ ПО ТЕМЕ
-Если вопрос не связан с digital-услугами:
-- НЕ отказывай жёстко
-- Кратко ответь (1-2 предложения) 
-- Плавно переведи к нашим услугам
-Пример: "Интересный вопрос! Кстати, мы в NeuroExpert как раз используем AI для создания умных ассистентов. Хотите узнать, как это может помочь вашему бизнесу?"
-
-## ❌ ЗАПРЕЩЕНО
-- Называть точные сроки без уточнения задачи
-- Обещать невозможное
-- Критиковать конкурентов
-- Обсуждать политику, религию, личные темы
-
-## ✅ ВАЖНО
-- Всегда спрашивай о бизнесе клиента
-- Предлагай бесплатную консультацию
-- Упоминай гарантию результата"""
-        messages.append({"role": "system", "content": system_prompt})
-        
-        # Add conversation history
-        for turn in history:
-            messages.append({"role": "user", "content": turn["user"]})
-            messages.append({"role": "assistant", "content": turn["assistant"]})
-        
-        # Add current message
-        messages.append({"role": "user", "content": body.message})
-        
-        # Generate AI response
-        ai_response = None
-        try:
-            # Use GPT-4o-mini for optimal cost/performance balance
-            model = "gpt-4o-mini"
-            client = get_ai_client(model)
-            ai_response = await client.generate(messages, model)
-            logger.info(f"Generated response using {model}")
-        except AIClientError as e:
-            logger.error(f"AI generation failed: {e}")
-            ai_response = get_fallback_response(body.message)
-        except Exception as e:
-            logger.error(f"Unexpected AI error: {e}")
-            ai_response = get_fallback_response(body.message)
-        
-        # Save conversation to database
-        try:
-            await smart_context.save_message(body.session_id, body.message, ai_response)
+            # Validate session ID
+            if not body.session_id:
+                raise HTTPException(status_code=400, detail="Session ID is required")
+            
+            # Shed under overload: leave capacity to contact form submissions
+            if admission.should_shed("chat"):
+                return ChatResponse(
+                    response=get_fallback_response(body.message),
+                    session_id=body.session_id,
+                    model=FALLBACK_MODEL,
+                    timestamp=start_time.isoformat()
+                )
+            
+            knowledge = knowledge_for(body.message)
+            reserved_tokens = await prompt_overhead(body.message, knowledge)
+            smart_context, history = await load_conversation(body.session_id, body.message, reserved_tokens)
+            
+            faq = answer_faq(history, body.message)
+            if faq is not None:
+                ai_response, cache_key, embedding, model = faq, None, None, FAQ_MODEL
+            else:
+                # Serve repeated and near-duplicate questions from the caches
+                ai_response, cache_key, embedding = await lookup_cached_reply(history, body.message)
+                model = CACHE_MODEL
+            
+            if ai_response is None:
+                # Build messages for AI
+                messages = build_messages(history, body.message, knowledge)
+                
+                # Pick the model tier and reply cap for this turn
+                decision = routing_policy.decide(body.message, history)
+                
+                async def generate() -> Tuple[Tuple[str, str], bool]:
+                    if cache_key:
+                        # Identical questions arriving together share one upstream call
+                        return await generate_flight.do(
+                            cache_key, lambda: decision.router.generate(messages, decision.max_tokens)
+                        )
+                    return await decision.router.generate(messages, decision.max_tokens), False
+                
+                # Generate AI response
+                model = FALLBACK_MODEL
+                try:
+                    with phase("llm"):
+                        (ai_response, model), shared = await cancel_on_disconnect(
+                            request, generate(), settings.chat_disconnect_poll_interval
+                        )
+                    logger.info(f"Generated response using {model} ({decision.tier}){' (shared)' if shared else ''}")
+                    if not shared:
+                        spawn_background(remember_reply(cache_key, embedding, body.message, ai_response))
+                except ClientDisconnected:
+                    # Nobody is waiting for the reply: do not save it
+                    logger.info(f"Client disconnected, chat turn for session {body.session_id} cancelled")
+                    metrics.increment("chat_cancelled", reason="disconnect", endpoint="chat")
+                    return Response(status_code=CLIENT_CLOSED_STATUS)
+                except AIClientError as e:
+                    logger.error(f"AI generation failed: {e}")
+                    ai_response = get_fallback_response(body.message)
+                except Exception as e:
+                    logger.error(f"Unexpected AI error: {e}")
+                    ai_response = get_fallback_response(body.message)
+            
+            # Save conversation to database
+            try:
+                with phase("db_save"):
+                    await within_deadline(smart_context.save_message(body.session_id, body.message, ai_response))
+            except DeadlineExceeded:
+                logger.warning(f"Saving the turn for session {body.session_id} hit the request deadline")
+                metrics.increment("chat_deadline_exceeded", step="save")
+            except Exception as e:
+                logger.error(f"Failed to save conversation: {e}")
+                # Continue even if save fails
+            
+            # Return response
+            response = ChatResponse(
+                response=ai_response,
+                session_id=body.session_id,
+                model=model,
+                timestamp=start_time.isoformat()
+            )
+            
+            metrics.observe(
+                "chat_reply_ms", (time.perf_counter() - started) * 1000,
+                source=model if model in (CACHE_MODEL, FALLBACK_MODEL, FAQ_MODEL) else "llm",
+            )
+            logger.info(f"Chat processed for session {body.session_id}")
+            return response
+            
+        except HTTPException:
+            raise
         except Exception as e:
-            logger.error(f"Failed to save conversation: {e}")
-            # Continue even if save fails
-        
-        # Return response
-        response = ChatResponse(
-            response=ai_response,
-            session_id=body.session_id,
-            model="gpt-4o-mini",
-            timestamp=start_time.isoformat()
-        )
-        
-        logger.info(f"Chat processed for session {body.session_id}")
-        return response
-        
-    except HTTPException:
-        raise
+            logger.error(f"Chat endpoint error: {e}")
+            # Return error detail for debugging (remove in production if needed)
+            raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+def _sse_event(data: Dict[str, Any]) -> str:
+    """Encode a server-sent event frame."""
+    return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _produce_stream(
+    smart_context: SmartContext,
+    body: ChatRequest,
+    messages: List[Dict[str, str]],
+    queue: "asyncio.Queue[Optional[str]]",
+    reply_meta: Dict[str, str],
+    decision: RoutingDecision,
+    cache_key: Optional[str] = None,
+    embedding: Any = None,
+):
+    """Read provider deltas into ``queue`` and persist the full reply.
+
+    Runs as a separate task under the request deadline, which bounds the
+    wait for the first delta. The SSE response cancels it when the client
+    disconnects mid-reply, which stops the upstream stream; a cancelled
+    reply is not saved. A reply that streamed to the end is saved however
+    long it took. The model that produced the reply is stored in
+    ``reply_meta`` before the end-of-stream marker is queued; a stream
+    that broke off is reported as the fallback and never cached.
+    """
+    chunks: List[str] = []
+    model = FALLBACK_MODEL
+    completed = False
+    try:
+        with phase("llm"):
+            async for model, delta in decision.router.generate_stream(messages, decision.max_tokens):
+                chunks.append(delta)
+                queue.put_nowait(delta)
+        completed = True
+        logger.info(f"Streamed response using {model} ({decision.tier})")
     except Exception as e:
-        logger.error(f"Chat endpoint error: {e}")
-        # Return error detail for debugging (remove in production if needed)
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+        logger.error(f"AI streaming failed: {e}")
+        if not chunks:
+            fallback = get_fallback_response(body.message)
+            chunks.append(fallback)
+            queue.put_nowait(fallback)
+    finally:
+        reply_meta["model"] = model if completed else FALLBACK_MODEL
+        queue.put_nowait(None)
+    
+    reply = "".join(chunks)
+    if completed:
+        await remember_reply(cache_key, embedding, body.message, reply)
+    
+    # Save conversation to database
+    try:
+        await smart_context.save_message(body.session_id, body.message, reply)
+    except Exception as e:
+        logger.error(f"Failed to save streamed conversation: {e}")
+
+
+@router.post("/chat/stream")
+@limiter.limit("10/minute")
+async def chat_stream(request: Request, body: ChatRequest):
+    """Stream the AI reply as server-sent events.
+    
+    Emits ``{"type": "token", "content": ...}`` events as the provider
+    produces text, followed by a final ``{"type": "done", ...}`` event.
+    Closing the connection before the end cancels the upstream stream.
+    When the server is overloaded the fallback reply is streamed instead.
+    Headers go out before the reply is generated, so the LLM phase timings
+    are sent in the ``done`` event rather than the ``Server-Timing`` header.
+    Rate limit: 10 requests per minute per IP address.
+    """
+    start_time = datetime.utcnow()
+    
+    if not body.session_id:
+        raise HTTPException(status_code=400, detail="Session ID is required")
+    
+    queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+    reply_meta: Dict[str, str] = {}
+    timing = current_timing()
+    
+    producer: Optional[asyncio.Task] = None
+    if admission.should_shed("chat"):
+        # Overloaded: the fallback reply as a single token event, nothing saved
+        reply_meta["model"] = FALLBACK_MODEL
+        queue.put_nowait(get_fallback_response(body.message))
+        queue.put_nowait(None)
+    else:
+        # Context loading and the producer task (which inherits it) share one deadline
+        with request_deadline(settings.chat_timeout_seconds):
+            knowledge = knowledge_for(body.message)
+            reserved_tokens = await prompt_overhead(body.message, knowledge)
+            smart_context, history = await load_conversation(body.session_id, body.message, reserved_tokens)
+            messages = build_messages(history, body.message, knowledge)
+            
+            faq = answer_faq(history, body.message)
+            if faq is not None:
+                cached, cache_key, embedding, reply_meta["model"] = faq, None, None, FAQ_MODEL
+            else:
+                cached, cache_key, embedding = await lookup_cached_reply(history, body.message)
+                reply_meta["model"] = CACHE_MODEL
+            if cached is not None:
+                # Replay the cached (or FAQ) reply as a single token event
+                queue.put_nowait(cached)
+                queue.put_nowait(None)
+                spawn_background(smart_context.save_message(body.session_id, body.message, cached))
+            else:
+                decision = routing_policy.decide(body.message, history)
+                producer = spawn_background(_produce_stream(
+                    smart_context, body, messages, queue, reply_meta, decision, cache_key, embedding
+                ))
+    
+    async def event_stream():
+        finished = False
+        try:
+            while True:
+                delta = await queue.get()
+                if delta is None:
+                    break
+                yield _sse_event({"type": "token", "content": delta})
+            finished = True
+            done = {
+                "type": "done",
+                "session_id": body.session_id,
+                "model": reply_meta["model"],
+                "timestamp": start_time.isoformat(),
+            }
+            if timing is not None:
+                done["timing"] = timing.fields()
+            yield _sse_event(done)
+        finally:
+            if not finished and producer is not None and not producer.done():
+                # The visitor went away mid-reply: stop the upstream stream
+                logger.info(f"Client disconnected, streamed turn for session {body.session_id} cancelled")
+                metrics.increment("chat_cancelled", reason="disconnect", endpoint="stream")
+                producer.cancel()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/chat/health")
 async def chat_health():
-    """Health check for chat service."""
-    try:
+    """Health check for chat service (the last report while health checks are shed)."""
+    async def build_report() -> Dict[str, Any]:
         # Check database connection
         db_health = await db_manager.health_check()
         
-        # Check AI clients configuration
-        ai_status = {}
-        for model in ["gpt-4o-mini"]:
-            try:
-                client = get_ai_client(model)
-                ai_status[model] = "configured"
-            except Exception:
-                ai_status[model] = "not_configured"
+        # Check AI routes configuration and live statistics, per model tier
+        ai_status = {tier: router.snapshot() for tier, router in routing_policy.routers().items()}
         
         return {
             "status": "healthy" if db_health["status"] == "healthy" else "degraded",
             "database": db_health,
             "ai_clients": ai_status,
+            "circuit_breakers": ai_registry.breaker_snapshot(),
+            "concurrency": ai_registry.limiter_snapshot(),
+            "admission": admission.snapshot(),
+            "prompts": {**prompts.versions(), "knowledge": knowledge_base.version},
             "timestamp": datetime.utcnow().isoformat()
         }
+    
+    try:
+        return await admission.health_report("chat", build_report)
     except Exception as e:
         logger.error(f"Chat health check failed: {e}")
         return {
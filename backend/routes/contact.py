@@ -9,6 +9,7 @@ from slowapi import Limiter
 from slowapi.util import get_remote_address
 from utils.database import db_manager
 from utils.telegram import TelegramNotifier
+from utils.timing import phase
 from config.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -66,9 +67,10 @@ async def contact_form(request: Request, body: ContactRequest):
         
         # Save to database (optional)
         try:
-            db_success = await db_manager.save_contact_form(
-                body.name, body.contact, body.service, body.message
-            )
+            with phase("db_save"):
+                db_success = await db_manager.save_contact_form(
+                    body.name, body.contact, body.service, body.message
+                )
             if not db_success:
                 logger.warning("Failed to save contact form to database")
         except Exception as e:
@@ -80,9 +82,10 @@ async def contact_form(request: Request, body: ContactRequest):
         if settings.telegram_bot_token and settings.telegram_chat_id:
             try:
                 notifier = TelegramNotifier()
-                telegram_success = await notifier.send_contact_notification(
-                    body.name, body.contact, body.service, body.message
-                )
+                with phase("telegram"):
+                    telegram_success = await notifier.send_contact_notification(
+                        body.name, body.contact, body.service, body.message
+                    )
             except Exception as e:
                 logger.error(f"Telegram notification failed: {e}")
         else:
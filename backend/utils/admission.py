@@ -0,0 +1,147 @@
+"""Server-wide admission control and priority load shedding.
+
+Load is the larger of two ratios: in-flight requests over
+``max_in_flight``, and event-loop lag over ``max_loop_lag_ms``. Lag is
+sampled by a background task that measures how late a short sleep wakes
+up. Each route class has a priority, and work is shed lowest priority
+first:
+
+- ``health`` (LOW) is shed from ``low_priority_ratio`` of full load;
+  ``health_report`` then serves the endpoint's last report;
+- ``chat`` (NORMAL) is shed at full load; callers answer with the canned
+  fallback reply without touching the database or the LLM;
+- ``contact`` (CRITICAL) is always admitted.
+"""
+
+import asyncio
+import logging
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Tuple
+from config.settings import settings
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CRITICAL = 0
+NORMAL = 1
+LOW = 2
+
+ROUTE_PRIORITIES = {
+    "contact": CRITICAL,
+    "chat": NORMAL,
+    "health": LOW,
+}
+
+
+class AdmissionController:
+    """Tracks server load and decides which work to shed."""
+
+    def __init__(
+        self,
+        max_in_flight: int,
+        max_loop_lag_ms: float,
+        low_priority_ratio: float,
+        lag_interval: float,
+        enabled: bool = True,
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_loop_lag_ms = max_loop_lag_ms
+        self.low_priority_ratio = low_priority_ratio
+        self.lag_interval = lag_interval
+        self.enabled = enabled
+        self.in_flight = 0
+        self.loop_lag_ms = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._reports: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start sampling event-loop lag (without it only in-flight load counts)."""
+        if not self.running:
+            self._task = asyncio.create_task(self._sample_lag())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self.loop_lag_ms = 0.0
+
+    async def _sample_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            self.loop_lag_ms = max(0.0, loop.time() - expected) * 1000
+            metrics.set_gauge("event_loop_lag_ms", round(self.loop_lag_ms, 1))
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        """Count a request as in flight for the duration of the block."""
+        self.in_flight += 1
+        metrics.set_gauge("admission_in_flight", self.in_flight)
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            metrics.set_gauge("admission_in_flight", self.in_flight)
+
+    def _loads(self) -> Tuple[float, float]:
+        in_flight_load = self.in_flight / max(1, self.max_in_flight)
+        lag_load = self.loop_lag_ms / self.max_loop_lag_ms if self.max_loop_lag_ms > 0 else 0.0
+        return in_flight_load, lag_load
+
+    @property
+    def load(self) -> float:
+        """Current load, 1.0 being the configured limit."""
+        return max(self._loads())
+
+    def should_shed(self, route: str) -> bool:
+        """True when ``route``'s work should be replaced by its degraded answer."""
+        if not self.enabled:
+            return False
+        priority = ROUTE_PRIORITIES.get(route, NORMAL)
+        if priority == CRITICAL:
+            return False
+        in_flight_load, lag_load = self._loads()
+        load = max(in_flight_load, lag_load)
+        threshold = self.low_priority_ratio if priority == LOW else 1.0
+        if load < threshold:
+            return False
+        reason = "loop_lag" if lag_load > in_flight_load else "in_flight"
+        metrics.increment("admission_shed", route=route, reason=reason)
+        logger.info(f"Shedding {route} request (load {load:.2f}, {reason})")
+        return True
+
+    async def health_report(self, name: str, build: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Health report ``name`` from ``build``, or its last one while health checks are shed."""
+        last = self._reports.get(name)
+        if last and self.should_shed("health"):
+            return {**last, "cached": True}
+        report = await build()
+        self._reports[name] = report
+        return report
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "in_flight": self.in_flight,
+            "loop_lag_ms": round(self.loop_lag_ms, 1),
+            "load": round(self.load, 3),
+        }
+
+
+# Global admission controller (lag sampling started in the application lifespan)
+admission = AdmissionController(
+    max_in_flight=settings.admission_max_in_flight,
+    max_loop_lag_ms=settings.admission_max_loop_lag_ms,
+    low_priority_ratio=settings.admission_low_priority_ratio,
+    lag_interval=settings.admission_lag_interval,
+    enabled=settings.admission_enabled,
+)
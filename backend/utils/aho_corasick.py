@@ -0,0 +1,58 @@
+"""Aho-Corasick multi-pattern matching over token sequences."""
+
+from collections import deque
+from typing import Any, Dict, List, Sequence, Tuple
+
+
+class AhoCorasick:
+    """Finds every occurrence of many token patterns in one pass over the input.
+
+    Patterns are sequences of tokens (e.g. word stems), so a phrase only
+    matches whole words in order. Call ``build`` after the last ``add``.
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Per state: (pattern length, value) of every pattern ending there
+        self._out: List[List[Tuple[int, Any]]] = [[]]
+
+    def add(self, pattern: Sequence[str], value: Any):
+        if not pattern:
+            return
+        state = 0
+        for token in pattern:
+            next_state = self._goto[state].get(token)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][token] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = next_state
+        self._out[state].append((len(pattern), value))
+
+    def build(self):
+        """Compute failure links (breadth-first) and merge outputs along them."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and token not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(token, 0)
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def find(self, tokens: Sequence[str]) -> List[Tuple[int, int, Any]]:
+        """All matches as ``(start, end, value)`` token offsets, in order of their end."""
+        matches = []
+        state = 0
+        for position, token in enumerate(tokens):
+            while state and token not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(token, 0)
+            for length, value in self._out[state]:
+                matches.append((position + 1 - length, position + 1, value))
+        return matches
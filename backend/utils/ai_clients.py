@@ -1,10 +1,19 @@
 """AI service clients (Anthropic, OpenAI, Gemini)."""
 
 import asyncio
+import hashlib
+import importlib.util
+import json
+import random
+import time
 import httpx
 import logging
-from typing import Dict, Optional, Any
+from typing import AsyncIterator, Dict, Optional, Any, Tuple
 from config.settings import settings
+from utils.concurrency import AdaptiveLimiter, LimiterRejected
+from utils.deadline import bound_timeout
+from utils.metrics import metrics
+from utils.timing import mark_first_byte
 
 logger = logging.getLogger(__name__)
 
@@ -13,17 +22,410 @@ class AIClientError(Exception):
     """Base exception for AI client errors."""
 
 
-class AnthropicClient:
+class AIClientConfigError(AIClientError):
+    """Provider is not configured (missing API key)."""
+
+
+class CircuitOpenError(AIClientError):
+    """Provider circuit is open; the call was rejected without a request."""
+
+
+class AIClientOverloadedError(AIClientError):
+    """Provider concurrency limit and queue are saturated; the call was shed."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with half-open probing.
+
+    Closed: calls pass through. After ``failure_threshold`` consecutive
+    provider failures (see ``is_provider_failure``) or timeouts the
+    circuit opens and calls fail fast for
+    ``reset_timeout`` seconds. Then it goes half-open and lets exactly one
+    probe call through: success closes the circuit, failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_in_flight = False
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allows_request(self) -> bool:
+        """Whether a call would currently be let through."""
+        state = self.state
+        return state == self.CLOSED or (state == self.HALF_OPEN and not self.probe_in_flight)
+
+    def acquire(self):
+        """Admit a call or raise CircuitOpenError."""
+        state = self.state
+        if state == self.OPEN or (state == self.HALF_OPEN and self.probe_in_flight):
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        if state == self.HALF_OPEN:
+            self.probe_in_flight = True
+            logger.info(f"{self.name} circuit half-open, sending probe")
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.info(f"{self.name} circuit closed")
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.probe_in_flight or self.consecutive_failures >= self.failure_threshold:
+            if self.opened_at is None or self.probe_in_flight:
+                self.times_opened += 1
+                logger.warning(
+                    f"{self.name} circuit opened after {self.consecutive_failures} consecutive failures"
+                )
+            self.opened_at = time.monotonic()
+        self.probe_in_flight = False
+
+    def release(self):
+        """Give back a probe slot when the call ended without a verdict (cancelled)."""
+        self.probe_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        retry_in = None
+        if self.state == self.OPEN:
+            retry_in = round(self.reset_timeout - (time.monotonic() - self.opened_at), 1)
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "retry_in_seconds": retry_in,
+        }
+
+
+def is_provider_failure(exc: BaseException) -> bool:
+    """Whether an error says the provider is unhealthy (counts for the breaker).
+
+    Transport errors, timeouts, 5xx and 429 responses count. Other 4xx
+    responses (bad request, auth, payload too large) are about the request
+    and must not open the circuit for every caller. Provider clients wrap
+    HTTP errors in AIClientError, so the exception chain is searched.
+    """
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        if isinstance(exc, httpx.HTTPStatusError):
+            status = exc.response.status_code
+            return status >= 500 or status == 429
+        exc = exc.__cause__ or exc.__context__
+    return True
+
+
+async def _on_response(response: httpx.Response):
+    """Response headers arrived: record the provider's time to first byte."""
+    if response.is_success:
+        mark_first_byte()
+
+
+def fold_turn_context(messages: list) -> list:
+    """Merge system messages right before the final user message into it.
+    
+    Per-turn context (catalog sections for this message) goes after the
+    history. Anthropic and Gemini send system text ahead of every message,
+    where it would change the cached prefix each turn; as part of the user
+    turn it leaves the static prompt, summary and earlier turns cacheable.
+    The first message (the static system prompt) is never folded.
+    """
+    if not messages or messages[-1]["role"] != "user":
+        return messages
+    start = len(messages) - 1
+    while start > 1 and messages[start - 1]["role"] == "system":
+        start -= 1
+    if start == len(messages) - 1:
+        return messages
+    content = "\n\n".join(msg["content"] for msg in messages[start:])
+    return messages[:start] + [{"role": "user", "content": content}]
+
+
+def _build_http_client() -> httpx.AsyncClient:
+    """Create a keep-alive HTTP client sized from settings.
+
+    HTTP/2 is used when enabled and the ``h2`` package is installed,
+    otherwise the pool falls back to HTTP/1.1 keep-alive connections.
+    """
+    http2 = settings.ai_http2 and importlib.util.find_spec("h2") is not None
+    limits = httpx.Limits(
+        max_connections=settings.ai_pool_max_connections,
+        max_keepalive_connections=settings.ai_pool_max_keepalive,
+        keepalive_expiry=settings.ai_pool_keepalive_expiry,
+    )
+    return httpx.AsyncClient(
+        timeout=settings.chat_timeout_seconds,
+        limits=limits,
+        http2=http2,
+        event_hooks={"response": [_on_response]},
+    )
+
+
+class BaseAIClient:
+    """Common connection handling for provider clients.
+
+    Each client owns one pooled ``httpx.AsyncClient`` that is reused across
+    requests, so DNS, TCP and TLS setup is paid once per connection rather
+    than once per chat turn.
+    """
+
+    provider = "base"
+
+    def __init__(self):
+        self._http: Optional[httpx.AsyncClient] = None
+        self.breaker = CircuitBreaker(
+            self.provider,
+            failure_threshold=settings.ai_breaker_failure_threshold,
+            reset_timeout=settings.ai_breaker_reset_timeout,
+        )
+        self.limiter = AdaptiveLimiter(
+            self.provider,
+            initial_limit=settings.ai_concurrency_initial,
+            min_limit=settings.ai_concurrency_min,
+            max_limit=settings.ai_concurrency_max,
+            max_queue=settings.ai_queue_max,
+        )
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """Pooled HTTP client, created lazily if the registry was not started."""
+        if self._http is None or self._http.is_closed:
+            self._http = _build_http_client()
+        return self._http
+
+    async def aclose(self):
+        """Close the underlying connection pool."""
+        if self._http is not None and not self._http.is_closed:
+            await self._http.aclose()
+        self._http = None
+
+    async def _acquire_slot(self, timeout: Optional[float]) -> float:
+        """Pass the circuit breaker and wait for a concurrency slot.
+
+        Returns the time spent queueing. Raises CircuitOpenError or
+        AIClientOverloadedError without taking either resource.
+        """
+        self.breaker.acquire()
+        max_wait = settings.ai_queue_max_wait if timeout is None else min(settings.ai_queue_max_wait, timeout)
+        start = time.perf_counter()
+        try:
+            await self.limiter.acquire(max_wait)
+        except LimiterRejected as e:
+            self.breaker.release()
+            raise AIClientOverloadedError(str(e))
+        except BaseException:
+            self.breaker.release()
+            raise
+        return time.perf_counter() - start
+
+    async def generate(
+        self, messages: list, model: str, timeout: Optional[float] = None, max_tokens: Optional[int] = None
+    ) -> str:
+        """Generate a full reply through the circuit breaker and concurrency limiter.
+
+        ``timeout`` covers queueing and the request and is shortened to the
+        request deadline; expiry counts as a failure and raises
+        AIClientError. ``max_tokens`` caps the reply (default
+        ``settings.ai_max_tokens``).
+        """
+        max_tokens = max_tokens or settings.ai_max_tokens
+        timeout = bound_timeout(timeout)
+        waited = await self._acquire_slot(timeout)
+        if timeout is not None:
+            timeout = max(0.0, timeout - waited)
+        start = time.perf_counter()
+        latency = None
+        overloaded = False
+        try:
+            if timeout is None:
+                text = await self._generate(messages, model, max_tokens)
+            else:
+                text = await asyncio.wait_for(self._generate(messages, model, max_tokens), timeout)
+        except asyncio.TimeoutError:
+            overloaded = True
+            self.breaker.record_failure()
+            raise AIClientError(f"{self.provider} request timed out after {timeout:.1f}s")
+        except AIClientConfigError:
+            self.breaker.release()
+            raise
+        except Exception as e:
+            if is_provider_failure(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.release()
+            raise
+        except BaseException:
+            self.breaker.release()
+            raise
+        else:
+            latency = time.perf_counter() - start
+            self.breaker.record_success()
+        finally:
+            self.limiter.release(latency, overloaded)
+        return text
+
+    async def generate_stream(
+        self,
+        messages: list,
+        model: str,
+        first_token_timeout: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+    ) -> AsyncIterator[str]:
+        """Stream reply deltas through the circuit breaker and concurrency limiter.
+
+        The concurrency slot is held until the stream ends.
+        ``first_token_timeout`` bounds queueing plus the wait for the first
+        delta and is shortened to the request deadline; expiry counts as a
+        failure and raises AIClientError.
+        """
+        max_tokens = max_tokens or settings.ai_max_tokens
+        first_token_timeout = bound_timeout(first_token_timeout)
+        waited = await self._acquire_slot(first_token_timeout)
+        if first_token_timeout is not None:
+            first_token_timeout = max(0.0, first_token_timeout - waited)
+        start = time.perf_counter()
+        overloaded = False
+        succeeded = False
+        stream = self._generate_stream(messages, model, max_tokens)
+        try:
+            try:
+                first = await asyncio.wait_for(stream.__anext__(), first_token_timeout)
+            except StopAsyncIteration:
+                succeeded = True
+                self.breaker.record_success()
+                return
+            yield first
+            async for delta in stream:
+                yield delta
+        except asyncio.TimeoutError:
+            overloaded = True
+            self.breaker.record_failure()
+            raise AIClientError(f"{self.provider} stream produced no tokens within {first_token_timeout:.1f}s")
+        except AIClientConfigError:
+            self.breaker.release()
+            raise
+        except Exception as e:
+            if is_provider_failure(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.release()
+            raise
+        except BaseException:
+            # Consumer stopped early or the task was cancelled: no verdict
+            self.breaker.release()
+            raise
+        else:
+            succeeded = True
+            self.breaker.record_success()
+        finally:
+            await stream.aclose()
+            self.limiter.release(time.perf_counter() - start if succeeded else None, overloaded)
+
+    async def _post(self, url: str, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """POST with jittered retries on 429/503, honouring ``Retry-After``."""
+        for attempt in range(settings.ai_retry_max_attempts + 1):
+            response = await self.http.post(url, json=payload, headers=headers)
+            delay = self._retry_delay(response, attempt)
+            if delay is None:
+                response.raise_for_status()
+                return response
+            await asyncio.sleep(delay)
+
+    def _retry_delay(self, response: httpx.Response, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying a throttled response, or None to give up."""
+        if response.status_code not in (429, 503):
+            return None
+        self.limiter.record_overload()
+        metrics.increment("ai_throttled", provider=self.provider, status=response.status_code)
+        if attempt >= settings.ai_retry_max_attempts:
+            return None
+        retry_after = response.headers.get("retry-after")
+        try:
+            base = float(retry_after) if retry_after is not None else 0.5 * 2 ** attempt
+        except ValueError:
+            base = 0.5 * 2 ** attempt
+        if base > settings.ai_retry_max_delay:
+            return None
+        return base + random.uniform(0, base * 0.25 + 0.1)
+
+    def _record_usage(
+        self,
+        model: str,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        cache_read_tokens: int = 0,
+        cache_write_tokens: int = 0,
+    ):
+        """Record token usage reported by the provider, including prompt-cache reads/writes."""
+        for kind, value in (
+            ("input", input_tokens),
+            ("output", output_tokens),
+            ("cache_read", cache_read_tokens),
+            ("cache_write", cache_write_tokens),
+        ):
+            if value:
+                metrics.increment("llm_tokens", value, provider=self.provider, model=model, kind=kind)
+        cost = estimate_cost(model, input_tokens + cache_read_tokens + cache_write_tokens, output_tokens)
+        if cost:
+            metrics.increment("llm_cost_usd", cost, provider=self.provider, model=model)
+
+    async def _generate(self, messages: list, model: str, max_tokens: int) -> str:
+        raise NotImplementedError
+
+    async def _generate_stream(self, messages: list, model: str, max_tokens: int) -> AsyncIterator[str]:
+        raise NotImplementedError
+        yield  # pragma: no cover
+
+    async def _stream_events(
+        self, url: str, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """POST a streaming request and yield each server-sent ``data:`` event as JSON."""
+        for attempt in range(settings.ai_retry_max_attempts + 1):
+            async with self.http.stream("POST", url, json=payload, headers=headers) as response:
+                delay = self._retry_delay(response, attempt)
+                if delay is None:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[len("data:"):].strip()
+                        if not data or data == "[DONE]":
+                            continue
+                        yield json.loads(data)
+                    return
+            await asyncio.sleep(delay)
+
+
+class AnthropicClient(BaseAIClient):
     """Client for Anthropic Claude API."""
 
+    provider = "anthropic"
+
     def __init__(self):
+        super().__init__()
         self.api_key = settings.anthropic_api_key
-        self.base_url = "https://api.anthropic.com/v1/messages"
+        self.base_url = f"{settings.anthropic_base_url.rstrip('/')}/messages"
 
-    async def generate(self, messages: list, model: str = "claude-sonnet") -> str:
-        """Generate response from Claude."""
+    def _build_request(self, messages: list, model: str, max_tokens: int) -> Tuple[Dict[str, str], Dict[str, Any]]:
+        """Build headers and payload for the Messages API."""
         if not self.api_key:
-            raise AIClientError("Anthropic API key not configured")
+            raise AIClientConfigError("Anthropic API key not configured")
         
         headers = {
             "x-api-key": self.api_key,
@@ -31,46 +433,111 @@ class AnthropicClient:
             "anthropic-version": "2023-06-01"
         }
         
-        # Extract system message
-        system_prompt = None
+        # Extract system messages. The first one is the static prompt and
+        # gets a cache breakpoint; the summary follows it. Per-turn context
+        # travels with the user message.
+        system_blocks = []
         filtered_messages = []
-        for msg in messages:
+        for msg in fold_turn_context(messages):
             if msg["role"] == "system":
-                system_prompt = msg["content"]
+                system_blocks.append({"type": "text", "text": msg["content"]})
             else:
-                filtered_messages.append(msg)
+                filtered_messages.append(dict(msg))
+        if system_blocks:
+            system_blocks[0]["cache_control"] = {"type": "ephemeral"}
+        
+        # Second breakpoint at the end of the prior conversation so each
+        # turn of a multi-turn session reads the previous turns from cache
+        if len(filtered_messages) > 1:
+            previous = filtered_messages[-2]
+            previous["content"] = [{
+                "type": "text",
+                "text": previous["content"],
+                "cache_control": {"type": "ephemeral"},
+            }]
         
         payload = {
             "model": model,
-            "max_tokens": 1000,
+            "max_tokens": max_tokens,
             "messages": filtered_messages
         }
         
-        if system_prompt:
-            payload["system"] = system_prompt
+        if system_blocks:
+            payload["system"] = system_blocks
+        
+        return headers, payload
+
+    def _record_anthropic_usage(self, model: str, usage: Dict[str, Any]):
+        self._record_usage(
+            model,
+            input_tokens=usage.get("input_tokens") or 0,
+            output_tokens=usage.get("output_tokens") or 0,
+            cache_read_tokens=usage.get("cache_read_input_tokens") or 0,
+            cache_write_tokens=usage.get("cache_creation_input_tokens") or 0,
+        )
+
+    async def _generate(self, messages: list, model: str, max_tokens: int) -> str:
+        """Generate response from Claude."""
+        headers, payload = self._build_request(messages, model, max_tokens)
         
         try:
-            async with httpx.AsyncClient(timeout=30) as client:
-                response = await client.post(self.base_url, json=payload, headers=headers)
-                response.raise_for_status()
-                data = response.json()
-                return data["content"][0]["text"]
+            response = await self._post(self.base_url, payload, headers)
+            data = response.json()
+            self._record_anthropic_usage(model, data.get("usage", {}))
+            return data["content"][0]["text"]
         except Exception as e:
             logger.error(f"Anthropic API error: {e}")
             raise AIClientError(f"Anthropic API error: {e}")
 
+    async def _generate_stream(self, messages: list, model: str, max_tokens: int) -> AsyncIterator[str]:
+        """Stream response text deltas from Claude."""
+        headers, payload = self._build_request(messages, model, max_tokens)
+        payload["stream"] = True
+        
+        try:
+            async for event in self._stream_events(self.base_url, payload, headers):
+                if event.get("type") == "content_block_delta":
+                    text = event.get("delta", {}).get("text")
+                    if text:
+                        yield text
+                elif event.get("type") == "message_start":
+                    # Input and cache tokens only: output is counted from the
+                    # cumulative total in message_delta
+                    usage = event.get("message", {}).get("usage", {})
+                    self._record_anthropic_usage(model, {**usage, "output_tokens": 0})
+                elif event.get("type") == "message_delta":
+                    self._record_usage(model, output_tokens=event.get("usage", {}).get("output_tokens") or 0)
+                elif event.get("type") == "error":
+                    raise AIClientError(event.get("error", {}).get("message", "stream error"))
+        except Exception as e:
+            logger.error(f"Anthropic streaming error: {e}")
+            raise AIClientError(f"Anthropic API error: {e}")
+
+
+class OpenAIClient(BaseAIClient):
+    """Client for OpenAI GPT API.
+
+    OpenAI caches prompt prefixes automatically. Callers keep the static
+    system prompt as the first message, and the client adds a
+    ``prompt_cache_key`` derived from it so requests that share the prefix
+    are routed to the same cache.
+    """
 
-class OpenAIClient:
-    """Client for OpenAI GPT API."""
+    provider = "openai"
+    # Name used in error messages and logs
+    label = "OpenAI"
+    supports_cache_key = True
+    supports_stream_usage = True
 
     def __init__(self):
+        super().__init__()
         self.api_key = settings.openai_api_key
-        self.base_url = "https://api.openai.com/v1/chat/completions"
+        self.base_url = f"{settings.openai_base_url.rstrip('/')}/chat/completions"
 
-    async def generate(self, messages: list, model: str = "gpt-4o") -> str:
-        """Generate response from GPT."""
+    def _build_request(self, messages: list, model: str, max_tokens: int) -> Tuple[Dict[str, str], Dict[str, Any]]:
+        """Build headers and payload for the Chat Completions API."""
         if not self.api_key:
-            raise AIClientError("OpenAI API key not configured")
+            raise AIClientConfigError(f"{self.label} API key not configured")
         
         headers = {
             "authorization": f"Bearer {self.api_key}",
@@ -79,110 +546,246 @@ class OpenAIClient:
         
         payload = {
             "model": model,
-            "max_tokens": 1000,
+            "max_tokens": max_tokens,
             "messages": messages
         }
         
+        if self.supports_cache_key and messages and messages[0]["role"] == "system":
+            prefix = messages[0]["content"].encode("utf-8")
+            payload["prompt_cache_key"] = hashlib.sha256(prefix).hexdigest()[:16]
+        
+        return headers, payload
+
+    def _record_openai_usage(self, model: str, usage: Optional[Dict[str, Any]]):
+        if not usage:
+            return
+        details = usage.get("prompt_tokens_details") or {}
+        cached = details.get("cached_tokens") or 0
+        self._record_usage(
+            model,
+            input_tokens=(usage.get("prompt_tokens") or 0) - cached,
+            output_tokens=usage.get("completion_tokens") or 0,
+            cache_read_tokens=cached,
+        )
+
+    async def _generate(self, messages: list, model: str, max_tokens: int) -> str:
+        """Generate response from GPT."""
+        headers, payload = self._build_request(messages, model, max_tokens)
+        
         try:
-            async with httpx.AsyncClient(timeout=30) as client:
-                response = await client.post(self.base_url, json=payload, headers=headers)
-                response.raise_for_status()
-                data = response.json()
-                return data["choices"][0]["message"]["content"]
+            response = await self._post(self.base_url, payload, headers)
+            data = response.json()
+            self._record_openai_usage(model, data.get("usage"))
+            return data["choices"][0]["message"]["content"]
         except Exception as e:
-            logger.error(f"OpenAI API error: {e}")
-            raise AIClientError(f"OpenAI API error: {e}")
+            logger.error(f"{self.label} API error: {e}")
+            raise AIClientError(f"{self.label} API error: {e}")
+
+    async def _generate_stream(self, messages: list, model: str, max_tokens: int) -> AsyncIterator[str]:
+        """Stream response text deltas from GPT."""
+        headers, payload = self._build_request(messages, model, max_tokens)
+        payload["stream"] = True
+        if self.supports_stream_usage:
+            payload["stream_options"] = {"include_usage": True}
+        
+        try:
+            async for event in self._stream_events(self.base_url, payload, headers):
+                self._record_openai_usage(model, event.get("usage"))
+                choices = event.get("choices") or [{}]
+                text = choices[0].get("delta", {}).get("content")
+                if text:
+                    yield text
+        except Exception as e:
+            logger.error(f"{self.label} streaming error: {e}")
+            raise AIClientError(f"{self.label} API error: {e}")
 
 
-class GeminiClient:
+class GeminiClient(BaseAIClient):
     """Client for Google Gemini API."""
 
+    provider = "gemini"
+
     def __init__(self):
+        super().__init__()
         self.api_key = settings.google_api_key
-        self.base_url = "https://generativelanguage.googleapis.com/v1beta/models"
+        self.base_url = f"{settings.gemini_base_url.rstrip('/')}/models"
 
-    async def generate(self, messages: list, model: str = "gemini-1.5-flash") -> str:
-        """Generate response from Gemini."""
+    def _build_payload(self, messages: list, max_tokens: int) -> Dict[str, Any]:
+        """Convert chat messages to a generateContent payload."""
         if not self.api_key:
-            raise AIClientError("Google API key not configured")
+            raise AIClientConfigError("Google API key not configured")
         
         # Convert messages to Gemini format
         contents = []
-        system_instruction = None
+        system_parts = []
         
-        for msg in messages:
+        for msg in fold_turn_context(messages):
             if msg["role"] == "system":
-                system_instruction = {"parts": [{"text": msg["content"]}]}
+                system_parts.append({"text": msg["content"]})
             else:
                 role = "user" if msg["role"] == "user" else "model"
                 contents.append({"role": role, "parts": [{"text": msg["content"]}]})
         
-        url = f"{self.base_url}/{model}:generateContent?key={self.api_key}"
+        payload = {"contents": contents, "generationConfig": {"maxOutputTokens": max_tokens}}
+        if system_parts:
+            payload["system_instruction"] = {"parts": system_parts}
         
-        payload = {"contents": contents}
-        if system_instruction:
-            payload["system_instruction"] = system_instruction
+        return payload
+
+    def _record_gemini_usage(self, model: str, usage: Optional[Dict[str, Any]]):
+        if not usage:
+            return
+        cached = usage.get("cachedContentTokenCount") or 0
+        self._record_usage(
+            model,
+            input_tokens=(usage.get("promptTokenCount") or 0) - cached,
+            output_tokens=usage.get("candidatesTokenCount") or 0,
+            cache_read_tokens=cached,
+        )
+
+    async def _generate(self, messages: list, model: str, max_tokens: int) -> str:
+        """Generate response from Gemini."""
+        payload = self._build_payload(messages, max_tokens)
+        url = f"{self.base_url}/{model}:generateContent?key={self.api_key}"
         
         try:
-            async with httpx.AsyncClient(timeout=30) as client:
-                response = await client.post(url, json=payload)
-                response.raise_for_status()
-                data = response.json()
-                return data["candidates"][0]["content"]["parts"][0]["text"]
+            response = await self._post(url, payload)
+            data = response.json()
+            self._record_gemini_usage(model, data.get("usageMetadata"))
+            return data["candidates"][0]["content"]["parts"][0]["text"]
         except Exception as e:
             logger.error(f"Gemini API error: {e}")
             raise AIClientError(f"Gemini API error: {e}")
 
+    async def _generate_stream(self, messages: list, model: str, max_tokens: int) -> AsyncIterator[str]:
+        """Stream response text deltas from Gemini."""
+        payload = self._build_payload(messages, max_tokens)
+        url = f"{self.base_url}/{model}:streamGenerateContent?alt=sse&key={self.api_key}"
+        
+        try:
+            async for event in self._stream_events(url, payload):
+                # usageMetadata is cumulative; record it once, on the final chunk
+                if (event.get("candidates") or [{}])[0].get("finishReason"):
+                    self._record_gemini_usage(model, event.get("usageMetadata"))
+                for candidate in event.get("candidates", [])[:1]:
+                    for part in candidate.get("content", {}).get("parts", []):
+                        if part.get("text"):
+                            yield part["text"]
+        except Exception as e:
+            logger.error(f"Gemini streaming error: {e}")
+            raise AIClientError(f"Gemini API error: {e}")
 
-class EmergentClient:
-    """Client for EmergentIntegrations unified API."""
+
+class EmergentClient(OpenAIClient):
+    """Client for EmergentIntegrations unified API (OpenAI-compatible)."""
+
+    provider = "emergent"
+    label = "Emergent"
+    supports_cache_key = False
+    supports_stream_usage = False
 
     def __init__(self):
+        super().__init__()
         self.api_key = settings.emergent_llm_key
-        self.base_url = "https://api.emergentagent.com/v1/chat/completions"
+        self.base_url = f"{settings.emergent_base_url.rstrip('/')}/chat/completions"
 
-    async def generate(self, messages: list, model: str = "claude-sonnet") -> str:
-        """Generate response using EmergentIntegrations."""
-        if not self.api_key:
-            raise AIClientError("Emergent LLM key not configured")
-        
-        headers = {
-            "authorization": f"Bearer {self.api_key}",
-            "content-type": "application/json"
-        }
-        
-        payload = {
-            "model": model,
-            "max_tokens": 1000,
-            "messages": messages
-        }
-        
-        try:
-            async with httpx.AsyncClient(timeout=30) as client:
-                response = await client.post(self.base_url, json=payload, headers=headers)
-                response.raise_for_status()
-                data = response.json()
-                return data["choices"][0]["message"]["content"]
-        except Exception as e:
-            logger.error(f"Emergent API error: {e}")
-            raise AIClientError(f"Emergent API error: {e}")
+
+class AIClientRegistry:
+    """Process-wide registry of long-lived provider clients.
+
+    Started from the application lifespan so connection pools are warm
+    before the first request, and closed on shutdown. Clients are still
+    created on demand if the registry is used without being started
+    (tests, scripts).
+    """
+
+    _client_classes = {
+        "anthropic": AnthropicClient,
+        "openai": OpenAIClient,
+        "gemini": GeminiClient,
+        "emergent": EmergentClient,
+    }
+
+    def __init__(self):
+        self._clients: Dict[str, BaseAIClient] = {}
+
+    def start(self):
+        """Instantiate every provider client and its connection pool."""
+        for provider in self._client_classes:
+            self.get(provider).http
+        logger.info(f"AI client registry started ({', '.join(self._clients)})")
+
+    def get(self, provider: str) -> BaseAIClient:
+        """Return the shared client for a provider."""
+        client = self._clients.get(provider)
+        if client is None:
+            client = self._client_classes[provider]()
+            self._clients[provider] = client
+        return client
+
+    async def close(self):
+        """Close all connection pools."""
+        for client in self._clients.values():
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.error(f"Failed to close {client.provider} client: {e}")
+        self._clients.clear()
+        logger.info("AI client registry closed")
+
+    def breaker_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Circuit breaker state for every provider."""
+        return {provider: self.get(provider).breaker.snapshot() for provider in self._client_classes}
+
+    def limiter_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Concurrency limiter state for every provider."""
+        return {provider: self.get(provider).limiter.snapshot() for provider in self._client_classes}
+
+
+def model_price(model: str) -> Optional[Tuple[float, float]]:
+    """USD per million ``(input, output)`` tokens from ``settings.ai_model_prices``.
+
+    The longest configured name that ``model`` starts with wins, so
+    "gpt-4o" does not price "gpt-4o-mini".
+    """
+    names = [name for name in settings.ai_model_prices if model.startswith(name)]
+    if not names:
+        return None
+    input_price, output_price = settings.ai_model_prices[max(names, key=len)]
+    return input_price, output_price
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int) -> float:
+    """Estimated USD cost of a call (0 for models without a configured price)."""
+    price = model_price(model)
+    if price is None:
+        return 0.0
+    return (input_tokens * price[0] + output_tokens * price[1]) / 1_000_000
+
+
+def provider_for_model(model: str) -> str:
+    """Map a model name to its provider key."""
+    if model.startswith("claude"):
+        return "anthropic"
+    elif model.startswith("gpt"):
+        return "openai"
+    elif model.startswith("gemini"):
+        return "gemini"
+    # Default to Emergent for unified access
+    return "emergent"
 
 
 def get_ai_client(model: str) -> Any:
-    """Factory function to get appropriate AI client.
-    
+    """Return the shared client for a model.
+
     Supported models:
     - claude-* -> AnthropicClient
     - gpt-* (including gpt-4o-mini) -> OpenAIClient  
     - gemini-* -> GeminiClient
     - others -> EmergentClient (fallback)
     """
-    if model.startswith("claude"):
-        return AnthropicClient()
-    elif model.startswith("gpt"):
-        return OpenAIClient()
-    elif model.startswith("gemini"):
-        return GeminiClient()
-    else:
-        # Default to Emergent for unified access
-        return EmergentClient()
+    return ai_registry.get(provider_for_model(model))
+
+
+# Global AI client registry
+ai_registry = AIClientRegistry()
@@ -0,0 +1,354 @@
+"""Latency-aware routing across AI providers with failover and hedging."""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple
+from config.settings import settings
+from utils.ai_clients import (
+    AIClientError,
+    AIClientOverloadedError,
+    CircuitOpenError,
+    ai_registry,
+    provider_for_model,
+)
+from utils.deadline import bound_timeout
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Rejected before any request was sent: says nothing about route health
+SHED_ERRORS = (CircuitOpenError, AIClientOverloadedError)
+
+
+class RouteStats:
+    """Rolling latency and error statistics for one provider/model route.
+
+    The error rate is an EWMA over calls that also halves every
+    ``error_half_life`` seconds without calls. Otherwise a route ranked
+    last as unhealthy would get no more traffic and stay unhealthy
+    forever; this way it is tried again once its failures are old.
+    """
+
+    def __init__(self, alpha: float, window: int = 100, error_half_life: Optional[float] = None):
+        self.alpha = alpha
+        self.error_half_life = error_half_life
+        self.ewma_latency: Optional[float] = None
+        self._error_rate = 0.0
+        self._error_updated = time.monotonic()
+        self.requests = 0
+        self.failures = 0
+        self.latencies: Deque[float] = deque(maxlen=window)
+
+    def record_success(self, latency: Optional[float] = None):
+        """Count a successful call and fold its latency (when timed) into the averages."""
+        self.requests += 1
+        self._update_error_rate(0.0)
+        if latency is not None:
+            self.record_latency(latency)
+
+    def record_latency(self, latency: float):
+        self.latencies.append(latency)
+        if self.ewma_latency is None:
+            self.ewma_latency = latency
+        else:
+            self.ewma_latency = self.alpha * latency + (1 - self.alpha) * self.ewma_latency
+
+    def record_failure(self):
+        """Count a failed or timed-out call."""
+        self.requests += 1
+        self.failures += 1
+        self._update_error_rate(1.0)
+
+    @property
+    def error_rate(self) -> float:
+        if not self.error_half_life:
+            return self._error_rate
+        idle = time.monotonic() - self._error_updated
+        return self._error_rate * 0.5 ** (idle / self.error_half_life)
+
+    def _update_error_rate(self, outcome: float):
+        self._error_rate = self.alpha * outcome + (1 - self.alpha) * self.error_rate
+        self._error_updated = time.monotonic()
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Latency percentile over the recent window."""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[index]
+
+    def latency_dict(self) -> Dict[str, object]:
+        p95 = self.percentile(0.95)
+        return {
+            "ewma_latency_ms": round(self.ewma_latency * 1000, 1) if self.ewma_latency is not None else None,
+            "p95_latency_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            **self.latency_dict(),
+            "error_rate": round(self.error_rate, 3),
+            "requests": self.requests,
+            "failures": self.failures,
+        }
+
+
+class Route:
+    """A provider/model pair the router can send requests to.
+
+    ``stats`` holds full-completion latency and the route's error rate;
+    ``first_token_stats`` only the time to first token of streams, which
+    streams are ranked on.
+    """
+
+    def __init__(self, provider: str, model: str):
+        self.provider = provider
+        self.model = model
+        self.stats = RouteStats(settings.ai_route_ewma_alpha, error_half_life=settings.ai_route_error_half_life)
+        self.first_token_stats = RouteStats(settings.ai_route_ewma_alpha)
+
+    @classmethod
+    def parse(cls, spec: str) -> "Route":
+        """Parse ``provider:model``; a bare model name infers its provider."""
+        if ":" in spec:
+            provider, model = spec.split(":", 1)
+        else:
+            provider, model = provider_for_model(spec), spec
+        return cls(provider.strip(), model.strip())
+
+    @property
+    def name(self) -> str:
+        return f"{self.provider}:{self.model}"
+
+    @property
+    def client(self):
+        return ai_registry.get(self.provider)
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.client.api_key)
+
+    @property
+    def available(self) -> bool:
+        """Configured and not short-circuited by the provider's breaker."""
+        return self.configured and self.client.breaker.allows_request()
+
+    @property
+    def healthy(self) -> bool:
+        return self.stats.error_rate < settings.ai_route_max_error_rate
+
+
+class AIRouter:
+    """Send each request to the fastest healthy route, failing over on errors.
+
+    Routes are ranked by EWMA latency among healthy routes that have been
+    measured, then untried routes in configured order, then unhealthy
+    routes. Failures move on to the next route while the total time budget
+    lasts. With hedging enabled, a second route is started if the first has
+    not answered within its p95 latency, and the first reply wins.
+
+    ``tier`` labels the router's latency metrics when several model tiers
+    are routed separately.
+    """
+
+    def __init__(self, specs: Optional[List[str]] = None, tier: str = "default"):
+        self.routes = [Route.parse(spec) for spec in (specs or settings.ai_routes)]
+        self.tier = tier
+
+    @property
+    def primary_model(self) -> Optional[str]:
+        """Model the next request will most likely be sent to."""
+        routes = self.ranked_routes() or self.routes
+        return routes[0].model if routes else None
+
+    def ranked_routes(self, first_token: bool = False) -> List[Route]:
+        """Available routes ordered by preference; open circuits are skipped.
+
+        ``first_token`` ranks by time to first token (for streams) instead
+        of full-completion latency.
+        """
+        candidates = [route for route in self.routes if route.available]
+
+        def rank(item: Tuple[int, Route]):
+            index, route = item
+            if not route.healthy:
+                return (2, route.stats.error_rate, index)
+            latency = (route.first_token_stats if first_token else route.stats).ewma_latency
+            if latency is None:
+                return (1, 0.0, index)
+            return (0, latency, index)
+
+        return [route for _, route in sorted(enumerate(candidates), key=rank)]
+
+    def _hedge_delay(self, route: Route) -> Optional[float]:
+        if not settings.ai_route_hedge_enabled:
+            return None
+        p95 = route.stats.percentile(0.95)
+        if p95 is None:
+            return None
+        return max(settings.ai_route_hedge_min_delay, p95)
+
+    async def _attempt(self, route: Route, messages: list, timeout: float, max_tokens: Optional[int]) -> str:
+        start = time.perf_counter()
+        try:
+            text = await route.client.generate(messages, route.model, timeout=timeout, max_tokens=max_tokens)
+        except (asyncio.CancelledError, *SHED_ERRORS):
+            # Lost a hedge race, the caller went away or the breaker or
+            # limiter rejected the call: no new information about the route
+            raise
+        except Exception:
+            route.stats.record_failure()
+            metrics.increment("llm_route_errors", route=route.name, tier=self.tier)
+            raise
+        latency = time.perf_counter() - start
+        route.stats.record_success(latency)
+        metrics.observe("llm_route_ms", latency * 1000, route=route.name, tier=self.tier)
+        return text
+
+    async def generate(self, messages: list, max_tokens: Optional[int] = None) -> Tuple[str, str]:
+        """Generate a reply, returning ``(text, model)``.
+
+        ``max_tokens`` caps the reply length (client default when None).
+        Raises AIClientError when every route failed or the budget ran out.
+        """
+        routes = self.ranked_routes()
+        if not routes:
+            raise AIClientError("No AI providers configured")
+
+        loop = asyncio.get_running_loop()
+        # The request deadline, when one is set, can only shorten the budget
+        deadline = loop.time() + bound_timeout(settings.ai_route_total_budget)
+        pending: Dict[asyncio.Task, Route] = {}
+        errors: List[str] = []
+        next_index = 0
+        hedged = False
+
+        def launch():
+            nonlocal next_index
+            route = routes[next_index]
+            next_index += 1
+            timeout = min(settings.ai_route_attempt_timeout, max(0.0, deadline - loop.time()))
+            task = asyncio.create_task(self._attempt(route, messages, timeout, max_tokens))
+            pending[task] = route
+
+        launch()
+        try:
+            while pending:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    errors.append("time budget exhausted")
+                    break
+
+                wait_for = remaining
+                hedge_delay = None
+                if not hedged and len(pending) == 1 and next_index < len(routes):
+                    hedge_delay = self._hedge_delay(next(iter(pending.values())))
+                    if hedge_delay is not None:
+                        wait_for = min(wait_for, hedge_delay)
+
+                done, _ = await asyncio.wait(
+                    pending, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    if hedge_delay is not None and wait_for == hedge_delay:
+                        hedged = True
+                        logger.info(f"Hedging after {hedge_delay:.2f}s with {routes[next_index].name}")
+                        launch()
+                    continue
+
+                for task in done:
+                    route = pending.pop(task)
+                    exc = task.exception()
+                    if exc is None:
+                        logger.info(f"Routed request to {route.name}")
+                        return task.result(), route.model
+                    errors.append(f"{route.name}: {str(exc) or type(exc).__name__}")
+                    logger.warning(f"AI route {route.name} failed: {exc!r}")
+
+                if not pending and next_index < len(routes):
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        raise AIClientError(f"All AI routes failed: {'; '.join(errors)}")
+
+    async def generate_stream(
+        self, messages: list, max_tokens: Optional[int] = None
+    ) -> AsyncIterator[Tuple[str, str]]:
+        """Stream a reply as ``(model, delta)`` pairs.
+
+        Failover happens only until the first delta arrives; once text has
+        reached the caller the stream stays on that route.
+        """
+        routes = self.ranked_routes(first_token=True)
+        if not routes:
+            raise AIClientError("No AI providers configured")
+
+        loop = asyncio.get_running_loop()
+        # The request deadline, when one is set, can only shorten the budget
+        deadline = loop.time() + bound_timeout(settings.ai_route_total_budget)
+        errors: List[str] = []
+
+        for route in routes:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                errors.append("time budget exhausted")
+                break
+
+            start = time.perf_counter()
+            stream = route.client.generate_stream(
+                messages, route.model,
+                first_token_timeout=min(settings.ai_route_attempt_timeout, remaining),
+                max_tokens=max_tokens,
+            )
+            try:
+                first = await stream.__anext__()
+            except StopAsyncIteration:
+                route.stats.record_success()
+                return
+            except Exception as e:
+                if not isinstance(e, SHED_ERRORS):
+                    route.stats.record_failure()
+                    metrics.increment("llm_route_errors", route=route.name, tier=self.tier)
+                errors.append(f"{route.name}: {str(e) or type(e).__name__}")
+                logger.warning(f"AI stream route {route.name} failed: {e!r}")
+                await stream.aclose()
+                continue
+
+            # Streams are ranked on time to first token, kept apart from
+            # the full-completion latency of non-streaming calls
+            latency = time.perf_counter() - start
+            route.stats.record_success()
+            route.first_token_stats.record_latency(latency)
+            metrics.observe("llm_route_first_token_ms", latency * 1000, route=route.name, tier=self.tier)
+            logger.info(f"Streaming from {route.name}")
+            try:
+                yield route.model, first
+                async for delta in stream:
+                    yield route.model, delta
+            finally:
+                await stream.aclose()
+            return
+
+        raise AIClientError(f"All AI routes failed: {'; '.join(errors)}")
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        """Per-route configuration and statistics for health reporting."""
+        return {
+            route.name: {
+                "configured": route.configured,
+                "circuit": route.client.breaker.state,
+                "healthy": route.healthy,
+                **route.stats.to_dict(),
+                "first_token": route.first_token_stats.latency_dict(),
+            }
+            for route in self.routes
+        }
+
+
+# Global AI router instance (the default tier for chat and summaries)
+ai_router = AIRouter(tier="rich")
@@ -0,0 +1,128 @@
+"""Small in-process BM25 full-text index with light Russian stemming."""
+
+import math
+import re
+from collections import Counter
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+WORD_RE = re.compile(r"[а-яёa-z0-9]+")
+
+# Noun and adjective inflection endings stripped by ``stem``, longest first.
+# Verb endings are left alone: they collide with noun stems (бюдж-ет, сов-ет).
+RUSSIAN_ENDINGS = sorted(
+    [
+        "иями", "ями", "ами", "иях", "ого", "его", "ому", "ему", "ыми", "ими", "ией",
+        "ой", "ей", "ий", "ый", "ая", "яя", "ое", "ее", "ие", "ые", "ую", "юю", "ам", "ям",
+        "ах", "ях", "ом", "ем", "ов", "ев", "ию", "ия", "ии", "ью",
+        "а", "я", "о", "е", "ы", "и", "у", "ю", "ь", "й",
+    ],
+    key=len,
+    reverse=True,
+)
+
+MIN_STEM_LENGTH = 3
+
+STOP_WORDS = frozenset(
+    "и в во не что он на я с со как а то все она так его но да ты к у же вы за бы по только "
+    "ее мне было вот от меня еще нет о из ему теперь когда даже ну вдруг ли если уже или ни "
+    "быть был него до вас нибудь опять уж вам ведь там потом себя ничего ей может они тут где "
+    "есть надо ней для мы тебя их чем была сам чтоб без будто чего раз тоже себе под будет ж "
+    "тогда кто этот того потому этого какой совсем ним здесь этом один почти мой тем чтобы нее "
+    "сейчас были куда зачем всех никогда можно при наконец два об другой хоть после над больше "
+    "тот через эти нас про всего них какая много разве три эту моя впрочем хорошо свою этой "
+    "перед иногда лучше чуть том нельзя такой им более всегда конечно всю между "
+    "the a an and or of to in is are for on with".split()
+)
+
+
+def stem(word: str) -> str:
+    """Strip one common inflection ending, keeping at least ``MIN_STEM_LENGTH`` letters."""
+    word = word.replace("ё", "е")
+    for ending in RUSSIAN_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM_LENGTH:
+            return word[:-len(ending)]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word stems of ``text`` without stop words."""
+    return [stem(word) for word in WORD_RE.findall(text.lower()) if word not in STOP_WORDS]
+
+
+class BM25Index:
+    """Incrementally updatable BM25 (Okapi) index over short documents.
+
+    Postings map each term to per-document term frequencies, so adding or
+    removing a document only touches its own terms and a query only visits
+    documents that share a term with it.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[Hashable, int]] = {}
+        self.doc_terms: Dict[Hashable, Counter] = {}
+        self.lengths: Dict[Hashable, int] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_terms)
+
+    def __contains__(self, doc_id: Hashable) -> bool:
+        return doc_id in self.doc_terms
+
+    def add(self, doc_id: Hashable, text: str):
+        """Index ``text`` under ``doc_id`` (replacing any previous version)."""
+        self.remove(doc_id)
+        terms = Counter(tokenize(text))
+        self.doc_terms[doc_id] = terms
+        self.lengths[doc_id] = sum(terms.values())
+        self.total_length += self.lengths[doc_id]
+        for term, count in terms.items():
+            self.postings.setdefault(term, {})[doc_id] = count
+
+    def remove(self, doc_id: Hashable):
+        terms = self.doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        self.total_length -= self.lengths.pop(doc_id)
+        for term in terms:
+            docs = self.postings[term]
+            docs.pop(doc_id, None)
+            if not docs:
+                del self.postings[term]
+
+    def search(
+        self,
+        query: str,
+        limit: int,
+        exclude: Iterable[Hashable] = (),
+        min_score: float = 0.0,
+        terms: Optional[List[str]] = None,
+    ) -> List[Tuple[Hashable, float]]:
+        """Best ``limit`` documents for ``query`` as ``(doc_id, score)``, best first.
+
+        ``terms`` may pass an already tokenized query.
+        """
+        if not self.doc_terms:
+            return []
+        excluded = set(exclude)
+        n = len(self.doc_terms)
+        avg_length = self.total_length / n or 1.0
+        scores: Dict[Hashable, float] = {}
+        for term in set(terms if terms is not None else tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, tf in docs.items():
+                if doc_id in excluded:
+                    continue
+                norm = tf + self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+        ranked = sorted(
+            ((doc_id, score) for doc_id, score in scores.items() if score > min_score),
+            key=lambda item: item[1],
+            reverse=True,
+        )
+        return ranked[:limit]
@@ -0,0 +1,137 @@
+"""Adaptive (AIMD) concurrency limiting with a bounded wait queue."""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class LimiterRejected(Exception):
+    """The call was not admitted: queue full or expected wait over the deadline."""
+
+
+class AdaptiveLimiter:
+    """Concurrency limit that adapts to upstream pressure (AIMD).
+
+    Every successful call raises the limit by ``1 / limit``, which is about
+    +1 per round of calls. A 429 or timeout halves it, at most once per
+    ``decrease_interval`` so one burst of errors counts as a single signal.
+    Calls over the limit wait in a FIFO queue of at most ``max_queue``
+    entries. A call is rejected up front when the queue is full or when
+    its expected wait exceeds its deadline, and rejected on expiry when it
+    waited longer than that.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        max_queue: int,
+        decrease_interval: float = 1.0,
+    ):
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.decrease_interval = decrease_interval
+        self.in_flight = 0
+        self.avg_latency: Optional[float] = None
+        self._last_decrease = 0.0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    def _expected_wait(self) -> float:
+        """Rough wait estimate: queued rounds ahead times average call latency."""
+        if self.avg_latency is None:
+            return 0.0
+        rounds = (len(self._waiters) + 1) / max(1, int(self.limit))
+        return rounds * self.avg_latency
+
+    def _publish(self):
+        metrics.set_gauge("ai_concurrency_limit", int(self.limit), provider=self.name)
+        metrics.set_gauge("ai_in_flight", self.in_flight, provider=self.name)
+        metrics.set_gauge("ai_queue_depth", len(self._waiters), provider=self.name)
+
+    def _reject(self, reason: str):
+        metrics.increment("ai_limiter_rejected", provider=self.name, reason=reason)
+        raise LimiterRejected(f"{self.name} limiter rejected call ({reason})")
+
+    async def acquire(self, max_wait: float):
+        """Wait for a slot for at most ``max_wait`` seconds."""
+        start = time.perf_counter()
+        if self._has_capacity() and not self._waiters:
+            self.in_flight += 1
+            self._publish()
+            metrics.observe("ai_queue_wait_ms", 0.0, provider=self.name)
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self._reject("queue_full")
+        if self._expected_wait() > max_wait:
+            self._reject("deadline")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._publish()
+        try:
+            await asyncio.wait_for(waiter, max_wait)
+        except asyncio.TimeoutError:
+            self._reject("timeout")
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Slot was handed over just as we were cancelled: pass it on
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            self._publish()
+        metrics.observe("ai_queue_wait_ms", (time.perf_counter() - start) * 1000, provider=self.name)
+
+    def release(self, latency: Optional[float] = None, overloaded: bool = False):
+        """Free a slot and adapt the limit to the call's outcome."""
+        self.in_flight -= 1
+        if overloaded:
+            self.record_overload()
+        elif latency is not None:
+            self.avg_latency = latency if self.avg_latency is None else 0.8 * self.avg_latency + 0.2 * latency
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        self._wake()
+        self._publish()
+
+    def record_overload(self):
+        """Multiplicative decrease on a 429 / timeout signal."""
+        now = time.monotonic()
+        if now - self._last_decrease < self.decrease_interval:
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_limit, self.limit / 2)
+        metrics.increment("ai_limiter_decreases", provider=self.name)
+        logger.warning(f"{self.name} concurrency limit reduced to {int(self.limit)}")
+
+    def _wake(self):
+        while self._waiters and self._has_capacity():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queue_depth": len(self._waiters),
+        }
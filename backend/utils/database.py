@@ -93,7 +93,7 @@ class DatabaseManager:
 
     async def create_indexes(self):
         """Create database indexes for performance optimization."""
-        if not self.db:
+        if self.db is None:
             logger.warning("Database not connected, skipping index creation")
             return
         
@@ -108,6 +108,24 @@ class DatabaseManager:
                 ("timestamp", -1)
             ], name="timestamp_idx")
             
+            # Context window selection: a range on the running token total,
+            # timestamp ordering turns saved before totals existed
+            await self.db.chat_messages.create_index([
+                ("session_id", 1),
+                ("cum_tokens", -1),
+                ("timestamp", -1)
+            ], name="session_cum_tokens_idx")
+            
+            # Running-total counters: cleanup by activity
+            await self.db.chat_token_counters.create_index([
+                ("updated_at", -1)
+            ], name="counter_updated_idx")
+            
+            # One-document-per-session layout: _id lookups, cleanup by activity
+            await self.db.chat_sessions.create_index([
+                ("updated_at", -1)
+            ], name="session_updated_idx")
+            
             # Contact forms collection indexes
             await self.db.contact_forms.create_index([
                 ("timestamp", -1)
@@ -0,0 +1,99 @@
+"""Per-request deadlines and cancellation when the client goes away.
+
+A request handler opens ``request_deadline(seconds)``; the deadline lives in
+a context variable, so everything awaited inside it (context loading, the
+AI router and clients, saving the turn) and every task created from it sees
+the same absolute monotonic deadline without passing it around. Detached
+work that must outlive the request (summaries) is started with
+``detached_context()``.
+"""
+
+import asyncio
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Iterator, Optional, TypeVar
+from starlette.requests import Request
+
+T = TypeVar("T")
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """The request ran out of time before the step finished."""
+
+
+class ClientDisconnected(Exception):
+    """The client closed the connection; the pending work was cancelled."""
+
+
+@contextmanager
+def request_deadline(seconds: float) -> Iterator[float]:
+    """Set a deadline ``seconds`` from now for the enclosed block.
+
+    A deadline already in effect is never extended.
+    """
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        deadline = min(deadline, current)
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+def time_remaining() -> Optional[float]:
+    """Seconds left before the current deadline (None when there is none)."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def bound_timeout(timeout: Optional[float]) -> Optional[float]:
+    """``timeout`` shortened to the time left before the deadline."""
+    left = time_remaining()
+    if left is None:
+        return timeout
+    return left if timeout is None else min(timeout, left)
+
+
+async def within_deadline(awaitable: Awaitable[T]) -> T:
+    """Await ``awaitable``, cancelling it and raising DeadlineExceeded when time runs out."""
+    left = time_remaining()
+    if left is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, left)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded("request deadline exceeded")
+
+
+def detached_context() -> contextvars.Context:
+    """Copy of the current context without a deadline, for background tasks."""
+    context = contextvars.copy_context()
+    context.run(_deadline.set, None)
+    return context
+
+
+async def cancel_on_disconnect(request: Request, awaitable: Awaitable[T], poll_interval: float) -> T:
+    """Await ``awaitable`` while polling the client connection.
+
+    When ``request.is_disconnected()`` reports the client gone, the work is
+    cancelled and ClientDisconnected is raised.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                raise ClientDisconnected("client disconnected")
+    finally:
+        if not task.done():
+            task.cancel()
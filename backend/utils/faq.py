@@ -0,0 +1,180 @@
+"""Deterministic fast path for frequent questions (prices, timelines, services).
+
+Messages are normalized to word stems and scanned once by an Aho-Corasick
+automaton holding two kinds of patterns: intent phrases from ``INTENTS``
+and service names (section titles and keywords) from the knowledge base
+catalog. A short message with a clear intent and, for prices and
+timelines, a named service is answered from a template built on the
+catalog text, without an LLM call.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+from config.settings import settings
+from utils.aho_corasick import AhoCorasick
+from utils.bm25 import WORD_RE, tokenize
+from utils.knowledge_base import KnowledgeBase, KnowledgeSection, knowledge_base
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Intent -> trigger phrases (normalized with the same stemmer as messages)
+INTENTS: Dict[str, List[str]] = {
+    "pricing": [
+        "цена", "цены", "стоимость", "сколько стоит", "сколько стоят", "сколько будет стоить",
+        "прайс", "расценки", "почем", "по чем",
+    ],
+    # Stopwords are dropped ("за сколько" is just "сколько"), so "сколько"
+    # only counts as a timeline question next to a time word
+    "timeline": [
+        "срок", "сроки", "как долго", "как быстро", "сколько времени", "сколько дней",
+        "сколько недель", "сколько месяцев",
+    ],
+    "services": [
+        "услуги", "ваши услуги", "что вы делаете", "чем занимаетесь", "что умеете",
+        "что предлагаете", "направления", "каталог",
+    ],
+    "greeting": [
+        "привет", "здравствуйте", "здравствуй", "добрый день", "добрый вечер", "доброе утро",
+        "hello", "hi",
+    ],
+    "off_topic": ["погода", "новости", "спорт", "фильмы", "музыка", "политика"],
+}
+
+GREETING_REPLY = (
+    "Привет! 👋 Я AI-консультант NeuroExpert. Помогаю бизнесу расти с помощью технологий — "
+    "сайты, AI-ассистенты, цифровой аудит. Расскажите о вашей задаче?"
+)
+
+OFF_TOPIC_REPLY = (
+    "Интересный вопрос! 😊 Но я больше специализируюсь на digital-решениях для бизнеса. "
+    "Могу рассказать, как сайт или AI-ассистент поможет вашему делу. Хотите узнать подробнее?"
+)
+
+PRICING_REPLY = (
+    "Ориентировочные цены 💰\n\n{sections}\n\n"
+    "Точная стоимость зависит от задачи. Опишите ваш проект — подготовим расчёт бесплатно!"
+)
+
+TIMELINE_REPLY = (
+    "Сроки зависят от объёма работ ⏱\n\n{sections}\n\n"
+    "Точные сроки назовём после короткой бесплатной консультации — оставьте контакт в форме ниже!"
+)
+
+SERVICE_REPLY = "{sections}\n\nХотите обсудить ваш проект? Напишите нам!"
+
+SERVICES_REPLY = (
+    "Вот чем мы можем помочь 🚀\n\n{titles}\n\n"
+    "Расскажите о вашей задаче — подскажу, что подойдёт лучше всего!"
+)
+
+
+class FaqAnswer:
+    """A templated reply and the intent that produced it."""
+
+    def __init__(self, intent: str, text: str):
+        self.intent = intent
+        self.text = text
+
+
+class FaqMatch:
+    """Intents and catalog sections found in a message."""
+
+    def __init__(self, intents: List[str], sections: List[KnowledgeSection], words: int):
+        self.intents = intents
+        self.sections = sections
+        self.words = words
+
+
+class FaqEngine:
+    """Intent + service matcher built from ``INTENTS`` and the knowledge base.
+
+    The automaton is rebuilt whenever the catalog version changes.
+    """
+
+    def __init__(self, kb: KnowledgeBase, max_words: int):
+        self.kb = kb
+        self.max_words = max_words
+        self._automaton: Optional[AhoCorasick] = None
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def _build(self) -> AhoCorasick:
+        automaton = AhoCorasick()
+        for intent, phrases in INTENTS.items():
+            for phrase in phrases:
+                automaton.add(tokenize(phrase), ("intent", intent))
+        for section in self.kb.sections:
+            for name in [section.title] + section.keywords:
+                automaton.add(tokenize(name), ("section", section))
+        automaton.build()
+        return automaton
+
+    def automaton(self) -> AhoCorasick:
+        self.kb.maybe_reload()
+        if self._automaton is None or self._version != self.kb.version:
+            with self._lock:
+                if self._automaton is None or self._version != self.kb.version:
+                    self._automaton = self._build()
+                    self._version = self.kb.version
+        return self._automaton
+
+    def match(self, message: str) -> FaqMatch:
+        """Intents and sections named in ``message`` (longest phrases win on overlap)."""
+        tokens = tokenize(message)
+        found = sorted(self.automaton().find(tokens), key=lambda m: (m[0] - m[1], m[0]))
+        taken = [False] * len(tokens)
+        intents: List[str] = []
+        sections: List[KnowledgeSection] = []
+        for start, end, (kind, value) in found:
+            if any(taken[start:end]):
+                continue
+            taken[start:end] = [True] * (end - start)
+            target = intents if kind == "intent" else sections
+            if value not in target:
+                target.append(value)
+        return FaqMatch(intents, sections, len(WORD_RE.findall(message.lower())))
+
+    def answer(self, message: str, first_turn: bool = True, strict: bool = True) -> Optional[FaqAnswer]:
+        """Templated reply for a high-confidence match, else None.
+
+        ``strict`` requires a short message; the LLM-failure fallback relaxes it.
+        Service overviews and greetings are only given on the first turn,
+        where there is no earlier context they could ignore.
+        """
+        started = time.perf_counter()
+        found = self.match(message)
+        reply = self._reply(found, first_turn) if not strict or found.words <= self.max_words else None
+        metrics.observe("faq_match_ms", (time.perf_counter() - started) * 1000)
+        if reply is not None:
+            metrics.increment("faq_answers", intent=reply.intent)
+        return reply
+
+    def _reply(self, found: FaqMatch, first_turn: bool) -> Optional[FaqAnswer]:
+        intents, sections = found.intents, found.sections[:2]
+        if sections and "pricing" in intents:
+            return FaqAnswer("pricing", PRICING_REPLY.format(sections=self._render(sections)))
+        if sections and "timeline" in intents:
+            return FaqAnswer("timeline", TIMELINE_REPLY.format(sections=self._render(sections)))
+        if sections and "services" in intents:
+            return FaqAnswer("service", SERVICE_REPLY.format(sections=self._render(sections)))
+        if not first_turn or sections:
+            return None
+        if intents == ["services"] or set(intents) == {"services", "greeting"}:
+            titles = "\n".join(f"- {section.title}" for section in self.kb.sections)
+            return FaqAnswer("services", SERVICES_REPLY.format(titles=titles))
+        if intents == ["greeting"]:
+            return FaqAnswer("greeting", GREETING_REPLY)
+        if intents == ["off_topic"]:
+            return FaqAnswer("off_topic", OFF_TOPIC_REPLY)
+        return None
+
+    @staticmethod
+    def _render(sections: List[KnowledgeSection]) -> str:
+        return "\n\n".join(f"**{section.title}**\n{section.body}" for section in sections)
+
+
+# Global FAQ engine over the service catalog
+faq_engine = FaqEngine(knowledge_base, max_words=settings.faq_max_words)
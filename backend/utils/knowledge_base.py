@@ -0,0 +1,179 @@
+"""Service catalog knowledge base: per-turn retrieval of relevant sections.
+
+The catalog is a Markdown file where every ``## Title`` heading starts a
+section. Sections are indexed with BM25 at load time, and each chat turn
+gets only the sections relevant to the user's message instead of the whole
+catalog. The file is re-read when it changes on disk, so the catalog can be
+edited without a restart.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+from config.settings import settings
+from memory.tokenizer import tokenizers
+from utils.bm25 import BM25Index
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+BUNDLED_CATALOG = Path(__file__).parent.parent / "knowledge" / "catalog.md"
+
+KNOWLEDGE_HEADER = "Справка по услугам NeuroExpert (используй цены и условия только отсюда):"
+
+# Section line listing search keywords; it is indexed but not sent to the LLM
+KEYWORDS_PREFIX = "Ключевые слова:"
+
+
+class KnowledgeSection:
+    """One ``## Title`` section of the catalog."""
+
+    def __init__(self, title: str, body: str, keywords: Optional[List[str]] = None):
+        self.title = title
+        self.body = body
+        self.keywords = keywords or []
+
+    @property
+    def text(self) -> str:
+        return f"### {self.title}\n{self.body}"
+
+
+def parse_catalog(text: str) -> List[KnowledgeSection]:
+    """Split catalog Markdown into sections; text before the first heading is ignored."""
+    sections: List[KnowledgeSection] = []
+    title: Optional[str] = None
+    lines: List[str] = []
+    keywords: List[str] = []
+
+    def finish():
+        if title is not None:
+            sections.append(KnowledgeSection(title, "\n".join(lines).strip(), keywords))
+
+    for line in text.splitlines():
+        if line.startswith("## "):
+            finish()
+            title, lines, keywords = line[3:].strip(), [], []
+        elif title is None:
+            continue
+        elif line.startswith(KEYWORDS_PREFIX):
+            keywords = [word.strip() for word in line[len(KEYWORDS_PREFIX):].split(",") if word.strip()]
+        else:
+            lines.append(line)
+    finish()
+    return [section for section in sections if section.body]
+
+
+class KnowledgeBase:
+    """BM25-indexed catalog sections with on-change reload.
+
+    ``lookup`` returns the knowledge system message for a user message: a
+    one-line overview of every section title (so the model knows the whole
+    offering) followed by the full text of the best matching sections.
+    ``version`` changes whenever the catalog content changes and is part of
+    reply cache keys. Token counts for the metrics are taken per section at
+    load time, so lookups never run the tokenizer.
+    """
+
+    def __init__(self, path: Path, top_k: int, min_score: float, reload_interval: float):
+        self.path = Path(path)
+        self.top_k = top_k
+        self.min_score = min_score
+        self.reload_interval = reload_interval
+        self.version = ""
+        self.sections: List[KnowledgeSection] = []
+        self.index = BM25Index()
+        self.section_tokens: List[int] = []
+        self.frame_tokens = 0
+        self._mtime: Optional[float] = None
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def load(self) -> bool:
+        """(Re)build the index from the catalog file; keeps the old one on failure."""
+        try:
+            stat = os.stat(self.path)
+            text = self.path.read_text(encoding="utf-8")
+        except OSError as e:
+            logger.error(f"Failed to read knowledge catalog {self.path}: {e}")
+            return False
+        sections = parse_catalog(text)
+        if not sections:
+            logger.error(f"Knowledge catalog {self.path} has no sections, keeping the previous one")
+            self._mtime = stat.st_mtime
+            return False
+
+        index = BM25Index()
+        for position, section in enumerate(sections):
+            index.add(position, "\n".join([section.title, section.body] + section.keywords))
+        tokenizer = tokenizers.for_model(None)
+        section_tokens = [tokenizer.count(section.text) for section in sections]
+        frame_tokens = tokenizer.count(self._render(sections, []))
+        # Swap everything at once so concurrent lookups see one consistent catalog
+        self.sections, self.index = sections, index
+        self.section_tokens, self.frame_tokens = section_tokens, frame_tokens
+        self.version = hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+        self._mtime = stat.st_mtime
+        metrics.increment("knowledge_reloads")
+        logger.info(f"Knowledge base loaded: {len(sections)} sections, version {self.version}")
+        return True
+
+    def maybe_reload(self):
+        """Reload if the catalog file changed (checked at most every ``reload_interval``)."""
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.reload_interval:
+            return
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < self.reload_interval:
+                return
+            self._checked_at = now
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except OSError:
+                mtime = None
+            if mtime != self._mtime:
+                self.load()
+
+    @property
+    def full_tokens(self) -> int:
+        """Tokens of the whole catalog as one knowledge message."""
+        return self.frame_tokens + sum(self.section_tokens)
+
+    @staticmethod
+    def _render(catalog: List[KnowledgeSection], sections: List[KnowledgeSection]) -> str:
+        """Header, an overview of every title in ``catalog``, then ``sections`` in full."""
+        overview = "Все направления: " + ", ".join(section.title for section in catalog) + "."
+        return "\n\n".join([KNOWLEDGE_HEADER, overview] + [section.text for section in sections])
+
+    def full(self) -> str:
+        """The whole catalog as one knowledge message (retrieval disabled)."""
+        self.maybe_reload()
+        return self._render(self.sections, self.sections) if self.sections else ""
+
+    def lookup(self, message: str) -> str:
+        """Knowledge system message for ``message`` ("" when the catalog is empty)."""
+        self.maybe_reload()
+        if not self.sections:
+            return ""
+        sections, index, section_tokens = self.sections, self.index, self.section_tokens
+        hits = index.search(message, self.top_k, min_score=self.min_score)
+        text = self._render(sections, [sections[position] for position, _ in hits])
+
+        injected = self.frame_tokens + sum(section_tokens[position] for position, _ in hits)
+        metrics.increment("knowledge_lookups")
+        metrics.increment("knowledge_sections_injected", len(hits))
+        metrics.increment("knowledge_prompt_tokens", injected)
+        metrics.increment("knowledge_prompt_tokens_saved", max(0, self.full_tokens - injected))
+        return text
+
+
+# Global knowledge base (loaded on first use and reloaded when the file changes)
+knowledge_base = KnowledgeBase(
+    path=Path(settings.knowledge_catalog_path) if settings.knowledge_catalog_path else BUNDLED_CATALOG,
+    top_k=settings.knowledge_top_k,
+    min_score=settings.knowledge_min_score,
+    reload_interval=settings.knowledge_reload_interval,
+)
@@ -0,0 +1,107 @@
+"""Lightweight in-process metrics (counters, gauges, histograms)."""
+
+import bisect
+from typing import Dict, List, Optional, Tuple
+
+# Default histogram buckets, in milliseconds
+DEFAULT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _series_name(name: str, key: LabelKey) -> str:
+    if not key:
+        return name
+    return name + "{" + ",".join(f"{k}={v}" for k, v in key) + "}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram with count and sum."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS_MS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bucket bound containing the q-quantile (None if empty)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "count": self.count,
+            "sum": round(self.total, 3),
+            "avg": round(self.total / self.count, 3) if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": {str(b): c for b, c in zip(self.buckets + ("+Inf",), self.counts)},
+        }
+
+
+class MetricsRegistry:
+    """Process-wide registry of named, labelled metrics."""
+
+    def __init__(self):
+        self.counters: Dict[str, Dict[LabelKey, float]] = {}
+        self.gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self.histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+
+    def increment(self, name: str, value: float = 1, **labels):
+        series = self.counters.setdefault(name, {})
+        key = _label_key(labels)
+        series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        self.gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        series = self.histograms.setdefault(name, {})
+        key = _label_key(labels)
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram()
+        histogram.observe(value)
+
+    def get_counter(self, name: str, **labels) -> float:
+        return self.counters.get(name, {}).get(_label_key(labels), 0)
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        return {
+            "counters": {
+                _series_name(name, key): value
+                for name, series in self.counters.items()
+                for key, value in series.items()
+            },
+            "gauges": {
+                _series_name(name, key): value
+                for name, series in self.gauges.items()
+                for key, value in series.items()
+            },
+            "histograms": {
+                _series_name(name, key): histogram.to_dict()
+                for name, series in self.histograms.items()
+                for key, histogram in series.items()
+            },
+        }
+
+
+# Global metrics registry
+metrics = MetricsRegistry()
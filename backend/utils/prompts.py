@@ -0,0 +1,85 @@
+"""Versioned prompt templates with precomputed token counts.
+
+Templates are the ``*.md`` files in ``backend/prompts``, loaded once at
+import. Each gets a content hash as its version, and its token count is
+precomputed per model tokenizer during startup, so the chat path knows the
+exact prompt overhead without tokenizing the prompt on every request.
+"""
+
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+from memory.tokenizer import tokenizers
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+PROMPTS_DIR = Path(__file__).parent.parent / "prompts"
+
+
+class PromptTemplate:
+    """An immutable prompt text with its version and per-tokenizer token counts."""
+
+    def __init__(self, name: str, text: str):
+        self.name = name
+        self.text = text
+        self.version = hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+        self._tokens: Dict[str, int] = {}
+
+    def render(self, **values) -> str:
+        """Fill ``{placeholders}``; a template without values is returned as is."""
+        return self.text.format(**values) if values else self.text
+
+    def tokens(self, model: Optional[str] = None) -> int:
+        """Token count of the template text for ``model``'s tokenizer."""
+        tokenizer = tokenizers.for_model(model)
+        count = self._tokens.get(tokenizer.name)
+        if count is None:
+            count = tokenizer.count(self.text)
+            # Before the encoding is loaded this is an estimate: don't keep it
+            if tokenizer.loaded:
+                self._tokens[tokenizer.name] = count
+        return count
+
+    async def precompute(self, model: Optional[str] = None) -> int:
+        tokenizer = tokenizers.for_model(model)
+        if tokenizer.name not in self._tokens:
+            self._tokens[tokenizer.name] = await tokenizer.count_async(self.text)
+        metrics.set_gauge("prompt_template_tokens", self._tokens[tokenizer.name],
+                          template=self.name, tokenizer=tokenizer.name)
+        return self._tokens[tokenizer.name]
+
+
+class PromptRegistry:
+    """Named prompt templates loaded from a directory."""
+
+    def __init__(self, directory: Path = PROMPTS_DIR):
+        self.directory = directory
+        self._templates: Dict[str, PromptTemplate] = {}
+        for path in sorted(directory.glob("*.md")):
+            # Files end with a newline; the prompt itself does not
+            self.register(path.stem, path.read_text(encoding="utf-8").rstrip("\n"))
+
+    def register(self, name: str, text: str) -> PromptTemplate:
+        template = PromptTemplate(name, text)
+        self._templates[name] = template
+        return template
+
+    def get(self, name: str) -> PromptTemplate:
+        return self._templates[name]
+
+    async def warm_up(self, models: Iterable[Optional[str]]):
+        """Precompute every template's token count for each model's tokenizer."""
+        models = list(models)
+        for template in self._templates.values():
+            for model in models:
+                await template.precompute(model)
+        logger.info(f"Prompt token counts precomputed for {len(self._templates)} templates")
+
+    def versions(self) -> Dict[str, str]:
+        return {name: template.version for name, template in self._templates.items()}
+
+
+# Global prompt registry
+prompts = PromptRegistry()
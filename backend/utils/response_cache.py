@@ -0,0 +1,148 @@
+"""Exact-match cache of AI replies for repeated chat questions."""
+
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from config.settings import settings
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_TRAILING_PUNCT_RE = re.compile(r"[\s.!?,;:…]+$")
+
+
+def normalize_message(message: str) -> str:
+    """Normalize a user message so trivial variations share a cache entry."""
+    text = message.lower().replace("ё", "е")
+    text = _WHITESPACE_RE.sub(" ", text).strip()
+    return _TRAILING_PUNCT_RE.sub("", text)
+
+
+def history_fingerprint(history: List[Dict[str, str]]) -> str:
+    """Stable digest of the conversation history ('' for a first turn)."""
+    if not history:
+        return ""
+    encoded = json.dumps(history, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def make_cache_key(message: str, history: List[Dict[str, str]], prompt_version: str, model: str) -> str:
+    """Cache key over normalized message, history, prompt version and model."""
+    parts = [normalize_message(message), history_fingerprint(history), prompt_version, model]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class MongoCacheBackend:
+    """Shared cache storage so several workers see each other's entries.
+
+    Entries expire through a TTL index on ``expires_at``.
+    """
+
+    def __init__(self, db, collection: str = "response_cache"):
+        self.collection = db[collection]
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("expires_at", expireAfterSeconds=0, name="expires_at_ttl")
+
+    async def get(self, key: str) -> Optional[str]:
+        doc = await self.collection.find_one(
+            {"_id": key, "expires_at": {"$gt": datetime.utcnow()}}, {"response": 1}
+        )
+        return doc["response"] if doc else None
+
+    async def set(self, key: str, value: str, ttl_seconds: int):
+        await self.collection.update_one(
+            {"_id": key},
+            {"$set": {"response": value, "expires_at": datetime.utcnow() + timedelta(seconds=ttl_seconds)}},
+            upsert=True,
+        )
+
+
+class ResponseCache:
+    """In-process LRU + TTL cache with an optional shared backend.
+
+    Lookups hit the local LRU first; on a local miss the shared backend (if
+    attached) is consulted and a hit is copied into the local LRU.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.shared: Optional[MongoCacheBackend] = None
+
+    async def attach_shared_backend(self, backend: MongoCacheBackend):
+        """Use a shared backend in addition to the local LRU."""
+        try:
+            await backend.ensure_indexes()
+            self.shared = backend
+            logger.info("Response cache shared backend attached")
+        except Exception as e:
+            logger.error(f"Failed to attach response cache backend: {e}")
+
+    def _get_local(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _set_local(self, key: str, value: str):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            metrics.increment("response_cache_evictions")
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return a cached reply or None, counting hits and misses."""
+        value = self._get_local(key)
+        if value is not None:
+            metrics.increment("response_cache_hits", tier="local")
+            return value
+
+        if self.shared is not None:
+            try:
+                value = await self.shared.get(key)
+            except Exception as e:
+                logger.error(f"Response cache backend read failed: {e}")
+                value = None
+            if value is not None:
+                self._set_local(key, value)
+                metrics.increment("response_cache_hits", tier="shared")
+                return value
+
+        metrics.increment("response_cache_misses")
+        return None
+
+    async def set(self, key: str, value: str):
+        """Store a reply locally and in the shared backend."""
+        self._set_local(key, value)
+        if self.shared is not None:
+            try:
+                await self.shared.set(key, value, self.ttl_seconds)
+            except Exception as e:
+                logger.error(f"Response cache backend write failed: {e}")
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Global response cache instance
+response_cache = ResponseCache(
+    max_entries=settings.response_cache_max_entries,
+    ttl_seconds=settings.response_cache_ttl_seconds,
+)
@@ -0,0 +1,112 @@
+"""Per-turn model tier selection (which routes, how long a reply).
+
+A cheap local classifier looks at the message length, the intents and
+services named in it (via the FAQ matcher) and the conversation depth.
+Greetings and short, single questions early in a conversation go to a
+fast, inexpensive tier with a small reply cap; everything else goes to
+the default tier. Policies share one interface, ``decide(message,
+history)``, and ``routes/chat.py`` uses whichever ``build_policy`` returns.
+"""
+
+import logging
+from typing import Dict, List, Optional
+from config.settings import settings
+from utils.ai_router import AIRouter, ai_router
+from utils.bm25 import WORD_RE
+from utils.faq import faq_engine
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SIMPLE_TIER = "simple"
+RICH_TIER = "rich"
+
+
+class RoutingDecision:
+    """The router and reply cap chosen for one turn."""
+
+    def __init__(self, tier: str, router: AIRouter, max_tokens: Optional[int]):
+        self.tier = tier
+        self.router = router
+        self.max_tokens = max_tokens
+
+
+class FixedPolicy:
+    """Every turn goes to one router with the default reply cap."""
+
+    def __init__(self, router: AIRouter):
+        self.router = router
+
+    def decide(self, message: str, history: List[Dict[str, str]]) -> RoutingDecision:
+        metrics.increment("chat_route_tier", tier=RICH_TIER)
+        return RoutingDecision(RICH_TIER, self.router, settings.ai_max_tokens)
+
+    def routers(self) -> Dict[str, AIRouter]:
+        return {RICH_TIER: self.router}
+
+
+class ComplexityPolicy:
+    """Send simple turns to a fast router with a small reply cap.
+
+    A turn is simple when the message is short, asks at most one question,
+    names at most one service and the conversation is still shallow (no
+    rolling summary, few turns loaded). Comparing several services or
+    following up deep into a conversation needs the larger model.
+    """
+
+    def __init__(
+        self,
+        simple: AIRouter,
+        rich: AIRouter,
+        max_words: int,
+        max_history: int,
+        simple_max_tokens: int,
+        rich_max_tokens: int,
+    ):
+        self.simple = simple
+        self.rich = rich
+        self.max_words = max_words
+        self.max_history = max_history
+        self.simple_max_tokens = simple_max_tokens
+        self.rich_max_tokens = rich_max_tokens
+
+    def classify(self, message: str, history: List[Dict[str, str]]) -> str:
+        if len(WORD_RE.findall(message.lower())) > self.max_words:
+            return RICH_TIER
+        if message.count("?") > 1:
+            return RICH_TIER
+        if any("summary" in turn for turn in history) or len(history) > self.max_history:
+            return RICH_TIER
+        if len(faq_engine.match(message).sections) > 1:
+            return RICH_TIER
+        return SIMPLE_TIER
+
+    def decide(self, message: str, history: List[Dict[str, str]]) -> RoutingDecision:
+        tier = self.classify(message, history)
+        metrics.increment("chat_route_tier", tier=tier)
+        if tier == SIMPLE_TIER:
+            return RoutingDecision(tier, self.simple, self.simple_max_tokens)
+        return RoutingDecision(tier, self.rich, self.rich_max_tokens)
+
+    def routers(self) -> Dict[str, AIRouter]:
+        return {SIMPLE_TIER: self.simple, RICH_TIER: self.rich}
+
+
+def build_policy(name: str):
+    """Routing policy named by ``settings.ai_routing_policy``."""
+    if name == "fixed":
+        return FixedPolicy(ai_router)
+    if name != "complexity":
+        logger.warning(f"Unknown routing policy {name!r}, using complexity")
+    return ComplexityPolicy(
+        simple=AIRouter(settings.ai_routes_simple, tier=SIMPLE_TIER),
+        rich=ai_router,
+        max_words=settings.ai_simple_max_words,
+        max_history=settings.ai_simple_max_history,
+        simple_max_tokens=settings.ai_simple_max_tokens,
+        rich_max_tokens=settings.ai_max_tokens,
+    )
+
+
+# Global routing policy for chat turns
+routing_policy = build_policy(settings.ai_routing_policy)
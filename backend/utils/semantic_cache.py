@@ -0,0 +1,199 @@
+"""Semantic reply cache: answer near-duplicate questions from past replies.
+
+Questions are embedded with a local CPU embedding model and matched
+against a flat in-process NumPy index by cosine similarity. Entries are
+persisted to MongoDB so a restart reloads the index instead of starting
+cold. ``numpy`` and ``fastembed`` are optional; without them the cache
+stays disabled.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+from config.settings import settings
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+
+class LocalEmbedder:
+    """CPU-only sentence embedder backed by fastembed (ONNX runtime)."""
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self._model = None
+
+    def load(self):
+        from fastembed import TextEmbedding
+        self._model = TextEmbedding(model_name=self.model_name)
+
+    def embed(self, text: str) -> "np.ndarray":
+        vector = np.asarray(next(iter(self._model.embed([text]))), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class SemanticCache:
+    """Capacity-bounded flat nearest-neighbour index of question -> answer.
+
+    Rows of ``vectors`` are unit-normalized embeddings, so the dot product
+    with a query vector is its cosine similarity. When full, the least
+    recently used entry is evicted.
+    """
+
+    def __init__(self, capacity: int, threshold: float, embedder: Any = None):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.embedder = embedder
+        self.scope = ""
+        self.collection = None
+        self.vectors = None
+        self.questions: List[str] = []
+        self.answers: List[str] = []
+        self.last_used: List[float] = []
+
+    @property
+    def enabled(self) -> bool:
+        return np is not None and self.embedder is not None
+
+    async def start(self, db=None, scope: str = ""):
+        """Load the embedding model and reload persisted entries for ``scope``.
+
+        ``scope`` identifies the prompt/model combination; entries from other
+        scopes are ignored so prompt changes never serve stale answers.
+        """
+        self.scope = scope
+        if np is None:
+            logger.warning("numpy not installed, semantic cache disabled")
+            self.embedder = None
+            return
+        if self.embedder is None:
+            embedder = LocalEmbedder(settings.semantic_cache_model)
+            try:
+                await asyncio.to_thread(embedder.load)
+            except Exception as e:
+                logger.warning(f"Failed to load embedding model: {e}. Semantic cache disabled.")
+                return
+            self.embedder = embedder
+
+        if db is not None:
+            self.collection = db.semantic_cache
+            await self._reload()
+
+    async def set_scope(self, scope: str):
+        """Switch to another scope (e.g. after a catalog reload), dropping current entries."""
+        if scope == self.scope:
+            return
+        self.scope = scope
+        self.vectors = None
+        self.questions, self.answers, self.last_used = [], [], []
+        if self.enabled and self.collection is not None:
+            await self._reload()
+
+    async def _reload(self):
+        try:
+            cursor = self.collection.find(
+                {"scope": self.scope, "embedding_model": settings.semantic_cache_model}
+            ).sort("last_used", -1).limit(self.capacity)
+            async for doc in cursor:
+                self._append(doc["question"], doc["answer"], np.asarray(doc["embedding"], dtype=np.float32))
+            logger.info(f"Semantic cache reloaded {len(self.questions)} entries")
+        except Exception as e:
+            logger.error(f"Failed to reload semantic cache: {e}")
+
+    async def embed(self, text: str) -> Optional["np.ndarray"]:
+        if not self.enabled:
+            return None
+        try:
+            return await asyncio.to_thread(self.embedder.embed, text)
+        except Exception as e:
+            logger.error(f"Embedding failed: {e}")
+            return None
+
+    def _append(self, question: str, answer: str, vector: "np.ndarray") -> Optional[str]:
+        """Insert an entry, evicting the LRU one when full. Returns the evicted question."""
+        evicted = None
+        if self.vectors is None:
+            self.vectors = np.zeros((self.capacity, vector.shape[0]), dtype=np.float32)
+        if len(self.questions) < self.capacity:
+            slot = len(self.questions)
+            self.questions.append(question)
+            self.answers.append(answer)
+            self.last_used.append(time.monotonic())
+        else:
+            slot = min(range(len(self.last_used)), key=self.last_used.__getitem__)
+            evicted = self.questions[slot]
+            self.questions[slot] = question
+            self.answers[slot] = answer
+            self.last_used[slot] = time.monotonic()
+            metrics.increment("semantic_cache_evictions")
+        self.vectors[slot] = vector
+        return evicted
+
+    def search(self, vector: "np.ndarray") -> Tuple[Optional[str], float]:
+        """Best answer above the similarity threshold, and its similarity."""
+        if not self.questions:
+            return None, 0.0
+        similarities = self.vectors[: len(self.questions)] @ vector
+        best = int(np.argmax(similarities))
+        similarity = float(similarities[best])
+        if similarity < self.threshold:
+            return None, similarity
+        self.last_used[best] = time.monotonic()
+        return self.answers[best], similarity
+
+    async def lookup(self, message: str) -> Tuple[Optional[str], Optional["np.ndarray"]]:
+        """Return ``(answer or None, query embedding)`` for a question."""
+        vector = await self.embed(message)
+        if vector is None:
+            return None, None
+        answer, similarity = self.search(vector)
+        metrics.observe("semantic_cache_similarity_pct", similarity * 100)
+        if answer is None:
+            metrics.increment("semantic_cache_misses")
+        else:
+            metrics.increment("semantic_cache_hits")
+            logger.info(f"Semantic cache hit (similarity {similarity:.3f})")
+        return answer, vector
+
+    async def add(self, question: str, answer: str, vector: Optional["np.ndarray"] = None):
+        """Index a question/answer pair and persist it."""
+        if vector is None:
+            vector = await self.embed(question)
+        if vector is None:
+            return
+        evicted = self._append(question, answer, vector)
+        if self.collection is None:
+            return
+        try:
+            if evicted is not None:
+                await self.collection.delete_one({"scope": self.scope, "question": evicted})
+            await self.collection.update_one(
+                {"scope": self.scope, "question": question},
+                {"$set": {
+                    "answer": answer,
+                    "embedding": vector.tolist(),
+                    "embedding_model": settings.semantic_cache_model,
+                    "last_used": datetime.utcnow(),
+                }},
+                upsert=True,
+            )
+        except Exception as e:
+            logger.error(f"Failed to persist semantic cache entry: {e}")
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+
+# Global semantic cache instance (enabled in the application lifespan)
+semantic_cache = SemanticCache(
+    capacity=settings.semantic_cache_capacity,
+    threshold=settings.semantic_cache_threshold,
+)
@@ -0,0 +1,67 @@
+"""Single-flight coalescing of identical concurrent calls."""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Tuple
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """One in-flight shared call and the number of callers awaiting it."""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Run at most one call per key at a time; concurrent callers share it.
+
+    The shared call runs in its own task, so a caller that is cancelled
+    (for example the visitor closed the tab) only stops waiting: the call
+    keeps going for everyone else and is cancelled only when no caller is
+    left. A failed call is forgotten as soon as it finishes, so the error
+    reaches only the callers that were waiting on it and the next request
+    starts a fresh call.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: Dict[str, _Flight] = {}
+
+    def _forget(self, key: str, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Await ``fn()`` or an identical in-flight call.
+
+        Returns ``(result, shared)`` where ``shared`` is True when this caller
+        joined a call started by someone else.
+        """
+        flight = self._flights.get(key)
+        shared = flight is not None
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+        else:
+            metrics.increment("single_flight_shared", flight=self.name)
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), shared
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                # Last interested caller left: stop the upstream call and make
+                # sure nobody joins a task that is being cancelled
+                self._forget(key, flight)
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def __len__(self) -> int:
+        return len(self._flights)
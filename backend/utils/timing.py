@@ -0,0 +1,87 @@
+"""Per-request phase timers for ``Server-Timing`` headers and request logs.
+
+The request logging middleware opens a ``RequestTiming`` and stores it in
+a context variable; code on the request path wraps its steps in
+``phase(name)``. Tasks started from the request share the same object,
+so phases measured in router attempts or the streaming producer land in
+the same breakdown. All durations come from ``time.perf_counter``.
+Without an open request timing, ``phase`` only runs the block.
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+# Phases on the chat and contact paths: context, tokens, llm, llm_ttfb,
+# db_save and telegram. The LLM phase and its time to first byte are
+# linked: the first provider response headers inside "llm" set "llm_ttfb".
+LLM = "llm"
+LLM_TTFB = "llm_ttfb"
+
+_timing: contextvars.ContextVar[Optional["RequestTiming"]] = contextvars.ContextVar("request_timing", default=None)
+
+
+class RequestTiming:
+    """Accumulated milliseconds per phase of one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self._open: Dict[str, float] = {}
+
+    def add(self, name: str, ms: float):
+        self.phases[name] = self.phases.get(name, 0.0) + ms
+
+    @property
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def fields(self) -> Dict[str, float]:
+        """Phase durations plus the total so far, rounded for logs."""
+        return {**{name: round(ms, 1) for name, ms in self.phases.items()}, "total": round(self.total_ms, 1)}
+
+    def header(self) -> str:
+        """``Server-Timing`` header value."""
+        return ", ".join(f"{name};dur={ms}" for name, ms in self.fields().items())
+
+
+@contextmanager
+def request_timing() -> Iterator[RequestTiming]:
+    """Open the timing for a request (used by the logging middleware)."""
+    timing = RequestTiming()
+    token = _timing.set(timing)
+    try:
+        yield timing
+    finally:
+        _timing.reset(token)
+
+
+def current_timing() -> Optional[RequestTiming]:
+    return _timing.get()
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Add the block's duration to phase ``name`` of the current request."""
+    timing = _timing.get()
+    if timing is None:
+        yield
+        return
+    started = time.perf_counter()
+    timing._open[name] = started
+    try:
+        yield
+    finally:
+        timing._open.pop(name, None)
+        timing.add(name, (time.perf_counter() - started) * 1000)
+
+
+def mark_first_byte():
+    """Record time to first byte of the open LLM phase (first call wins)."""
+    timing = _timing.get()
+    if timing is None or LLM_TTFB in timing.phases:
+        return
+    started = timing._open.get(LLM)
+    if started is not None:
+        timing.add(LLM_TTFB, (time.perf_counter() - started) * 1000)
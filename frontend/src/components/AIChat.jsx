@@ -8,9 +8,6 @@ import { useSessionStorage } from '../hooks/useSessionStorage';
 import apiClient from '../services/api';
 import { logger } from '@/utils/logger';
 
-const MAX_RETRIES = 3;
-
-
 const AIChat = () => {
   const [isOpen, setIsOpen] = useState(false);
   const [messages, setMessages] = useState([
@@ -22,7 +19,9 @@ const AIChat = () => {
   ]);
   const [input, setInput] = useState('');
   const [loading, setLoading] = useState(false);
+  const [streaming, setStreaming] = useState(false);
   const messagesEndRef = useRef(null);
+  const streamRef = useRef(null);
   const [isMobile, setIsMobile] = useState(false);
 
   // Initialize session ID with persistent storage
@@ -47,20 +46,37 @@ const AIChat = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
   }, [messages]);
 
+  // Stop a reply still streaming when the chat unmounts
+  useEffect(() => () => streamRef.current?.abort(), []);
 
+  const callAI = async (message) => {
+    // Stream the reply into a new assistant message as tokens arrive
+    let started = false;
+    const appendToken = (token) => {
+      if (!started) {
+        started = true;
+        setStreaming(true);
+        setMessages((prev) => [...prev, { role: 'assistant', content: token }]);
+        return;
+      }
+      setMessages((prev) => {
+        const last = prev[prev.length - 1];
+        return [...prev.slice(0, -1), { ...last, content: last.content + token }];
+      });
+    };
 
-  const callAI = async (message, retryCount = 0) => {
+    streamRef.current = new AbortController();
     try {
-      // Use centralized API client
-      const response = await apiClient.sendMessage(message, sessionId, 'claude-sonnet');
-      return response.response;
-      
+      await apiClient.streamMessage(message, sessionId, appendToken, {
+        model: 'claude-sonnet',
+        signal: streamRef.current.signal,
+      });
     } catch (error) {
-      logger.error(`AI API error (attempt ${retryCount + 1}/${MAX_RETRIES + 1}):`, error);
-      
-      // Retry logic is now handled in the API client
-      // Just re-throw the error for the UI to handle
+      logger.error('AI API error:', error);
       throw error;
+    } finally {
+      streamRef.current = null;
+      setStreaming(false);
     }
   };
 
@@ -72,8 +88,7 @@ const AIChat = () => {
     trackGoal('AI_CHAT_QUICK_ACTION', { prompt });
     
     try {
-      const aiResponse = await callAI(prompt);
-      setMessages((prev) => [...prev, { role: 'assistant', content: aiResponse }]);
+      await callAI(prompt);
     } catch (error) {
       logger.error('Quick action error:', error);
       const errorMessage = error.message || 'Произошла ошибка, попробуйте ещё раз.';
@@ -97,8 +112,7 @@ const AIChat = () => {
     trackGoal('AI_CHAT_MESSAGE_SENT');
     
     try {
-      const aiResponse = await callAI(userMessage);
-      setMessages((prev) => [...prev, { role: 'assistant', content: aiResponse }]);
+      await callAI(userMessage);
     } catch (error) {
       logger.error('Send message error:', error);
       const errorMessage = error.message || 'Ошибка при обращении к серверу';
@@ -186,7 +200,7 @@ const AIChat = () => {
                   </div>
                 </motion.div>
               ))}
-              {loading && (
+              {loading && !streaming && (
                 <div className="flex justify-start text-white/70 text-sm">
                   <div className="bg-white/10 p-3 rounded-2xl border border-white/10">
                     <div className="flex items-center gap-2">
@@ -1,11 +1,15 @@
 import React from 'react';
 import { render, screen, fireEvent, waitFor } from '@testing-library/react';
 import '@testing-library/jest-dom';
+import { TextDecoder, TextEncoder } from 'util';
 import AIChat from '../AIChat';
 
 // Mock fetch
 global.fetch = jest.fn();
 
+// Streamed replies are decoded with TextDecoder, which jsdom lacks
+Object.assign(global, { TextDecoder, TextEncoder });
+
 // Mock toast
 jest.mock('sonner', () => ({
   toast: {
@@ -63,16 +67,23 @@ describe('AIChat Component', () => {
     expect(input.value).toBe('Тестовый вопрос');
   });
 
-  test('sends message on form submit', async () => {
+  test('sends message on form submit and renders streamed tokens', async () => {
+    const frames = [
+      'data: {"type": "token", "content": "Тестовый "}\n\n',
+      'data: {"type": "token", "content": "ответ от AI"}\n\n',
+      'data: {"type": "done", "session_id": "s", "model": "claude"}\n\n',
+    ];
+    const encoder = new TextEncoder();
     fetch.mockResolvedValueOnce({
       ok: true,
-      json: async () => ({
-        candidates: [{
-          content: {
-            parts: [{ text: 'Тестовый ответ от AI' }]
-          }
-        }]
-      })
+      status: 200,
+      body: {
+        getReader: () => ({
+          read: async () => (frames.length
+            ? { value: encoder.encode(frames.shift()), done: false }
+            : { value: undefined, done: true }),
+        }),
+      },
     });
 
     renderAndOpenChat();
@@ -86,7 +97,7 @@ describe('AIChat Component', () => {
     
     await waitFor(() => {
       expect(fetch).toHaveBeenCalledWith(
-        expect.stringContaining('/api/gemini'),
+        expect.stringContaining('/api/chat/stream'),
         expect.objectContaining({
           method: 'POST',
           headers: { 'Content-Type': 'application/json' },
@@ -94,6 +105,7 @@ describe('AIChat Component', () => {
         })
       );
     });
+    await screen.findByText('Тестовый ответ от AI');
   });
 
   test('handles API error gracefully', async () => {
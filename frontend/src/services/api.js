@@ -45,6 +45,11 @@ class ApiClient {
         return Promise.reject(error);
       }
     );
+
+    // Bind the methods exported individually below, so they keep `this`
+    for (const method of ['sendMessage', 'streamMessage', 'submitContact', 'checkHealth', 'getChatHealth', 'getContactHealth']) {
+      this[method] = this[method].bind(this);
+    }
   }
 
   /**
@@ -121,6 +126,51 @@ class ApiClient {
     }
   }
 
+  /**
+   * Stream chat reply token by token (Server-Sent Events).
+   * Calls onToken(text) for every chunk and resolves with the final "done" event.
+   */
+  async streamMessage(message, sessionId, onToken, { model = 'claude-sonnet', signal } = {}) {
+    logger.api('post', '/chat/stream');
+    const response = await fetch(`${this.baseURL}/chat/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ session_id: sessionId, message, model }),
+      signal,
+    });
+
+    if (!response.ok || !response.body) {
+      const error = new Error(`Stream request failed with status ${response.status}`);
+      error.response = { status: response.status, data: {} };
+      this.handleError(error);
+      throw error;
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let done = null;
+
+    for (;;) {
+      const { value, done: finished } = await reader.read();
+      if (finished) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      const frames = buffer.split('\n\n');
+      buffer = frames.pop();
+      for (const frame of frames) {
+        const line = frame.split('\n').find((l) => l.startsWith('data: '));
+        if (!line) continue;
+        const event = JSON.parse(line.slice(6));
+        if (event.type === 'token') onToken(event.content);
+        else if (event.type === 'done') done = event;
+      }
+    }
+
+    logger.apiResponse(response.status, '/chat/stream');
+    return done;
+  }
+
   /**
    * Submit contact form
    */
@@ -160,6 +210,7 @@ export const apiClient = new ApiClient();
 // Export individual methods for convenience
 export const {
   sendMessage,
+  streamMessage,
   submitContact,
   checkHealth,
   getChatHealth,
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Backfill cum_tokens (running token total per session) on chat_messages.
+
+Turns saved before cumulative totals existed are loaded with the slower
+timestamp scan; this computes their totals in one server-side pass
+($setWindowFields + $merge, MongoDB 5.0+), seeds each session's running
+total counter in chat_token_counters and creates the
+(session_id, cum_tokens, timestamp) index.
+
+Usage:
+    python scripts/backfill_cum_tokens.py
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add backend to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from dotenv import load_dotenv  # noqa: E402
+
+load_dotenv(Path(__file__).parent.parent / ".env")
+
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+from config.settings import settings  # noqa: E402
+
+PIPELINE = [
+    {"$setWindowFields": {
+        "partitionBy": "$session_id",
+        "sortBy": {"timestamp": 1},
+        "output": {"cum_tokens": {
+            "$sum": {"$add": [{"$ifNull": ["$tokens_user", 0]}, {"$ifNull": ["$tokens_ai", 0]}]},
+            "window": {"documents": ["unbounded", "current"]},
+        }},
+    }},
+    {"$project": {"cum_tokens": 1}},
+    {"$merge": {"into": "chat_messages", "on": "_id", "whenMatched": "merge", "whenNotMatched": "discard"}},
+]
+
+# New turns add to the session's counter, so it must start at the backfilled total
+COUNTER_PIPELINE = [
+    {"$group": {"_id": "$session_id", "cum_tokens": {"$max": "$cum_tokens"}, "updated_at": {"$max": "$timestamp"}}},
+    {"$merge": {
+        "into": "chat_token_counters",
+        "on": "_id",
+        "whenMatched": [{"$set": {"cum_tokens": {"$max": ["$cum_tokens", "$$new.cum_tokens"]}}}],
+        "whenNotMatched": "insert",
+    }},
+]
+
+
+async def main():
+    client = AsyncIOMotorClient(settings.mongodb_url)
+    db = client[settings.db_name]
+    started = time.perf_counter()
+
+    await db.chat_messages.aggregate(PIPELINE, allowDiskUse=True).to_list(length=None)
+    await db.chat_messages.aggregate(COUNTER_PIPELINE, allowDiskUse=True).to_list(length=None)
+    await db.chat_messages.create_index(
+        [("session_id", 1), ("cum_tokens", -1), ("timestamp", -1)], name="session_cum_tokens_idx"
+    )
+    missing = await db.chat_messages.count_documents({"cum_tokens": {"$exists": False}})
+    client.close()
+
+    print(f"✓ cum_tokens backfilled in {time.perf_counter() - started:.1f}s ({missing} turns still without totals)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Benchmark chat history layouts: turn-per-document vs document-per-session.
+
+Seeds a scratch database with N sessions of T turns in both layouts, then
+measures SmartContext context loads and saves against each one through
+the real code path. Needs a MongoDB at MONGODB_URL; everything is written
+to a separate database (default neuroexpert_bench) that is dropped first.
+
+Usage:
+    python scripts/benchmark_chat_storage.py --sessions 10000 1000000 --turns 6
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add backend to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from dotenv import load_dotenv  # noqa: E402
+
+load_dotenv(Path(__file__).parent.parent / ".env")
+
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+from config.settings import settings  # noqa: E402
+from memory.smart_context import SESSION_STORAGE, TURN_STORAGE, SmartContext  # noqa: E402
+
+USER_MESSAGE = "Сколько стоит разработка интернет-магазина и какие сроки?"
+AI_RESPONSE = "Интернет-магазин — от 250 000 ₽. Сроки зависят от каталога и интеграций. " * 4
+SEED_BATCH = 10_000
+
+
+def turn(i: int, base: datetime) -> dict:
+    return {
+        "user_message": USER_MESSAGE,
+        "ai_response": AI_RESPONSE,
+        "tokens_user": 15,
+        "tokens_ai": 120,
+        "timestamp": base + timedelta(seconds=30 * i),
+    }
+
+
+async def seed(db, sessions: int, turns: int):
+    base = datetime.utcnow() - timedelta(days=1)
+    messages, session_docs = [], []
+    for s in range(sessions):
+        session_id = f"bench-{s}"
+        session_turns = [turn(i, base) for i in range(turns)]
+        messages.extend({"session_id": session_id, **t} for t in session_turns)
+        session_docs.append({
+            "_id": session_id,
+            "turns": session_turns[-settings.session_max_turns:],
+            "turn_count": turns,
+            "total_tokens_user": 15 * turns,
+            "total_tokens_ai": 120 * turns,
+            "created_at": session_turns[0]["timestamp"],
+            "updated_at": session_turns[-1]["timestamp"],
+        })
+        if len(session_docs) >= SEED_BATCH:
+            await asyncio.gather(db.chat_messages.insert_many(messages), db.chat_sessions.insert_many(session_docs))
+            messages, session_docs = [], []
+    if session_docs:
+        await asyncio.gather(db.chat_messages.insert_many(messages), db.chat_sessions.insert_many(session_docs))
+    await db.chat_messages.create_index([("session_id", 1), ("timestamp", -1)], name="session_timestamp_idx")
+
+
+def summarize(samples: list) -> str:
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    return f"p50 {statistics.median(samples):7.2f} ms  p95 {p95:7.2f} ms"
+
+
+async def measure(client, mode: str, sessions: int, operations: int, concurrency: int) -> dict:
+    settings.chat_storage_mode = mode
+    context = SmartContext(client)
+    loads, saves = [], []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def load_one():
+        async with semaphore:
+            started = time.perf_counter()
+            await context.get_context(f"bench-{random.randrange(sessions)}")
+            loads.append((time.perf_counter() - started) * 1000)
+
+    async def save_one():
+        async with semaphore:
+            started = time.perf_counter()
+            await context.save_message(f"bench-{random.randrange(sessions)}", USER_MESSAGE, AI_RESPONSE)
+            saves.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(load_one() for _ in range(operations)))
+    load_rate = operations / (time.perf_counter() - started)
+    await asyncio.gather(*(save_one() for _ in range(operations // 4)))
+    return {"loads": loads, "saves": saves, "load_rate": load_rate}
+
+
+async def collection_size(db, name: str) -> str:
+    stats = await db.command("collStats", name)
+    return f"data {stats['size'] / 2**20:8.1f} MB  indexes {stats['totalIndexSize'] / 2**20:7.1f} MB"
+
+
+async def main(args):
+    client = AsyncIOMotorClient(settings.mongodb_url)
+    settings.db_name = args.database
+    settings.context_cache_enabled = False
+    settings.summary_enabled = False
+    db = client[args.database]
+
+    for sessions in args.sessions:
+        await client.drop_database(args.database)
+        print(f"\n=== {sessions:,} sessions x {args.turns} turns ===")
+        started = time.perf_counter()
+        await seed(db, sessions, args.turns)
+        print(f"seeded in {time.perf_counter() - started:.1f}s")
+
+        for mode, collection in ((TURN_STORAGE, "chat_messages"), (SESSION_STORAGE, "chat_sessions")):
+            result = await measure(client, mode, sessions, args.operations, args.concurrency)
+            print(f"[{mode:7}] load  {summarize(result['loads'])}  {result['load_rate']:8.0f} ops/s")
+            print(f"[{mode:7}] save  {summarize(result['saves'])}")
+            print(f"[{mode:7}] size  {await collection_size(db, collection)}")
+
+    if not args.keep:
+        await client.drop_database(args.database)
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark chat history storage layouts")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[10_000, 1_000_000])
+    parser.add_argument("--turns", type=int, default=6)
+    parser.add_argument("--operations", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--database", default="neuroexpert_bench")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch database afterwards")
+    asyncio.run(main(parser.parse_args()))
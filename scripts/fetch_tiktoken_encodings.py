@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""Download the tiktoken encoding files into backend/memory/encodings.
+
+The files are committed with the backend so it never downloads BPE files
+on a cold start; run this after adding an encoding and commit the result.
+Files are stored under tiktoken's cache naming scheme, which the backend
+reads via TIKTOKEN_CACHE_DIR. With --check, only verifies that every
+encoding file is present (used in CI).
+
+Usage:
+    python scripts/fetch_tiktoken_encodings.py [target_dir] [--check]
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# Add backend to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from memory.tokenizer import BUNDLED_ENCODING_FILES, BUNDLED_ENCODINGS_DIR  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch tiktoken encodings bundled with the backend")
+    parser.add_argument("target", nargs="?", type=Path, default=BUNDLED_ENCODINGS_DIR)
+    parser.add_argument("--check", action="store_true", help="Only check that the files are present")
+    args = parser.parse_args()
+
+    if args.check:
+        missing = [name for name, file in BUNDLED_ENCODING_FILES.items() if not (args.target / file).is_file()]
+        if missing:
+            print(f"✗ Missing tiktoken encodings in {args.target}: {', '.join(missing)}")
+            print("  Run python scripts/fetch_tiktoken_encodings.py and commit the files")
+            sys.exit(1)
+        print(f"✓ All tiktoken encodings present in {args.target}")
+        return
+
+    args.target.mkdir(parents=True, exist_ok=True)
+    os.environ["TIKTOKEN_CACHE_DIR"] = str(args.target)
+
+    import tiktoken
+
+    for name in BUNDLED_ENCODING_FILES:
+        encoding = tiktoken.get_encoding(name)
+        print(f"✓ {name}: {encoding.n_vocab} tokens")
+    print(f"Encodings stored in {args.target}")
+
+
+if __name__ == "__main__":
+    main()
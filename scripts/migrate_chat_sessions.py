@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Migrate chat history from chat_messages (turn per document) to chat_sessions.
+
+Builds one chat_sessions document per session with the last
+SESSION_MAX_TURNS turns and running token totals, the layout used by
+CHAT_STORAGE_MODE=session. The migration is idempotent (sessions are
+replaced), so it can be re-run to pick up turns written while it ran;
+switch CHAT_STORAGE_MODE only after a final pass with writes paused.
+
+Usage:
+    python scripts/migrate_chat_sessions.py [--batch-size 1000] [--dry-run]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add backend to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from dotenv import load_dotenv  # noqa: E402
+
+load_dotenv(Path(__file__).parent.parent / ".env")
+
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+from pymongo import ReplaceOne  # noqa: E402
+from config.settings import settings  # noqa: E402
+
+
+def session_pipeline(max_turns: int) -> list:
+    """Group turns by session, oldest first, keeping the newest ``max_turns``."""
+    return [
+        {"$sort": {"session_id": 1, "timestamp": 1}},
+        {"$group": {
+            "_id": "$session_id",
+            "turns": {"$push": {
+                "user_message": "$user_message",
+                "ai_response": "$ai_response",
+                "tokens_user": "$tokens_user",
+                "tokens_ai": "$tokens_ai",
+                "timestamp": "$timestamp",
+            }},
+            "turn_count": {"$sum": 1},
+            "total_tokens_user": {"$sum": "$tokens_user"},
+            "total_tokens_ai": {"$sum": "$tokens_ai"},
+            "created_at": {"$min": "$timestamp"},
+            "updated_at": {"$max": "$timestamp"},
+        }},
+        {"$set": {"turns": {"$slice": ["$turns", -max_turns]}}},
+    ]
+
+
+async def migrate(batch_size: int, dry_run: bool):
+    client = AsyncIOMotorClient(settings.mongodb_url)
+    db = client[settings.db_name]
+    started = time.perf_counter()
+    sessions = turns = 0
+    batch = []
+
+    async def flush():
+        if batch and not dry_run:
+            await db.chat_sessions.bulk_write(batch, ordered=False)
+        batch.clear()
+
+    cursor = db.chat_messages.aggregate(session_pipeline(settings.session_max_turns), allowDiskUse=True)
+    async for session in cursor:
+        sessions += 1
+        turns += session["turn_count"]
+        batch.append(ReplaceOne({"_id": session["_id"]}, session, upsert=True))
+        if len(batch) >= batch_size:
+            await flush()
+            print(f"  {sessions} sessions migrated...")
+    await flush()
+
+    if not dry_run:
+        await db.chat_sessions.create_index([("updated_at", -1)], name="session_updated_idx")
+    client.close()
+
+    action = "Would migrate" if dry_run else "Migrated"
+    print(f"✓ {action} {turns} turns into {sessions} sessions in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate chat_messages to chat_sessions")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="read and group only, write nothing")
+    args = parser.parse_args()
+    asyncio.run(migrate(args.batch_size, args.dry_run))
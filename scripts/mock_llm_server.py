@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""Offline mock of the OpenAI, Anthropic and Gemini chat APIs for load testing.
+
+Speaks the wire formats the backend clients use, including SSE streaming:
+
+    POST /v1/chat/completions                          OpenAI / Emergent
+    POST /v1/messages                                  Anthropic
+    POST /v1beta/models/{model}:generateContent        Gemini
+    POST /v1beta/models/{model}:streamGenerateContent  Gemini (alt=sse)
+
+Time to first token follows a log-normal distribution, tokens are emitted
+at a fixed rate, and a share of requests can fail with 500 or be throttled
+with 429 + Retry-After. A concurrency cap also answers 429 when exceeded,
+like a real provider's rate limit. Behaviour can be changed at runtime
+with ``PUT /_mock/config``; ``GET /_mock/stats`` returns request counters.
+
+Usage:
+    python scripts/mock_llm_server.py --port 8900 --latency-ms 400 --tps 60
+
+Then point the backend at it (any non-empty API keys will do):
+    OPENAI_BASE_URL=http://localhost:8900/v1
+    ANTHROPIC_BASE_URL=http://localhost:8900/v1
+    GEMINI_BASE_URL=http://localhost:8900/v1beta
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from collections import Counter
+from typing import AsyncIterator, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+REPLY_WORDS = (
+    "Мы помогаем бизнесу внедрять искусственный интеллект: аудит процессов, "
+    "чат-боты, автоматизация продаж и аналитика данных. Оставьте контакты, "
+    "и наш специалист подготовит предложение под ваши задачи и бюджет."
+).split()
+
+
+class MockConfig(BaseModel):
+    """Runtime behaviour of the mock providers."""
+
+    latency_ms: float = Field(300.0, ge=0, description="Median time to first token")
+    latency_sigma: float = Field(0.5, ge=0, description="Log-normal spread of the latency")
+    tokens_per_second: float = Field(50.0, ge=0, description="Output rate, 0 = instant")
+    reply_tokens: int = Field(60, ge=1, description="Tokens per reply")
+    error_rate: float = Field(0.0, ge=0, le=1, description="Share of requests failing with 500")
+    rate_limit_rate: float = Field(0.0, ge=0, le=1, description="Share of requests throttled with 429")
+    retry_after_seconds: float = Field(1.0, ge=0)
+    max_concurrency: int = Field(0, ge=0, description="429 above this many in-flight requests, 0 = unlimited")
+
+
+class MockState:
+    def __init__(self):
+        self.config = MockConfig()
+        self.in_flight = 0
+        self.stats: Counter = Counter()
+
+
+state = MockState()
+app = FastAPI(title="Mock LLM providers")
+
+
+def count_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def reply_tokens() -> List[str]:
+    n = state.config.reply_tokens
+    return [REPLY_WORDS[i % len(REPLY_WORDS)] + " " for i in range(n)]
+
+
+def first_token_delay() -> float:
+    config = state.config
+    if config.latency_ms <= 0:
+        return 0.0
+    return random.lognormvariate(math.log(config.latency_ms / 1000), config.latency_sigma)
+
+
+def token_interval() -> float:
+    tps = state.config.tokens_per_second
+    return 1 / tps if tps > 0 else 0.0
+
+
+def admit(provider: str) -> Optional[JSONResponse]:
+    """Decide whether a request is throttled or failed; None admits it."""
+    config = state.config
+    state.stats[f"{provider}_requests"] += 1
+    throttled = (
+        (config.max_concurrency and state.in_flight >= config.max_concurrency)
+        or random.random() < config.rate_limit_rate
+    )
+    if throttled:
+        state.stats[f"{provider}_throttled"] += 1
+        return error_response(provider, 429, "rate limit exceeded",
+                              {"retry-after": f"{config.retry_after_seconds:g}"})
+    if random.random() < config.error_rate:
+        state.stats[f"{provider}_errors"] += 1
+        return error_response(provider, 500, "internal server error")
+    return None
+
+
+def error_response(provider: str, status: int, message: str, headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+    if provider == "anthropic":
+        kind = "rate_limit_error" if status == 429 else "api_error"
+        body = {"type": "error", "error": {"type": kind, "message": message}}
+    elif provider == "gemini":
+        body = {"error": {"code": status, "message": message,
+                          "status": "RESOURCE_EXHAUSTED" if status == 429 else "INTERNAL"}}
+    else:
+        body = {"error": {"message": message, "type": "rate_limit_exceeded" if status == 429 else "server_error"}}
+    return JSONResponse(body, status_code=status, headers=headers)
+
+
+async def generate_tokens() -> AsyncIterator[str]:
+    """Yield reply tokens with the configured latency and output rate."""
+    await asyncio.sleep(first_token_delay())
+    interval = token_interval()
+    for i, token in enumerate(reply_tokens()):
+        if i and interval:
+            await asyncio.sleep(interval)
+        yield token
+
+
+async def complete_text() -> str:
+    return "".join([token async for token in generate_tokens()])
+
+
+def sse(data: dict, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def tracked(stream: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Count a streaming response as in flight until it finishes."""
+    async def wrapper():
+        state.in_flight += 1
+        try:
+            async for chunk in stream:
+                yield chunk
+        finally:
+            state.in_flight -= 1
+    return wrapper()
+
+
+async def tracked_call(coro):
+    state.in_flight += 1
+    try:
+        return await coro
+    finally:
+        state.in_flight -= 1
+
+
+def sse_response(stream: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(tracked(stream), media_type="text/event-stream")
+
+
+def prompt_text(messages: List[dict]) -> str:
+    parts = []
+    for message in messages:
+        content = message.get("content", "")
+        if isinstance(content, list):
+            content = " ".join(block.get("text", "") for block in content)
+        parts.append(content)
+    return " ".join(parts)
+
+
+# ---------------------------------------------------------------- OpenAI
+
+@app.post("/v1/chat/completions")
+async def openai_chat(request: Request):
+    body = await request.json()
+    rejected = admit("openai")
+    if rejected:
+        return rejected
+    model = body.get("model", "gpt-4o-mini")
+    prompt_tokens = count_tokens(prompt_text(body.get("messages", [])))
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+    created = int(time.time())
+
+    def usage(completion_tokens: int) -> dict:
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": 0},
+        }
+
+    if not body.get("stream"):
+        text = await tracked_call(complete_text())
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": usage(state.config.reply_tokens),
+        }
+
+    include_usage = (body.get("stream_options") or {}).get("include_usage")
+
+    async def stream():
+        base = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model}
+        yield sse({**base, "choices": [{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}]})
+        async for token in generate_tokens():
+            yield sse({**base, "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]})
+        yield sse({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if include_usage:
+            yield sse({**base, "choices": [], "usage": usage(state.config.reply_tokens)})
+        yield "data: [DONE]\n\n"
+
+    return sse_response(stream())
+
+
+# ------------------------------------------------------------- Anthropic
+
+@app.post("/v1/messages")
+async def anthropic_messages(request: Request):
+    body = await request.json()
+    rejected = admit("anthropic")
+    if rejected:
+        return rejected
+    model = body.get("model", "claude-3-5-haiku-latest")
+    system = body.get("system", "")
+    if isinstance(system, list):
+        system = " ".join(block.get("text", "") for block in system)
+    input_tokens = count_tokens(system + " " + prompt_text(body.get("messages", [])))
+    message_id = f"msg_{uuid.uuid4().hex[:24]}"
+
+    if not body.get("stream"):
+        text = await tracked_call(complete_text())
+        return {
+            "id": message_id,
+            "type": "message",
+            "role": "assistant",
+            "model": model,
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "usage": {"input_tokens": input_tokens, "output_tokens": state.config.reply_tokens},
+        }
+
+    async def stream():
+        yield sse({"type": "message_start", "message": {
+            "id": message_id, "type": "message", "role": "assistant", "model": model, "content": [],
+            "usage": {"input_tokens": input_tokens, "output_tokens": 1},
+        }}, event="message_start")
+        yield sse({"type": "content_block_start", "index": 0,
+                   "content_block": {"type": "text", "text": ""}}, event="content_block_start")
+        async for token in generate_tokens():
+            yield sse({"type": "content_block_delta", "index": 0,
+                       "delta": {"type": "text_delta", "text": token}}, event="content_block_delta")
+        yield sse({"type": "content_block_stop", "index": 0}, event="content_block_stop")
+        yield sse({"type": "message_delta", "delta": {"stop_reason": "end_turn"},
+                   "usage": {"output_tokens": state.config.reply_tokens}}, event="message_delta")
+        yield sse({"type": "message_stop"}, event="message_stop")
+
+    return sse_response(stream())
+
+
+# ---------------------------------------------------------------- Gemini
+
+@app.post("/v1beta/models/{model_action}")
+async def gemini_generate(model_action: str, request: Request):
+    model, _, action = model_action.partition(":")
+    if action not in ("generateContent", "streamGenerateContent"):
+        raise HTTPException(status_code=404, detail=f"Unknown method {action}")
+    body = await request.json()
+    rejected = admit("gemini")
+    if rejected:
+        return rejected
+    prompt = " ".join(
+        part.get("text", "")
+        for content in body.get("contents", [])
+        for part in content.get("parts", [])
+    )
+    prompt_tokens = count_tokens(prompt)
+
+    def usage() -> dict:
+        output = state.config.reply_tokens
+        return {"promptTokenCount": prompt_tokens, "candidatesTokenCount": output,
+                "totalTokenCount": prompt_tokens + output}
+
+    def candidate(text: str, finished: bool) -> dict:
+        item = {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+        if finished:
+            item["finishReason"] = "STOP"
+        return item
+
+    if action == "generateContent":
+        text = await tracked_call(complete_text())
+        return {"candidates": [candidate(text, True)], "usageMetadata": usage(), "modelVersion": model}
+
+    async def stream():
+        async for token, last in _lookahead(generate_tokens()):
+            chunk = {"candidates": [candidate(token, last)], "modelVersion": model}
+            if last:
+                chunk["usageMetadata"] = usage()
+            yield sse(chunk)
+
+    return sse_response(stream())
+
+
+async def _lookahead(tokens: AsyncIterator[str]) -> AsyncIterator[tuple]:
+    """Yield ``(token, is_last)`` pairs."""
+    previous = None
+    async for token in tokens:
+        if previous is not None:
+            yield previous, False
+        previous = token
+    if previous is not None:
+        yield previous, True
+
+
+# ----------------------------------------------------------------- Admin
+
+@app.get("/_mock/config")
+async def get_config():
+    return state.config
+
+
+@app.put("/_mock/config")
+async def update_config(config: MockConfig):
+    state.config = config
+    return state.config
+
+
+@app.get("/_mock/stats")
+async def get_stats():
+    return {"in_flight": state.in_flight, **state.stats}
+
+
+@app.post("/_mock/reset")
+async def reset_stats():
+    state.stats.clear()
+    return {"status": "ok"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="median time to first token")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="log-normal spread")
+    parser.add_argument("--tps", type=float, default=50.0, help="output tokens per second (0 = instant)")
+    parser.add_argument("--reply-tokens", type=int, default=60)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--max-concurrency", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    state.config = MockConfig(
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        tokens_per_second=args.tps,
+        reply_tokens=args.reply_tokens,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after_seconds=args.retry_after,
+        max_concurrency=args.max_concurrency,
+    )
+    print(f"Mock LLM providers listening on http://{args.host}:{args.port}")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,13 @@
 """Pytest configuration and fixtures."""
+import sys
+from pathlib import Path
+
 import pytest
 import asyncio
 
+# Backend modules import each other as top-level packages (config, utils, ...)
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
 
 @pytest.fixture(scope="session")
 def event_loop():
@@ -0,0 +1,138 @@
+"""In-memory stand-ins for the few Motor collection calls the backend uses."""
+from types import SimpleNamespace
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+def matches(doc, query):
+    """Equality, ``$gt``, ``$lte``, ``$ne``, ``$exists`` and ``$not`` filter matching (a missing field matches None)."""
+    for field, value in query.items():
+        if not (matches_condition(doc, field, value) if isinstance(value, dict) else doc.get(field) == value):
+            return False
+    return True
+
+
+def matches_condition(doc, field, condition):
+    value = doc.get(field)
+    for operator, operand in condition.items():
+        if operator == "$gt" and (value is None or not value > operand):
+            return False
+        if operator == "$lte" and (value is None or not value <= operand):
+            return False
+        if operator == "$ne" and (value == operand or isinstance(value, list) and operand in value):
+            return False
+        if operator == "$exists" and (field in doc) != operand:
+            return False
+        if operator == "$not" and matches_condition(doc, field, operand):
+            return False
+    return True
+
+
+def sort_key(field):
+    # Like MongoDB, missing values sort before everything else
+    return lambda doc: (doc.get(field) is not None, doc.get(field))
+
+
+def sort_docs(docs, keys):
+    for field, direction in reversed(keys):
+        docs = sorted(docs, key=sort_key(field), reverse=direction < 0)
+    return docs
+
+
+def evaluate(expression, doc):
+    """The few aggregation expressions used in pipeline updates."""
+    if isinstance(expression, str) and expression.startswith("$"):
+        return doc.get(expression[1:])
+    if isinstance(expression, dict) and "$add" in expression:
+        return sum(evaluate(item, doc) for item in expression["$add"])
+    if isinstance(expression, dict) and "$ifNull" in expression:
+        value, default = expression["$ifNull"]
+        value = evaluate(value, doc)
+        return evaluate(default, doc) if value is None else value
+    return expression
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, field, direction=None):
+        self.docs = sort_docs(self.docs, field if isinstance(field, list) else [(field, direction)])
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeCollection:
+    """Just enough of a Motor collection for SmartContext and friends."""
+
+    def __init__(self):
+        self.docs = []
+        self.finds = 0
+
+    def find(self, query, projection=None):
+        self.finds += 1
+        self.last_query = query
+        return FakeCursor([doc for doc in self.docs if matches(doc, query)])
+
+    async def find_one(self, query, projection=None, sort=None):
+        self.finds += 1
+        docs = sort_docs([doc for doc in self.docs if matches(doc, query)], sort or [])
+        return dict(docs[0]) if docs else None
+
+    async def insert_one(self, document):
+        self.docs.append(dict(document))
+
+    async def insert_many(self, documents, ordered=True):
+        for document in documents:
+            await self.insert_one(document)
+
+    async def update_one(self, query, update, upsert=False):
+        doc = next((doc for doc in self.docs if matches(doc, query)), None)
+        upserted_id = None
+        if doc is None:
+            if not upsert:
+                return SimpleNamespace(matched_count=0, upserted_id=None, doc=None)
+            doc = {field: value for field, value in query.items() if not isinstance(value, dict)}
+            if "_id" in doc and any(other.get("_id") == doc["_id"] for other in self.docs):
+                raise DuplicateKeyError("duplicate _id", DUPLICATE_KEY_ERROR)
+            self.docs.append(doc)
+            upserted_id = doc.get("_id")
+            doc.update(update.get("$setOnInsert", {}) if isinstance(update, dict) else {})
+        if isinstance(update, list):
+            # Pipeline update: stages of $set with aggregation expressions
+            for stage in update:
+                doc.update({field: evaluate(value, doc) for field, value in stage["$set"].items()})
+            return SimpleNamespace(matched_count=0 if upserted_id else 1, upserted_id=upserted_id, doc=doc)
+        doc.update(update.get("$set", {}))
+        for field, value in update.get("$inc", {}).items():
+            doc[field] = doc.get(field, 0) + value
+        for field, value in update.get("$push", {}).items():
+            items = doc.setdefault(field, [])
+            items.extend(value["$each"] if isinstance(value, dict) else [value])
+            if isinstance(value, dict) and "$slice" in value:
+                doc[field] = items[value["$slice"]:]
+        return SimpleNamespace(matched_count=0 if upserted_id else 1, upserted_id=upserted_id, doc=doc)
+
+    async def bulk_write(self, requests, ordered=True):
+        """Ordered ``UpdateOne`` batches only."""
+        for index, request in enumerate(requests):
+            try:
+                await self.update_one(request._filter, request._doc, upsert=request._upsert)
+            except DuplicateKeyError as e:
+                raise BulkWriteError({"writeErrors": [{"index": index, "code": e.code, "errmsg": str(e)}]})
+
+    async def find_one_and_update(self, query, update, projection=None, upsert=False, return_document=None):
+        """Only ``return_document=AFTER`` semantics are needed."""
+        result = await self.update_one(query, update, upsert=upsert)
+        return dict(result.doc) if result.doc is not None else None
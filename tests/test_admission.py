@@ -0,0 +1,45 @@
+"""Tests for admission control and priority load shedding."""
+import pytest
+from httpx import AsyncClient
+from backend.main import app
+from routes.chat import FALLBACK_MODEL
+from utils.admission import AdmissionController, admission
+from utils.metrics import metrics
+
+
+def test_low_priority_shed_first_and_contact_never():
+    """Test health sheds before chat, and contact is always admitted."""
+    controller = AdmissionController(max_in_flight=10, max_loop_lag_ms=100, low_priority_ratio=0.5, lag_interval=0.1)
+    controller.in_flight = 6
+    assert controller.should_shed("health")
+    assert not controller.should_shed("chat")
+
+    controller.loop_lag_ms = 150
+    before = metrics.get_counter("admission_shed", route="chat", reason="loop_lag")
+    assert controller.should_shed("chat")
+    assert metrics.get_counter("admission_shed", route="chat", reason="loop_lag") == before + 1
+    assert not controller.should_shed("contact")
+
+
+@pytest.mark.asyncio
+async def test_overloaded_chat_gets_fallback_and_health_snapshot(monkeypatch):
+    """Test shed chat turns get the canned reply and health serves its last report."""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        fresh = await client.get("/api/chat/health")
+        fresh_api = await client.get("/api/health")
+        # Any request in flight now counts as full load
+        monkeypatch.setattr(admission, "max_in_flight", 1)
+
+        chat = await client.post("/api/chat", json={
+            "session_id": "test_session_shed",
+            "message": "Как встроить ваш виджет в наш сайт с кастомной авторизацией?",
+        })
+        health = await client.get("/api/chat/health")
+        health_api = await client.get("/api/health")
+
+    assert chat.status_code == 200
+    assert chat.json()["model"] == FALLBACK_MODEL
+    assert health.json()["cached"] is True
+    assert health.json()["timestamp"] == fresh.json()["timestamp"]
+    assert health_api.json()["cached"] is True
+    assert health_api.json()["timestamp"] == fresh_api.json()["timestamp"]
@@ -0,0 +1,189 @@
+"""Tests for AI client registry and connection pooling."""
+import json
+
+import httpx
+import pytest
+from utils.ai_clients import (
+    AIClientError,
+    AIClientRegistry,
+    CircuitBreaker,
+    CircuitOpenError,
+    AnthropicClient,
+    EmergentClient,
+    GeminiClient,
+    OpenAIClient,
+    get_ai_client,
+)
+from utils.metrics import metrics
+
+
+def test_get_ai_client_returns_shared_instances():
+    """Test the factory reuses one client per provider."""
+    assert get_ai_client("gpt-4o-mini") is get_ai_client("gpt-4o")
+    assert isinstance(get_ai_client("gpt-4o-mini"), OpenAIClient)
+    assert isinstance(get_ai_client("claude-sonnet"), AnthropicClient)
+    assert isinstance(get_ai_client("gemini-1.5-flash"), GeminiClient)
+    assert isinstance(get_ai_client("llama-3"), EmergentClient)
+
+
+@pytest.mark.asyncio
+async def test_registry_start_and_close():
+    """Test registry opens one pool per provider and closes them."""
+    registry = AIClientRegistry()
+    registry.start()
+    client = registry.get("openai")
+    http = client.http
+    assert client.http is http
+    assert not http.is_closed
+
+    await registry.close()
+    assert http.is_closed
+
+
+class FlakyClient(OpenAIClient):
+    """OpenAI client whose transport is replaced by a scripted outcome."""
+
+    def __init__(self):
+        super().__init__()
+        self.api_key = "test"
+        self.fail = True
+        self.calls = 0
+
+    async def _generate(self, messages, model, max_tokens):
+        self.calls += 1
+        if self.fail:
+            raise AIClientError("boom")
+        return "ok"
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_opens_and_probes(monkeypatch):
+    """Test breaker fails fast when open and closes after a good probe."""
+    client = FlakyClient()
+    client.breaker = CircuitBreaker("openai", failure_threshold=2, reset_timeout=30)
+
+    for _ in range(2):
+        with pytest.raises(AIClientError):
+            await client.generate([], "gpt-4o-mini")
+    assert client.breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        await client.generate([], "gpt-4o-mini")
+    assert client.calls == 2
+
+    # Cool-down elapsed: one probe is admitted and closes the circuit
+    client.breaker.opened_at -= 30
+    assert client.breaker.state == CircuitBreaker.HALF_OPEN
+    client.fail = False
+    assert await client.generate([], "gpt-4o-mini") == "ok"
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_client_errors_do_not_trip_breaker():
+    """Test 4xx responses leave the breaker closed while 5xx responses open it."""
+    status = 400
+
+    def handler(request):
+        return httpx.Response(status, json={"error": {"message": "nope"}})
+
+    client = OpenAIClient()
+    client.api_key = "test"
+    client._http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client.breaker = CircuitBreaker("openai", failure_threshold=2, reset_timeout=30)
+
+    for _ in range(3):
+        with pytest.raises(AIClientError):
+            await client.generate([], "gpt-4o-mini")
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+    status = 500
+    for _ in range(2):
+        with pytest.raises(AIClientError):
+            await client.generate([], "gpt-4o-mini")
+    assert client.breaker.state == CircuitBreaker.OPEN
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_anthropic_stream_counts_output_tokens_once():
+    """Test streamed output tokens come from message_delta only, not message_start as well."""
+    events = [
+        {"type": "message_start", "message": {"usage": {"input_tokens": 50, "output_tokens": 1}}},
+        {"type": "content_block_delta", "delta": {"text": "Привет"}},
+        {"type": "message_delta", "usage": {"output_tokens": 12}},
+    ]
+    body = "".join(f"data: {json.dumps(event)}\n\n" for event in events)
+    client = AnthropicClient()
+    client.api_key = "test"
+    client._http = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, text=body)))
+    labels = dict(provider="anthropic", model="claude-test")
+    before = {kind: metrics.get_counter("llm_tokens", **labels, kind=kind) for kind in ("input", "output")}
+
+    assert [text async for text in client._generate_stream([], "claude-test", 100)] == ["Привет"]
+
+    assert metrics.get_counter("llm_tokens", **labels, kind="input") == before["input"] + 50
+    assert metrics.get_counter("llm_tokens", **labels, kind="output") == before["output"] + 12
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_emergent_client_reuses_openai_requests():
+    """Test the Emergent client only swaps the endpoint and the error label."""
+    client = EmergentClient()
+    client.api_key = "test"
+    client._http = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(400)))
+
+    with pytest.raises(AIClientError, match="^Emergent API error"):
+        await client._generate([], "gpt-4o-mini", 100)
+    await client.aclose()
+
+
+def test_circuit_breaker_single_probe():
+    """Test half-open admits one probe and a failed probe re-opens."""
+    breaker = CircuitBreaker("openai", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    breaker.opened_at -= 30
+
+    breaker.acquire()
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_anthropic_payload_marks_cache_breakpoints():
+    """Test the static system prompt and prior turns carry cache_control."""
+    client = AnthropicClient()
+    client.api_key = "test"
+    messages = [
+        {"role": "system", "content": "static prompt"},
+        {"role": "user", "content": "hi"},
+        {"role": "assistant", "content": "hello"},
+        {"role": "system", "content": "catalog"},
+        {"role": "user", "content": "prices?"},
+    ]
+
+    _, payload = client._build_request(messages, "claude-3-5-haiku-latest", 1000)
+
+    assert payload["system"] == [{"type": "text", "text": "static prompt", "cache_control": {"type": "ephemeral"}}]
+    assert payload["messages"][1]["content"][0]["cache_control"] == {"type": "ephemeral"}
+    assert payload["messages"][2]["content"] == "catalog\n\nprices?"
+    assert messages[2]["content"] == "hello"  # caller's messages untouched
+
+
+def test_gemini_first_turn_keeps_catalog_out_of_system_instruction():
+    """Test per-turn catalog text is sent with the user message, not the system instruction."""
+    client = GeminiClient()
+    client.api_key = "test"
+    messages = [
+        {"role": "system", "content": "static prompt"},
+        {"role": "system", "content": "catalog"},
+        {"role": "user", "content": "prices?"},
+    ]
+
+    payload = client._build_payload(messages, 300)
+
+    assert payload["system_instruction"] == {"parts": [{"text": "static prompt"}]}
+    assert payload["contents"] == [{"role": "user", "parts": [{"text": "catalog\n\nprices?"}]}]
@@ -0,0 +1,136 @@
+"""Tests for latency-aware AI routing and failover."""
+import asyncio
+
+import pytest
+from utils.ai_clients import AIClientError, CircuitBreaker
+from utils.ai_router import AIRouter, Route, RouteStats
+
+
+class FakeClient:
+    """Provider client stub with a fixed delay and optional failure."""
+
+    def __init__(self, reply="ok", delay=0.0, fail=False):
+        self.api_key = "test"
+        self.reply = reply
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.breaker = CircuitBreaker("fake", failure_threshold=5, reset_timeout=30)
+
+    async def generate(self, messages, model, timeout=None, max_tokens=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise AIClientError("provider down")
+        return self.reply
+
+    async def generate_stream(self, messages, model, first_token_timeout=None, max_tokens=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise AIClientError("provider down")
+        for word in self.reply.split():
+            yield word
+
+
+@pytest.fixture
+def fake_clients(monkeypatch):
+    clients = {}
+    monkeypatch.setattr(Route, "client", property(lambda route: clients[route.provider]))
+    return clients
+
+
+@pytest.mark.asyncio
+async def test_router_fails_over_to_next_provider(fake_clients):
+    """Test a failing primary route falls through to the next one."""
+    fake_clients["openai"] = FakeClient(fail=True)
+    fake_clients["anthropic"] = FakeClient(reply="from claude")
+    router = AIRouter(["openai:gpt-4o-mini", "anthropic:claude-3-5-haiku-latest"])
+
+    text, model = await router.generate([])
+
+    assert (text, model) == ("from claude", "claude-3-5-haiku-latest")
+    assert router.routes[0].stats.failures == 1
+    # The healthy, measured route is now preferred
+    assert router.ranked_routes()[0].provider == "anthropic"
+
+
+@pytest.mark.asyncio
+async def test_router_prefers_fastest_route(fake_clients):
+    """Test ranking follows measured EWMA latency."""
+    fake_clients["openai"] = FakeClient(delay=0.05)
+    fake_clients["gemini"] = FakeClient(delay=0.0)
+    router = AIRouter(["openai:gpt-4o-mini", "gemini:gemini-1.5-flash"])
+    router.routes[0].stats.record_success(0.05)
+    router.routes[1].stats.record_success(0.001)
+
+    _, model = await router.generate([])
+
+    assert model == "gemini-1.5-flash"
+
+
+@pytest.mark.asyncio
+async def test_router_raises_when_all_routes_fail(fake_clients):
+    """Test AIClientError is raised once every route failed."""
+    fake_clients["openai"] = FakeClient(fail=True)
+    fake_clients["gemini"] = FakeClient(fail=True)
+    router = AIRouter(["openai:gpt-4o-mini", "gemini:gemini-1.5-flash"])
+
+    with pytest.raises(AIClientError):
+        await router.generate([])
+
+
+@pytest.mark.asyncio
+async def test_router_stream_fails_over_before_first_token(fake_clients):
+    """Test streaming switches route when the first one fails up front."""
+    fake_clients["openai"] = FakeClient(fail=True)
+    fake_clients["gemini"] = FakeClient(reply="hello there")
+    router = AIRouter(["openai:gpt-4o-mini", "gemini:gemini-1.5-flash"])
+
+    chunks = [item async for item in router.generate_stream([])]
+
+    assert chunks == [("gemini-1.5-flash", "hello"), ("gemini-1.5-flash", "there")]
+
+
+@pytest.mark.asyncio
+async def test_stream_latency_kept_apart_from_completion_latency(fake_clients):
+    """Test time to first token does not feed the full-completion latency."""
+    fake_clients["openai"] = FakeClient(reply="hello there")
+    router = AIRouter(["openai:gpt-4o-mini"])
+    stats = router.routes[0].stats
+    stats.record_success(2.0)
+
+    [item async for item in router.generate_stream([])]
+
+    assert stats.ewma_latency == 2.0 and stats.requests == 2
+    assert router.routes[0].first_token_stats.ewma_latency < 2.0
+
+
+def test_unhealthy_route_recovers_while_idle(monkeypatch):
+    """Test an idle route's error rate decays so it is retried."""
+    clock = [100.0]
+    monkeypatch.setattr("utils.ai_router.time.monotonic", lambda: clock[0])
+    stats = RouteStats(alpha=0.5, error_half_life=30)
+    stats.record_failure()
+    stats.record_failure()
+    assert stats.error_rate == 0.75
+
+    clock[0] += 60
+    assert stats.error_rate == 0.1875
+    stats.record_success()
+    assert stats.error_rate == 0.09375
+
+
+@pytest.mark.asyncio
+async def test_router_skips_open_circuit(fake_clients):
+    """Test routes whose breaker is open are not tried at all."""
+    fake_clients["openai"] = FakeClient(reply="primary")
+    fake_clients["gemini"] = FakeClient(reply="secondary")
+    for _ in range(5):
+        fake_clients["openai"].breaker.record_failure()
+    router = AIRouter(["openai:gpt-4o-mini", "gemini:gemini-1.5-flash"])
+
+    _, model = await router.generate([])
+
+    assert model == "gemini-1.5-flash"
+    assert fake_clients["openai"].calls == 0
@@ -1,7 +1,11 @@
 """Tests for chat API endpoint."""
+import asyncio
+import json
 import pytest
 from httpx import AsyncClient
 from backend.main import app
+from routes import chat
+from utils.routing_policy import RoutingDecision
 
 
 @pytest.mark.asyncio
@@ -62,3 +66,75 @@ async def test_chat_endpoint_empty_message():
         
     # Should accept empty string but may return error from AI
     assert response.status_code in [200, 400, 500]
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_endpoint():
+    """Test streaming chat endpoint emits token events and a done event."""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post("/api/chat/stream", json={
+            "session_id": "test_session_stream",
+            "message": "Какие услуги вы предлагаете?",
+            "model": "gpt-4o"
+        })
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [
+        json.loads(line[len("data: "):])
+        for line in response.text.splitlines()
+        if line.startswith("data: ")
+    ]
+    assert events[-1]["type"] == "done"
+    assert events[-1]["session_id"] == "test_session_stream"
+    assert any(event["type"] == "token" and event["content"] for event in events)
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_endpoint_missing_message():
+    """Test streaming chat endpoint validation."""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post("/api/chat/stream", json={
+            "session_id": "test_session"
+        })
+
+    assert response.status_code == 422
+
+
+class BrokenStreamRouter:
+    """Router stub whose stream breaks off after the first delta."""
+
+    async def generate_stream(self, messages, max_tokens=None):
+        yield "gpt-4o-mini", "Лендинг стоит"
+        raise ConnectionError("stream reset")
+
+
+class RecordingContext:
+    def __init__(self):
+        self.saved = []
+
+    async def save_message(self, session_id, message, reply):
+        self.saved.append(reply)
+
+
+@pytest.mark.asyncio
+async def test_broken_stream_not_cached(monkeypatch):
+    """Test a reply whose stream broke off is reported as the fallback and not cached."""
+    remembered = []
+
+    async def remember_reply(cache_key, embedding, message, reply):
+        remembered.append(reply)
+
+    monkeypatch.setattr(chat, "remember_reply", remember_reply)
+    context = RecordingContext()
+    queue = asyncio.Queue()
+    reply_meta = {}
+    body = chat.ChatRequest(session_id="test_session_broken", message="Сколько стоит лендинг?")
+
+    await chat._produce_stream(
+        context, body, [], queue, reply_meta, RoutingDecision("fast", BrokenStreamRouter(), None), cache_key="key"
+    )
+
+    assert reply_meta["model"] == chat.FALLBACK_MODEL
+    assert remembered == []
+    assert context.saved == ["Лендинг стоит"]
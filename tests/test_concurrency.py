@@ -0,0 +1,84 @@
+"""Tests for the adaptive concurrency limiter and 429 handling."""
+import asyncio
+
+import httpx
+import pytest
+from utils.ai_clients import OpenAIClient
+from utils.concurrency import AdaptiveLimiter, LimiterRejected
+
+
+def make_limiter(**overrides):
+    options = dict(initial_limit=2, min_limit=1, max_limit=4, max_queue=1)
+    options.update(overrides)
+    return AdaptiveLimiter("test", **options)
+
+
+@pytest.mark.asyncio
+async def test_limiter_queues_and_rejects_when_full():
+    """Test calls over the limit queue and a full queue is rejected."""
+    limiter = make_limiter()
+    await limiter.acquire(1.0)
+    await limiter.acquire(1.0)
+
+    queued = asyncio.create_task(limiter.acquire(1.0))
+    await asyncio.sleep(0)
+    assert limiter.queue_depth == 1
+
+    with pytest.raises(LimiterRejected, match="queue_full"):
+        await limiter.acquire(1.0)
+
+    limiter.release(latency=0.1)
+    await queued
+    assert limiter.in_flight == 2
+    assert limiter.queue_depth == 0
+
+
+@pytest.mark.asyncio
+async def test_limiter_rejects_after_max_wait():
+    """Test a queued call gives up once its wait budget runs out."""
+    limiter = make_limiter(initial_limit=1)
+    await limiter.acquire(1.0)
+
+    with pytest.raises(LimiterRejected, match="timeout"):
+        await limiter.acquire(0.01)
+    assert limiter.queue_depth == 0
+
+
+@pytest.mark.asyncio
+async def test_limiter_additive_increase_multiplicative_decrease():
+    """Test successes grow the limit and an overload halves it once per interval."""
+    limiter = make_limiter()
+    for _ in range(4):
+        await limiter.acquire(1.0)
+        limiter.release(latency=0.1)
+    grown = limiter.limit
+    assert grown > 3
+
+    limiter.record_overload()
+    limiter.record_overload()  # same burst: ignored
+    assert limiter.limit == pytest.approx(grown / 2)
+
+
+@pytest.mark.asyncio
+async def test_client_honours_retry_after(monkeypatch):
+    """Test a 429 with Retry-After is retried and shrinks the limit."""
+    sleeps = []
+
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+
+    responses = [
+        httpx.Response(429, headers={"retry-after": "1"}),
+        httpx.Response(200, json={"choices": [{"message": {"content": "ok"}}]}),
+    ]
+    client = OpenAIClient()
+    client.api_key = "test"
+    client._http = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: responses.pop(0)))
+    monkeypatch.setattr("utils.ai_clients.asyncio.sleep", fake_sleep)
+    limit = client.limiter.limit
+
+    assert await client.generate([{"role": "user", "content": "hi"}], "gpt-4o-mini") == "ok"
+    assert len(sleeps) == 1 and 1.0 <= sleeps[0] <= 1.35
+    assert client.limiter.limit < limit
+    assert client.limiter.in_flight == 0
+    await client.aclose()
@@ -0,0 +1,64 @@
+"""Tests for the write-through session context cache."""
+import pytest
+from memory.context_cache import SessionContextCache, turn_size
+from memory.smart_context import SmartContext
+from tests.fake_mongo import FakeCollection
+
+
+@pytest.fixture
+def context():
+    cache = SessionContextCache(max_bytes=10_000, ttl_seconds=60, max_turns=20)
+    smart_context = SmartContext(None)
+    smart_context.chat_collection = FakeCollection()
+    smart_context.counter_collection = FakeCollection()
+    smart_context.cache = cache
+    return smart_context
+
+
+@pytest.mark.asyncio
+async def test_saved_turns_served_from_cache(context):
+    """Test a session's history hits MongoDB once and then the cache."""
+    assert await context.get_context("s1") == []
+    await context.save_message("s1", "Привет", "Здравствуйте!")
+    await context.save_message("s1", "Цена сайта?", "От 50 000 ₽")
+    context.chat_collection.finds = 0
+
+    history = await context.get_context("s1")
+
+    assert history == [
+        {"user": "Привет", "assistant": "Здравствуйте!"},
+        {"user": "Цена сайта?", "assistant": "От 50 000 ₽"},
+    ]
+    assert context.chat_collection.finds == 0
+
+
+@pytest.mark.asyncio
+async def test_uncached_session_not_written_partially(context):
+    """Test a save for an uncached session leaves the next read to MongoDB."""
+    await context.save_message("s2", "one", "two")
+    assert context.cache.get("s2") is None
+    context.chat_collection.finds = 0
+    assert await context.get_context("s2") == [{"user": "one", "assistant": "two"}]
+    assert context.chat_collection.finds == 2  # index-only marker + window
+
+
+def test_cache_bounded_in_bytes():
+    """Test least recently used sessions are evicted past the byte limit."""
+    turn = {"user_message": "x" * 300, "ai_response": "y" * 300}
+    cache = SessionContextCache(max_bytes=turn_size(turn) * 2, ttl_seconds=60, max_turns=5)
+    cache.put("a", [turn])
+    cache.put("b", [turn])
+    cache.get("a")
+    cache.put("c", [turn])
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.size <= cache.max_bytes
+
+
+def test_cache_entries_expire():
+    """Test expired sessions count as misses."""
+    cache = SessionContextCache(max_bytes=10_000, ttl_seconds=-1, max_turns=5)
+    cache.put("a", [])
+    assert cache.get("a") is None
+    assert cache.size == 0
@@ -0,0 +1,69 @@
+"""Tests for context window selection by cumulative token totals."""
+from datetime import datetime
+
+import pytest
+from config.settings import settings
+from memory.smart_context import SmartContext
+from tests.fake_mongo import FakeCollection
+
+
+@pytest.fixture
+def context(monkeypatch):
+    monkeypatch.setattr(settings, "max_context_tokens", 100)
+    smart_context = SmartContext(None)
+    smart_context.chat_collection = FakeCollection()
+    smart_context.counter_collection = FakeCollection()
+    smart_context.cache = None
+    return smart_context
+
+
+@pytest.mark.asyncio
+async def test_turns_store_running_token_total(context):
+    """Test each turn carries the session's cumulative token count."""
+    for i in range(3):
+        await context.save_message("s1", "x" * 80, "y" * 40)
+    await context.save_message("s2", "x" * 80, "y" * 40)
+
+    totals = [doc["cum_tokens"] for doc in context.chat_collection.docs]
+    assert totals == [30, 60, 90, 30]
+    counters = {doc["_id"]: doc["cum_tokens"] for doc in context.counter_collection.docs}
+    assert counters == {"s1": 90, "s2": 30}
+
+
+@pytest.mark.asyncio
+async def test_only_fitting_turns_requested(context):
+    """Test the query asks MongoDB only for turns inside the token budget."""
+    for i in range(6):
+        await context.save_message("s1", f"{i} " + "x" * 78, "y" * 40)
+
+    history = await context.get_context("s1")
+
+    assert context.chat_collection.last_query == {"session_id": "s1", "cum_tokens": {"$not": {"$lte": 80}}}
+    assert [turn["user"][0] for turn in history] == ["3", "4", "5"]
+
+
+@pytest.mark.asyncio
+async def test_legacy_turns_without_totals_still_load(context):
+    """Test sessions saved before cum_tokens existed use the timestamp scan."""
+    context.chat_collection.docs = [
+        {"session_id": "old", "user_message": "a", "ai_response": "b", "tokens_user": 1, "tokens_ai": 1, "timestamp": 1},
+    ]
+
+    assert await context.get_context("old") == [{"user": "a", "assistant": "b"}]
+
+
+@pytest.mark.asyncio
+async def test_mixed_legacy_and_new_turns(context):
+    """Test new turns continue a legacy session and its old turns stay in the window."""
+    context.chat_collection.docs = [
+        {"session_id": "old", "user_message": f"old {i}", "ai_response": "b",
+         "tokens_user": 5, "tokens_ai": 5, "timestamp": datetime(2024, 1, 1, 0, i)}
+        for i in range(2)
+    ]
+    await context.save_message("old", "new 0", "b")
+    await context.save_message("old", "new 1", "b")
+
+    first, second = [doc.get("cum_tokens") for doc in context.chat_collection.docs][2:]
+    assert 0 < first < second
+    history = await context.get_context("old")
+    assert [turn["user"] for turn in history] == ["old 0", "old 1", "new 0", "new 1"]
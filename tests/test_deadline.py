@@ -0,0 +1,99 @@
+"""Tests for request deadlines and cancellation on client disconnect."""
+import asyncio
+
+import pytest
+from httpx import AsyncClient
+from backend.main import app
+from routes import chat
+from utils.deadline import (
+    ClientDisconnected,
+    DeadlineExceeded,
+    bound_timeout,
+    cancel_on_disconnect,
+    detached_context,
+    request_deadline,
+    time_remaining,
+    within_deadline,
+)
+from utils.routing_policy import RoutingDecision
+
+
+class SlowRouter:
+    """Router stub whose generate call never finishes on its own."""
+
+    def __init__(self):
+        self.cancelled = False
+
+    async def generate(self, messages, max_tokens=None):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return "late", "slow-model"
+
+
+class DisconnectingRequest:
+    async def is_disconnected(self):
+        return True
+
+
+@pytest.mark.asyncio
+async def test_deadline_bounds_timeouts_and_awaits():
+    """Test the deadline shortens timeouts, cancels slow steps and never extends."""
+    assert time_remaining() is None
+    with request_deadline(0.05):
+        assert bound_timeout(10) <= 0.05
+        with request_deadline(5):
+            assert time_remaining() <= 0.05
+        with pytest.raises(DeadlineExceeded):
+            await within_deadline(asyncio.sleep(1))
+    assert bound_timeout(10) == 10
+
+
+@pytest.mark.asyncio
+async def test_background_work_is_detached_from_deadline():
+    """Test tasks started with a detached context see no deadline."""
+    async def left():
+        return time_remaining()
+
+    with request_deadline(1):
+        inherited = await asyncio.create_task(left())
+        detached = await asyncio.create_task(left(), context=detached_context())
+    assert inherited is not None
+    assert detached is None
+
+
+@pytest.mark.asyncio
+async def test_disconnect_cancels_pending_work():
+    """Test a client disconnect cancels the awaited call."""
+    router = SlowRouter()
+    with pytest.raises(ClientDisconnected):
+        await cancel_on_disconnect(DisconnectingRequest(), router.generate([]), poll_interval=0.01)
+    await asyncio.sleep(0)
+    assert router.cancelled
+
+
+@pytest.mark.asyncio
+async def test_chat_cancelled_when_client_disconnects(monkeypatch):
+    """Test the chat endpoint stops the LLM call and saves nothing after a disconnect."""
+    router = SlowRouter()
+    saved = []
+
+    async def save_message(self, session_id, message, reply):
+        saved.append(reply)
+
+    monkeypatch.setattr(chat.settings, "chat_disconnect_poll_interval", 0.01)
+    monkeypatch.setattr(chat.routing_policy, "decide", lambda message, history: RoutingDecision("rich", router, None))
+    monkeypatch.setattr("starlette.requests.Request.is_disconnected", DisconnectingRequest.is_disconnected)
+    monkeypatch.setattr(chat.SmartContext, "save_message", save_message)
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post("/api/chat", json={
+            "session_id": "test_session_disconnect",
+            "message": "Как встроить ваш виджет в наш старый сайт на Битриксе с кастомной авторизацией?",
+        })
+
+    assert response.status_code == chat.CLIENT_CLOSED_STATUS
+    assert router.cancelled
+    assert saved == []
@@ -0,0 +1,67 @@
+"""Tests for the FAQ fast path."""
+import pytest
+from httpx import AsyncClient
+from backend.main import app
+from routes.chat import FAQ_MODEL, get_fallback_response
+from utils.aho_corasick import AhoCorasick
+from utils.faq import OFF_TOPIC_REPLY, faq_engine
+
+
+def test_aho_corasick_finds_overlapping_phrases():
+    """Test every pattern occurrence is reported with its token offsets."""
+    automaton = AhoCorasick()
+    automaton.add(["анализ", "сайт"], "audit")
+    automaton.add(["сайт"], "site")
+    automaton.build()
+
+    assert automaton.find(["нужен", "анализ", "сайт"]) == [(1, 3, "audit"), (2, 3, "site")]
+
+
+def test_pricing_answered_from_catalog():
+    """Test a price question naming a service gets that section's prices."""
+    answer = faq_engine.answer("Сколько стоит лендинг?")
+
+    assert answer.intent == "pricing"
+    assert "50 000 ₽" in answer.text and "Фирменный стиль" not in answer.text
+
+
+def test_longest_service_phrase_wins():
+    """Test "анализ сайта" picks the audit section, not website development."""
+    match = faq_engine.match("Сколько стоит анализ сайта?")
+    assert [section.title for section in match.sections] == ["Цифровой аудит"]
+
+
+def test_unclear_or_long_messages_go_to_llm():
+    """Test vague, long or follow-up questions are not answered from templates."""
+    assert faq_engine.answer("Хочу сайт") is None
+    assert faq_engine.answer(
+        "Сколько стоит сайт для ресторана с доставкой, личным кабинетом, "
+        "интеграцией с iiko и онлайн-оплатой через эквайринг?"
+    ) is None
+    assert faq_engine.answer("Какие у вас услуги?", first_turn=False) is None
+
+
+def test_count_questions_are_not_timelines():
+    """Test "сколько" without a time word does not trigger the timeline template."""
+    assert faq_engine.answer("Сколько страниц будет на лендинге?") is None
+    assert faq_engine.answer("За сколько страниц отвечает лендинг?") is None
+    assert faq_engine.answer("За сколько недель сделаете лендинг?").intent == "timeline"
+
+
+def test_fallback_redirects_off_topic():
+    """Test the LLM-failure fallback keeps its soft redirect for off-topic questions."""
+    assert get_fallback_response("Какая завтра погода?") == OFF_TOPIC_REPLY
+
+
+@pytest.mark.asyncio
+async def test_chat_answers_faq_without_llm():
+    """Test the chat endpoint serves a clear price question from the fast path."""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post("/api/chat", json={
+            "session_id": "test_session_faq",
+            "message": "Сколько стоит интернет-магазин?",
+        })
+
+    assert response.status_code == 200
+    assert response.json()["model"] == FAQ_MODEL
+    assert "250 000 ₽" in response.json()["response"]
@@ -41,6 +41,7 @@ async def test_chat_health_endpoint():
     data = response.json()
     assert "status" in data
     assert "timestamp" in data
+    assert data["circuit_breakers"]["openai"]["state"] == "closed"
 
 
 @pytest.mark.asyncio
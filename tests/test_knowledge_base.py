@@ -0,0 +1,84 @@
+"""Tests for the service catalog knowledge base."""
+import os
+
+from utils.knowledge_base import BUNDLED_CATALOG, KnowledgeBase, parse_catalog
+from utils.metrics import metrics
+
+CATALOG = """# Каталог
+
+## Разработка сайтов
+- Лендинги (от 50 000 ₽)
+
+## Дизайн
+- Фирменный стиль (от 70 000 ₽)
+"""
+
+
+def make_kb(path):
+    return KnowledgeBase(path, top_k=1, min_score=0.0, reload_interval=0)
+
+
+def test_bundled_catalog_parses():
+    """Test the shipped catalog has the services of the old inline prompt."""
+    sections = parse_catalog(BUNDLED_CATALOG.read_text(encoding="utf-8"))
+    assert [section.title for section in sections] == [
+        "Разработка сайтов", "AI-ассистенты и чат-боты", "Цифровой аудит", "Дизайн", "Техподдержка",
+    ]
+
+
+def test_only_relevant_sections_injected(tmp_path):
+    """Test a message gets its matching section plus the overview, not the whole catalog."""
+    path = tmp_path / "catalog.md"
+    path.write_text(CATALOG, encoding="utf-8")
+    kb = make_kb(path)
+    saved = metrics.get_counter("knowledge_prompt_tokens_saved")
+
+    text = kb.lookup("Сколько стоит фирменный стиль?")
+
+    assert "70 000" in text and "50 000" not in text
+    assert "Разработка сайтов" in text  # listed in the overview
+    assert metrics.get_counter("knowledge_prompt_tokens_saved") > saved
+
+
+def test_lookup_does_not_run_tokenizer(tmp_path, monkeypatch):
+    """Test lookups use the section token counts taken at load time."""
+    path = tmp_path / "catalog.md"
+    path.write_text(CATALOG, encoding="utf-8")
+    kb = make_kb(path)
+    kb.load()
+
+    def count(self, text):
+        raise AssertionError("tokenizer called on the request path")
+
+    monkeypatch.setattr("memory.tokenizer.Tokenizer.count", count)
+    assert "70 000" in kb.lookup("Сколько стоит фирменный стиль?")
+
+
+def test_catalog_hot_reload(tmp_path):
+    """Test an edited catalog is picked up without a restart and changes the version."""
+    path = tmp_path / "catalog.md"
+    path.write_text(CATALOG, encoding="utf-8")
+    kb = make_kb(path)
+    kb.lookup("лендинг")
+    version = kb.version
+
+    path.write_text(CATALOG.replace("50 000", "60 000"), encoding="utf-8")
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+
+    assert "60 000" in kb.lookup("лендинг")
+    assert kb.version != version
+
+
+def test_broken_catalog_keeps_previous(tmp_path):
+    """Test a catalog without sections does not replace the loaded one."""
+    path = tmp_path / "catalog.md"
+    path.write_text(CATALOG, encoding="utf-8")
+    kb = make_kb(path)
+    kb.lookup("лендинг")
+
+    path.write_text("oops", encoding="utf-8")
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+
+    assert "50 000" in kb.lookup("лендинг")
@@ -0,0 +1,64 @@
+"""Tests for the offline mock LLM provider server against the real clients."""
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+from config.settings import settings
+from utils.ai_clients import AIClientError, AnthropicClient, GeminiClient, OpenAIClient
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+import mock_llm_server  # noqa: E402
+
+MESSAGES = [{"role": "system", "content": "prompt"}, {"role": "user", "content": "Привет"}]
+
+
+@pytest.fixture
+def mock_provider(monkeypatch):
+    """Point every client at the in-process mock server."""
+    monkeypatch.setattr(settings, "openai_base_url", "http://mock/v1")
+    monkeypatch.setattr(settings, "anthropic_base_url", "http://mock/v1")
+    monkeypatch.setattr(settings, "gemini_base_url", "http://mock/v1beta")
+    monkeypatch.setattr(settings, "ai_retry_max_attempts", 0)
+    mock_llm_server.state.config = mock_llm_server.MockConfig(
+        latency_ms=0, tokens_per_second=0, reply_tokens=5
+    )
+    mock_llm_server.state.stats.clear()
+
+    def build(client_class):
+        client = client_class()
+        client.api_key = "test"
+        client._http = httpx.AsyncClient(transport=httpx.ASGITransport(app=mock_llm_server.app))
+        return client
+
+    return build
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("client_class,model", [
+    (OpenAIClient, "gpt-4o-mini"),
+    (AnthropicClient, "claude-3-5-haiku-latest"),
+    (GeminiClient, "gemini-1.5-flash"),
+])
+async def test_clients_speak_mock_wire_formats(mock_provider, client_class, model):
+    """Test full and streamed replies parse for every provider format."""
+    client = mock_provider(client_class)
+
+    text = await client.generate(MESSAGES, model)
+    deltas = [delta async for delta in client.generate_stream(MESSAGES, model)]
+
+    assert len(text.split()) == 5
+    assert "".join(deltas) == text
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_mock_throttles_with_retry_after(mock_provider):
+    """Test the configured 429 share reaches the client with Retry-After."""
+    mock_llm_server.state.config.rate_limit_rate = 1.0
+    client = mock_provider(OpenAIClient)
+
+    with pytest.raises(AIClientError, match="429"):
+        await client.generate(MESSAGES, "gpt-4o-mini")
+    assert mock_llm_server.state.stats["openai_throttled"] == 1
+    await client.aclose()
@@ -0,0 +1,76 @@
+"""Tests for versioned prompt templates and the prompt-overhead budget."""
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from config.settings import settings
+from memory.smart_context import SmartContext
+from memory.tokenizer import tokenizers
+from routes import chat
+from routes.chat import SYSTEM_PROMPT, prompt_overhead
+from tests.fake_mongo import FakeCollection
+from utils.prompts import PromptRegistry, PromptTemplate, prompts
+
+
+def test_templates_loaded_with_versions():
+    """Test bundled templates load once with content-hash versions."""
+    template = prompts.get("chat_system")
+    assert template.text == SYSTEM_PROMPT
+    assert template.version == PromptTemplate("copy", SYSTEM_PROMPT).version
+    assert prompts.get("summary").render(max_words=10).count("10") == 1
+
+
+@pytest.mark.asyncio
+async def test_token_counts_precomputed_per_tokenizer(tmp_path):
+    """Test warm-up counts each template once per model tokenizer."""
+    (tmp_path / "hello.md").write_text("Привет, мир\n", encoding="utf-8")
+    registry = PromptRegistry(tmp_path)
+
+    await registry.warm_up(["gpt-4o-mini", "claude-3-5-haiku-latest"])
+
+    template = registry.get("hello")
+    assert template.text == "Привет, мир"
+    assert len(template._tokens) == 2
+    assert template.tokens("gpt-4o-mini") == tokenizers.for_model("gpt-4o-mini").count("Привет, мир")
+
+
+@pytest.mark.asyncio
+async def test_prompt_overhead_counts_everything_but_history():
+    """Test the reserved budget covers the system prompt, catalog and message."""
+    tokenizer = tokenizers.for_model(None)
+    overhead = await prompt_overhead("вопрос", "справка")
+    assert overhead >= prompts.get("chat_system").tokens() + tokenizer.count("вопрос")
+
+
+@pytest.mark.asyncio
+async def test_prompt_overhead_fits_every_tier(monkeypatch):
+    """Test the reserve is counted with each tier's model and covers the largest."""
+    models = ["gpt-4o-mini", "claude-3-5-sonnet-latest"]
+    routers = {tier: SimpleNamespace(primary_model=model) for tier, model in zip(["simple", "rich"], models)}
+    monkeypatch.setattr(chat.routing_policy, "routers", lambda: routers)
+
+    overhead = await prompt_overhead("вопрос", "справка")
+
+    for model in models:
+        tokenizer = tokenizers.for_model(model)
+        assert overhead >= prompts.get("chat_system").tokens(model) + await tokenizer.count_async("вопрос")
+
+
+@pytest.mark.asyncio
+async def test_history_packed_into_remaining_budget(monkeypatch):
+    """Test reserved prompt tokens shrink the history budget."""
+    monkeypatch.setattr(settings, "max_context_tokens", 100)
+    context = SmartContext(None)
+    context.chat_collection = FakeCollection()
+    context.summary_collection = None
+    context.cache = None
+    context.recall = None
+    for i in range(4):
+        context.chat_collection.docs.append({
+            "session_id": "s1", "user_message": f"q{i}", "ai_response": f"a{i}",
+            "tokens_user": 20, "tokens_ai": 20, "timestamp": datetime(2026, 1, 1, 0, i),
+            "cum_tokens": 40 * (i + 1),
+        })
+
+    assert len(await context.get_context("s1")) == 2
+    assert len(await context.get_context("s1", reserved_tokens=50)) == 1
@@ -0,0 +1,74 @@
+"""Tests for BM25 recall of relevant older turns."""
+import pytest
+from config.settings import settings
+from memory.recall import SessionRecall
+from memory.smart_context import SmartContext
+from tests.fake_mongo import FakeCollection
+from utils.bm25 import BM25Index, tokenize
+
+
+def test_tokenize_matches_inflected_forms():
+    """Test inflected Russian forms share a stem and stop words are dropped."""
+    assert tokenize("ресторана с бюджетом") == tokenize("ресторан бюджет")
+
+
+def test_bm25_ranks_rare_terms_higher():
+    """Test documents sharing a rare query term outrank common-term matches."""
+    index = BM25Index()
+    index.add(1, "нужен сайт для ресторана")
+    index.add(2, "нужен сайт")
+    index.add(3, "нужен сайт и бот")
+
+    assert [doc_id for doc_id, _ in index.search("сайт для рестораном", 3)][0] == 1
+    index.remove(1)
+    assert all(doc_id != 1 for doc_id, _ in index.search("ресторан", 3))
+
+
+@pytest.fixture
+def context(monkeypatch):
+    monkeypatch.setattr(settings, "max_history_messages", 3)
+    smart_context = SmartContext(None)
+    smart_context.chat_collection = FakeCollection()
+    smart_context.counter_collection = FakeCollection()
+    smart_context.summary_collection = None
+    smart_context.cache = None
+    smart_context.recall = SessionRecall(max_sessions=10, max_turns=50, ttl_seconds=60)
+    return smart_context
+
+
+async def save_dialogue(context, session_id):
+    await context.save_message(session_id, "У меня сеть ресторанов, бюджет около 300 тысяч", "Отлично!")
+    for i in range(5):
+        await context.save_message(session_id, f"Вопрос номер {i} про дизайн", f"Ответ {i}")
+
+
+@pytest.mark.asyncio
+async def test_relevant_older_turn_recalled(context):
+    """Test an old turn matching the message is added ahead of the recent window."""
+    await save_dialogue(context, "s1")
+
+    history = await context.get_context("s1", query="Какой сайт подойдёт моему ресторану?")
+
+    assert history[0]["user"].startswith("У меня сеть ресторанов")
+    assert [turn["user"] for turn in history[1:]] == [f"Вопрос номер {i} про дизайн" for i in (2, 3, 4)]
+
+
+@pytest.mark.asyncio
+async def test_no_recall_without_query_or_match(context):
+    """Test recall adds nothing without a query or without matching turns."""
+    await save_dialogue(context, "s2")
+
+    assert len(await context.get_context("s2")) == 3
+    assert len(await context.get_context("s2", query="Сколько стоит SEO-аудит?")) == 3
+
+
+@pytest.mark.asyncio
+async def test_index_grows_with_saved_turns(context):
+    """Test turns saved after the index was built become recallable."""
+    await context.get_context("s3", query="привет")
+    await save_dialogue(context, "s3")
+    context.chat_collection.docs.clear()
+
+    # The recent window comes back empty; the ресторан turn comes from the index
+    history = await context.get_context("s3", query="бюджет ресторана")
+    assert [turn["user"] for turn in history] == ["У меня сеть ресторанов, бюджет около 300 тысяч"]
@@ -0,0 +1,54 @@
+"""Tests for the exact-match response cache."""
+import pytest
+from httpx import AsyncClient
+from backend.main import app
+from config.settings import settings
+from utils.response_cache import ResponseCache, make_cache_key, normalize_message
+
+
+def test_normalize_message():
+    """Test trivial variations of a question normalize to the same text."""
+    assert normalize_message("  Сколько стоит   лендинг?? ") == "сколько стоит лендинг"
+    assert normalize_message("Ёлка") == "елка"
+
+
+def test_cache_key_depends_on_history_prompt_and_model():
+    """Test every key component changes the key."""
+    base = make_cache_key("Какие услуги?", [], "v1", "gpt-4o-mini")
+    assert base == make_cache_key("какие услуги", [], "v1", "gpt-4o-mini")
+    assert base != make_cache_key("какие услуги", [{"user": "a", "assistant": "b"}], "v1", "gpt-4o-mini")
+    assert base != make_cache_key("какие услуги", [], "v2", "gpt-4o-mini")
+    assert base != make_cache_key("какие услуги", [], "v1", "claude")
+
+
+@pytest.mark.asyncio
+async def test_cache_lru_eviction_and_ttl():
+    """Test LRU eviction order and TTL expiry."""
+    cache = ResponseCache(max_entries=2, ttl_seconds=60)
+    await cache.set("a", "1")
+    await cache.set("b", "2")
+    assert await cache.get("a") == "1"  # "a" becomes most recent
+    await cache.set("c", "3")
+
+    assert await cache.get("b") is None
+    assert await cache.get("a") == "1"
+
+    expired = ResponseCache(max_entries=2, ttl_seconds=-1)
+    await expired.set("a", "1")
+    assert await expired.get("a") is None
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(monkeypatch):
+    """Test metrics endpoint requires the token and exposes counters and histograms."""
+    monkeypatch.setattr(settings, "metrics_token", "secret")
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        anonymous = await client.get("/api/metrics")
+        wrong = await client.get("/api/metrics", headers={"Authorization": "Bearer nope"})
+        response = await client.get("/api/metrics", headers={"Authorization": "Bearer secret"})
+
+    assert anonymous.status_code == 401
+    assert wrong.status_code == 401
+    assert response.status_code == 200
+    data = response.json()
+    assert {"counters", "gauges", "histograms"} <= set(data)
@@ -0,0 +1,60 @@
+"""Tests for complexity-based model routing and reply caps."""
+import pytest
+from utils.ai_clients import OpenAIClient, estimate_cost
+from utils.ai_router import AIRouter
+from utils.metrics import metrics
+from utils.routing_policy import RICH_TIER, SIMPLE_TIER, ComplexityPolicy
+
+
+@pytest.fixture
+def policy():
+    return ComplexityPolicy(
+        simple=AIRouter(["openai:gpt-4o-mini"], tier=SIMPLE_TIER),
+        rich=AIRouter(["openai:gpt-4o"], tier=RICH_TIER),
+        max_words=25,
+        max_history=3,
+        simple_max_tokens=300,
+        rich_max_tokens=1000,
+    )
+
+
+def test_simple_turns_get_fast_model_and_short_cap(policy):
+    """Test greetings and short single questions go to the fast tier."""
+    decision = policy.decide("Привет!", [])
+    assert decision.tier == SIMPLE_TIER
+    assert decision.router.routes[0].model == "gpt-4o-mini"
+    assert decision.max_tokens == 300
+    assert policy.classify("Сколько стоит лендинг?", [{"user": "q", "assistant": "a"}]) == SIMPLE_TIER
+
+
+def test_rich_turns_get_larger_model(policy):
+    """Test long, multi-question, comparative or deep turns go to the default tier."""
+    long_message = " ".join(["слово"] * 30)
+    deep_history = [{"user": "q", "assistant": "a"}] * 4
+
+    assert policy.classify(long_message, []) == RICH_TIER
+    assert policy.classify("Сколько стоит? А сроки?", []) == RICH_TIER
+    assert policy.classify("Что выгоднее: сайт или чат-бот?", []) == RICH_TIER
+    assert policy.classify("А дальше?", deep_history) == RICH_TIER
+    assert policy.classify("А дальше?", [{"summary": "..."}]) == RICH_TIER
+    assert policy.decide(long_message, []).max_tokens == 1000
+
+
+def test_max_tokens_reaches_payload():
+    """Test the reply cap replaces the fixed max_tokens in provider payloads."""
+    client = OpenAIClient()
+    client.api_key = "test"
+    _, payload = client._build_request([{"role": "user", "content": "hi"}], "gpt-4o-mini", 300)
+    assert payload["max_tokens"] == 300
+
+
+def test_usage_records_estimated_cost():
+    """Test token usage is priced per model, the longest price prefix winning."""
+    assert estimate_cost("gpt-4o-mini", 1_000_000, 0) == pytest.approx(0.15)
+    assert estimate_cost("unknown-model", 1000, 1000) == 0.0
+
+    client = OpenAIClient()
+    before = metrics.get_counter("llm_cost_usd", provider="openai", model="gpt-4o")
+    client._record_usage("gpt-4o", input_tokens=1000, output_tokens=1000)
+    after = metrics.get_counter("llm_cost_usd", provider="openai", model="gpt-4o")
+    assert after - before == pytest.approx(0.0125)
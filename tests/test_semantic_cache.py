@@ -0,0 +1,45 @@
+"""Tests for the semantic response cache index."""
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from utils.semantic_cache import SemanticCache  # noqa: E402
+
+
+class FakeEmbedder:
+    """Embeds text as a normalized bag of characters."""
+
+    def embed(self, text):
+        vector = np.zeros(64, dtype=np.float32)
+        for char in text.lower():
+            vector[ord(char) % 64] += 1
+        return vector / np.linalg.norm(vector)
+
+
+@pytest.mark.asyncio
+async def test_semantic_cache_matches_near_duplicates():
+    """Test a reworded question above the threshold hits the cache."""
+    cache = SemanticCache(capacity=10, threshold=0.9, embedder=FakeEmbedder())
+    await cache.add("сколько стоит лендинг", "от 50 000 ₽")
+
+    answer, _ = await cache.lookup("сколько стоит лендинг?")
+    assert answer == "от 50 000 ₽"
+
+    answer, vector = await cache.lookup("нужен интернет-магазин под ключ")
+    assert answer is None
+    assert vector is not None
+
+
+@pytest.mark.asyncio
+async def test_semantic_cache_evicts_least_recently_used():
+    """Test capacity bound evicts the least recently used entry."""
+    cache = SemanticCache(capacity=2, threshold=0.99, embedder=FakeEmbedder())
+    await cache.add("aaaa", "1")
+    await cache.add("bbbb", "2")
+    assert (await cache.lookup("aaaa"))[0] == "1"
+
+    await cache.add("cccc", "3")
+
+    assert len(cache) == 2
+    assert (await cache.lookup("bbbb"))[0] is None
+    assert (await cache.lookup("aaaa"))[0] == "1"
@@ -0,0 +1,46 @@
+"""Tests for the one-document-per-session chat history layout."""
+import pytest
+from config.settings import settings
+from memory.smart_context import SESSION_STORAGE, SmartContext
+from tests.fake_mongo import FakeCollection
+
+
+@pytest.fixture
+def context(monkeypatch):
+    monkeypatch.setattr(settings, "chat_storage_mode", SESSION_STORAGE)
+    monkeypatch.setattr(settings, "session_max_turns", 3)
+    smart_context = SmartContext(None)
+    smart_context.chat_collection = FakeCollection()
+    smart_context.session_collection = FakeCollection()
+    smart_context.cache = None
+    return smart_context
+
+
+@pytest.mark.asyncio
+async def test_turns_pushed_into_capped_session_document(context):
+    """Test turns go into one capped session document with running totals."""
+    for i in range(5):
+        assert await context.save_message("s1", f"вопрос {i}", f"ответ {i}")
+
+    assert context.chat_collection.docs == []
+    [session] = context.session_collection.docs
+    assert session["_id"] == "s1"
+    assert [turn["user_message"] for turn in session["turns"]] == ["вопрос 2", "вопрос 3", "вопрос 4"]
+    assert session["turn_count"] == 5
+    assert session["total_tokens_user"] == 5 * context.tokenizer.count("вопрос 0")
+
+
+@pytest.mark.asyncio
+async def test_context_loaded_from_session_document(context):
+    """Test history comes from a single session lookup, oldest first."""
+    await context.save_message("s1", "первый", "ответ 1")
+    await context.save_message("s1", "второй", "ответ 2")
+
+    history = await context.get_context("s1")
+
+    assert history == [
+        {"user": "первый", "assistant": "ответ 1"},
+        {"user": "второй", "assistant": "ответ 2"},
+    ]
+    assert context.chat_collection.finds == 0
+    assert await context.get_context("unknown") == []
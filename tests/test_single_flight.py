@@ -0,0 +1,87 @@
+"""Tests for single-flight request coalescing."""
+import asyncio
+
+import pytest
+from utils.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_call():
+    """Test identical concurrent calls run the function once."""
+    flight = SingleFlight("test")
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "reply"
+
+    results = await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+
+    assert calls == 1
+    assert [r for r, _ in results] == ["reply"] * 5
+    assert sum(shared for _, shared in results) == 4
+    assert len(flight) == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_call_is_not_reused():
+    """Test an error reaches current waiters only; the next call starts fresh."""
+    flight = SingleFlight("test")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def succeed():
+        return "ok"
+
+    results = await asyncio.gather(
+        flight.do("key", fail), flight.do("key", fail), return_exceptions=True
+    )
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+    assert await flight.do("key", succeed) == ("ok", False)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_shared_call():
+    """Test the first caller leaving does not abort the call for others."""
+    flight = SingleFlight("test")
+    started = asyncio.Event()
+
+    async def work():
+        started.set()
+        await asyncio.sleep(0.02)
+        return "reply"
+
+    first = asyncio.create_task(flight.do("key", work))
+    await started.wait()
+    second = asyncio.create_task(flight.do("key", work))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == ("reply", True)
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+@pytest.mark.asyncio
+async def test_last_caller_leaving_cancels_call():
+    """Test the upstream call is cancelled once nobody waits for it."""
+    flight = SingleFlight("test")
+    cancelled = asyncio.Event()
+
+    async def work():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    caller = asyncio.create_task(flight.do("key", work))
+    await asyncio.sleep(0.01)
+    caller.cancel()
+    await asyncio.wait_for(cancelled.wait(), 1)
+    assert len(flight) == 0
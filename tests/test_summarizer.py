@@ -0,0 +1,122 @@
+"""Tests for incremental rolling conversation summaries."""
+import asyncio
+
+import pytest
+from config.settings import settings
+from memory.context_cache import SessionContextCache
+from memory.smart_context import SmartContext
+from memory.summarizer import ConversationSummarizer, summarizer
+from routes.chat import build_messages
+from utils.knowledge_base import KNOWLEDGE_HEADER
+from tests.fake_mongo import FakeCollection
+
+
+@pytest.fixture
+def context(monkeypatch):
+    prompts = []
+
+    async def generate(messages):
+        prompts.append(messages[-1]["content"])
+        return f"резюме #{len(prompts)}", "stub"
+
+    monkeypatch.setattr(summarizer, "_generate", generate)
+    monkeypatch.setattr(settings, "max_context_tokens", 100)
+    monkeypatch.setattr(settings, "summary_batch_turns", 2)
+    smart_context = SmartContext(None)
+    smart_context.chat_collection = FakeCollection()
+    smart_context.counter_collection = FakeCollection()
+    smart_context.summary_collection = FakeCollection()
+    smart_context.cache = SessionContextCache(max_bytes=100_000, ttl_seconds=60, max_turns=20)
+    smart_context.prompts = prompts
+    return smart_context
+
+
+async def save_turns(context, session_id, count, start=0):
+    for i in range(start, start + count):
+        # Long enough that only one turn fits the 100-token budget
+        await context.save_message(session_id, f"вопрос {i} " + "x" * 160, f"ответ {i} " + "y" * 60)
+        await asyncio.sleep(0.002)  # distinct millisecond timestamps
+
+
+@pytest.mark.asyncio
+async def test_evicted_turns_folded_into_summary(context):
+    """Test turns beyond the budget are summarized and returned first."""
+    await context.get_context("s1")
+    await save_turns(context, "s1", 4)
+
+    history = await context.get_context("s1")
+    await summarizer.drain()
+    assert len(context.prompts) == 1
+    assert all(f"вопрос {i} " in context.prompts[0] for i in range(3))
+    assert "вопрос 3 " not in context.prompts[0]
+    assert "summary" not in history[0]
+
+    history = await context.get_context("s1")
+    assert history[0] == {"summary": "резюме #1"}
+    assert [turn["user"].split()[1] for turn in history[1:]] == ["3"]
+
+
+@pytest.mark.asyncio
+async def test_evicted_turns_kept_until_folded(context, monkeypatch):
+    """Test turns evicted before a full batch stay in the history instead of vanishing."""
+    monkeypatch.setattr(settings, "max_context_tokens", 1000)
+    monkeypatch.setattr(settings, "max_history_messages", 3)
+    await context.get_context("s4")
+    for i in range(2):
+        await context.save_message("s4", f"вопрос {i}", f"ответ {i}")
+
+    history = await context.get_context("s4")
+    assert [turn["user"] for turn in history] == ["вопрос 0", "вопрос 1"]
+    assert context.prompts == []
+
+    await context.save_message("s4", "вопрос 2", "ответ 2")
+    await context.get_context("s4")
+    await summarizer.drain()
+    assert len(context.prompts) == 1
+    assert "вопрос 0" in context.prompts[0] and "вопрос 1" in context.prompts[0]
+
+
+@pytest.mark.asyncio
+async def test_summary_updated_incrementally(context):
+    """Test a later fold sends only the old summary and the new turns."""
+    await context.get_context("s2")
+    await save_turns(context, "s2", 4)
+    await context.get_context("s2")
+    await summarizer.drain()
+
+    await save_turns(context, "s2", 2, start=4)
+    await context.get_context("s2")
+    await summarizer.drain()
+
+    assert len(context.prompts) == 2
+    assert "резюме #1" in context.prompts[1]
+    assert "вопрос 2 " not in context.prompts[1]
+    assert "вопрос 4 " in context.prompts[1]
+    stored = await context.summary_collection.find_one({"_id": "s2"})
+    assert stored["summary"] == "резюме #2"
+    assert stored["turns_folded"] == 5
+
+
+def test_summary_goes_after_static_prompt():
+    """Test the summary follows the cacheable prompt and the catalog comes after the history."""
+    messages = build_messages([{"summary": "Клиент — пекарня"}, {"user": "a", "assistant": "b"}], "c")
+
+    assert messages[0]["content"].startswith("Ты — AI-консультант")
+    assert messages[1]["role"] == "system" and "пекарня" in messages[1]["content"]
+    assert [m["role"] for m in messages[2:4]] == ["user", "assistant"]
+    assert messages[4]["content"].startswith(KNOWLEDGE_HEADER)
+    assert messages[5] == {"role": "user", "content": "c"}
+
+
+@pytest.mark.asyncio
+async def test_failed_fold_keeps_previous_summary():
+    """Test an LLM failure leaves the stored summary untouched."""
+    async def broken(messages):
+        raise RuntimeError("provider down")
+
+    collection = FakeCollection()
+    result = await ConversationSummarizer(broken).fold(
+        collection, "s3", {"summary": "", "summarized_until": None}, [{"user_message": "a", "ai_response": "b", "timestamp": 1}]
+    )
+    assert result is None
+    assert collection.docs == []
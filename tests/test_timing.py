@@ -0,0 +1,42 @@
+"""Tests for per-request phase timers and the Server-Timing header."""
+import pytest
+from httpx import AsyncClient
+from backend.main import app
+from utils.timing import mark_first_byte, phase, request_timing
+
+
+def test_phases_accumulate_into_header():
+    """Test repeated phases add up and the header lists them with the total."""
+    with request_timing() as timing:
+        with phase("db_save"):
+            pass
+        with phase("db_save"):
+            pass
+        with phase("llm"):
+            mark_first_byte()
+            mark_first_byte()
+
+    assert list(timing.fields()) == ["db_save", "llm_ttfb", "llm", "total"]
+    assert timing.header().startswith("db_save;dur=")
+    assert "total;dur=" in timing.header()
+
+
+def test_phase_without_request_is_noop():
+    """Test code outside a request runs untimed."""
+    with phase("context"):
+        mark_first_byte()
+
+
+@pytest.mark.asyncio
+async def test_chat_response_has_server_timing():
+    """Test the chat endpoint reports its phases in the Server-Timing header."""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post("/api/chat", json={
+            "session_id": "test_session_timing",
+            "message": "Сколько стоит лендинг?",
+        })
+
+    header = response.headers["server-timing"]
+    assert "tokens;dur=" in header
+    assert "db_save;dur=" in header
+    assert header.split(", ")[-1].startswith("total;dur=")
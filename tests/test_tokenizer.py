@@ -0,0 +1,133 @@
+"""Tests for the process-wide tokenizer."""
+import threading
+
+import pytest
+from config.settings import settings
+from memory.smart_context import SmartContext
+from memory.tokenizer import EstimatedTokenizer, Tokenizer, TokenizerRegistry, missing_bundled_encodings
+
+
+class FakeEncoding:
+    def __init__(self):
+        self.threads = []
+
+    def encode(self, text):
+        self.threads.append(threading.current_thread().name)
+        return text.split()
+
+
+@pytest.fixture
+def fake_tiktoken(monkeypatch):
+    import tiktoken
+    loads = []
+
+    def get_encoding(name):
+        loads.append(name)
+        return FakeEncoding()
+
+    monkeypatch.setattr(tiktoken, "get_encoding", get_encoding)
+    return loads
+
+
+@pytest.mark.asyncio
+async def test_encoding_loaded_once(fake_tiktoken):
+    """Test warm-up loads the encoding once and requests reuse it."""
+    tokenizer = Tokenizer(offload_chars=100)
+    await tokenizer.warm_up()
+    await tokenizer.warm_up()
+
+    assert fake_tiktoken == ["cl100k_base"]
+    assert await tokenizer.count_async("два слова") == 2
+    SmartContext(None)
+    assert fake_tiktoken == ["cl100k_base"]
+
+
+@pytest.mark.asyncio
+async def test_large_texts_counted_off_the_event_loop(fake_tiktoken):
+    """Test texts over the threshold are encoded on the worker pool."""
+    tokenizer = Tokenizer(offload_chars=10)
+    await tokenizer.warm_up()
+    encoding = tokenizer._encoding
+    encoding.threads.clear()
+
+    assert await tokenizer.count_async("short") == 1
+    assert await tokenizer.count_async("a much longer text here") == 5
+    assert encoding.threads[0] == threading.current_thread().name
+    assert encoding.threads[1].startswith("tokenizer")
+
+
+def test_sync_count_never_waits_for_load(monkeypatch):
+    """Test counting before the encoding is loaded estimates and loads in the background."""
+    import tiktoken
+    release = threading.Event()
+
+    def slow(name):
+        release.wait(5)
+        return FakeEncoding()
+
+    monkeypatch.setattr(tiktoken, "get_encoding", slow)
+    registry = TokenizerRegistry(offload_chars=100, cache_size=10, ratios={})
+    tokenizer = registry.for_model(None)
+
+    assert tokenizer.count("x" * 40) == 10
+    assert not tokenizer.loaded and len(registry.cache) == 0
+    release.set()
+    tokenizer._load_future.result(5)
+    assert tokenizer.count("x" * 40) == 1
+
+
+def test_fallback_without_encoding(monkeypatch):
+    """Test a failed load falls back to the character estimate."""
+    import tiktoken
+
+    def broken(name):
+        raise OSError("offline")
+
+    monkeypatch.setattr(tiktoken, "get_encoding", broken)
+    tokenizer = Tokenizer()
+    tokenizer.load()
+    assert tokenizer.count("x" * 40) == 10
+
+
+def test_registry_maps_models_to_encodings(fake_tiktoken):
+    """Test OpenAI models get their encoding and others a calibrated estimate."""
+    registry = TokenizerRegistry(offload_chars=100, cache_size=10, ratios={"claude": 1.5})
+
+    assert registry.for_model("gpt-4o-mini").encoding_name == "o200k_base"
+    assert registry.for_model("gpt-4").encoding_name == "cl100k_base"
+    assert registry.for_model("gpt-4o-mini") is registry.for_model("gpt-4o")
+
+    claude = registry.for_model("claude-3-5-haiku-latest")
+    assert isinstance(claude, EstimatedTokenizer)
+    claude.load()
+    assert claude.count("one two three four") == 6
+    assert registry.for_model("gemini-1.5-flash").name == "gemini~o200k_base"
+    assert registry.for_model("llama-3").encoding_name == "cl100k_base"
+
+
+def test_counts_cached_per_text_and_encoding(fake_tiktoken):
+    """Test repeated texts are encoded once per encoding."""
+    registry = TokenizerRegistry(offload_chars=100, cache_size=10, ratios={})
+    gpt4o = registry.for_model("gpt-4o-mini")
+    gpt4 = registry.for_model("gpt-4")
+    gpt4o.load()
+    gpt4.load()
+
+    assert gpt4o.count("привет мир") == 2
+    assert gpt4o.count("привет мир") == 2
+    assert gpt4.count("привет мир") == 2
+
+    assert len(gpt4o._encoding.threads) == 1
+    assert len(registry.cache) == 2
+
+
+@pytest.mark.asyncio
+async def test_missing_bundled_encodings_fail_when_required(monkeypatch, tmp_path):
+    """Test warm-up refuses to download encodings when bundled files are required."""
+    monkeypatch.setattr(settings, "tokenizer_encodings_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "tokenizer_require_bundled", True)
+    registry = TokenizerRegistry(offload_chars=100, cache_size=10, ratios={})
+
+    assert missing_bundled_encodings() == ["o200k_base", "cl100k_base"]
+    with pytest.raises(RuntimeError, match="o200k_base, cl100k_base"):
+        await registry.warm_up(["gpt-4o-mini"])
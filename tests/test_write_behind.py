@@ -0,0 +1,256 @@
+"""Tests for the write-behind chat persistence buffer."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from pymongo.errors import BulkWriteError
+import memory.write_behind as write_behind
+from config.settings import settings
+from memory.context_cache import SessionContextCache
+from memory.smart_context import SESSION_STORAGE, SmartContext
+from memory.write_behind import ChatWriteBehind
+from tests.fake_mongo import FakeCollection
+
+
+class RecordingCollection(FakeCollection):
+    """Counts bulk inserts and fails the first ``failures`` of them."""
+
+    def __init__(self, failures=0, error=None):
+        super().__init__()
+        self.failures = failures
+        self.error = error or ConnectionError("mongo unavailable")
+        self.batches = []
+
+    async def insert_many(self, documents, ordered=True):
+        if self.failures:
+            self.failures -= 1
+            raise self.error
+        self.batches.append(len(documents))
+        await super().insert_many(documents, ordered)
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(write_behind, "RETRY_BASE_DELAY", 0)
+
+
+def make_writer(tmp_path, **overrides):
+    options = dict(batch_size=10, flush_interval=60, max_pending=100, max_retries=2,
+                   spill_path=str(tmp_path / "spill.jsonl"))
+    options.update(overrides)
+    return ChatWriteBehind(**options)
+
+
+def fake_db(chat_messages):
+    return SimpleNamespace(chat_messages=chat_messages, chat_token_counters=FakeCollection())
+
+
+def make_context(collection, writer, cache=None):
+    smart_context = SmartContext(None)
+    smart_context.chat_collection = collection
+    smart_context.counter_collection = FakeCollection()
+    smart_context.cache = cache
+    smart_context.writer = writer
+    return smart_context
+
+
+@pytest.mark.asyncio
+async def test_turns_written_in_one_batch_and_readable_before_flush(tmp_path):
+    """Test queued turns are read back before the flush and inserted together."""
+    collection = RecordingCollection()
+    db = fake_db(collection)
+    writer = make_writer(tmp_path)
+    await writer.start(db)
+    context = make_context(collection, writer)
+
+    for i in range(3):
+        assert await context.save_message("s1", f"вопрос {i}", f"ответ {i}")
+
+    assert collection.docs == []
+    assert collection.finds == 0 and db.chat_token_counters.docs == []
+    history = await context.get_context("s1")
+    assert [turn["user"] for turn in history] == ["вопрос 0", "вопрос 1", "вопрос 2"]
+
+    await writer.stop()
+    assert collection.batches == [3]
+    cum = [doc["cum_tokens"] for doc in collection.docs]
+    assert cum == sorted(cum) and cum[0] > 0
+    assert db.chat_token_counters.docs[0]["cum_tokens"] == cum[-1]
+
+
+@pytest.mark.asyncio
+async def test_cached_session_served_while_pending(tmp_path):
+    """Test a cached session sees its queued turn without reading MongoDB."""
+    collection = RecordingCollection()
+    writer = make_writer(tmp_path)
+    await writer.start(fake_db(collection))
+    context = make_context(collection, writer, SessionContextCache(10_000, 60, 20))
+
+    await context.get_context("s1")
+    await context.save_message("s1", "Привет", "Здравствуйте!")
+    collection.finds = 0
+
+    assert await context.get_context("s1") == [{"user": "Привет", "assistant": "Здравствуйте!"}]
+    assert collection.finds == 0
+    await writer.stop()
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_retried(tmp_path):
+    """Test a transient failure is retried without losing or duplicating turns."""
+    collection = RecordingCollection(failures=1)
+    writer = make_writer(tmp_path)
+    await writer.start(fake_db(collection))
+    context = make_context(collection, writer)
+
+    await context.save_message("s1", "a", "b")
+    await writer.flush()
+
+    assert len(collection.docs) == 1
+    await writer.stop()
+
+
+@pytest.mark.asyncio
+async def test_duplicate_key_skipped_on_retry(tmp_path):
+    """Test a turn stored by an attempt whose reply was lost is not retried."""
+    error = BulkWriteError({"writeErrors": [{"index": 0, "code": 11000, "errmsg": "dup"}]})
+    collection = RecordingCollection(failures=1, error=error)
+    writer = make_writer(tmp_path)
+    await writer.start(fake_db(collection))
+    context = make_context(collection, writer)
+
+    await context.save_message("s1", "a", "b")
+    await context.save_message("s1", "c", "d")
+    await writer.flush()
+
+    assert [doc["user_message"] for doc in collection.docs] == ["c"]
+    await writer.stop()
+
+
+class ReplyLostCollection(FakeCollection):
+    """Applies the first bulk write but raises as if its reply was lost."""
+
+    def __init__(self):
+        super().__init__()
+        self.lost = 1
+
+    async def bulk_write(self, requests, ordered=True):
+        await super().bulk_write(requests, ordered)
+        if self.lost:
+            self.lost -= 1
+            raise ConnectionError("connection reset")
+
+
+@pytest.mark.asyncio
+async def test_session_upsert_retry_not_duplicated(tmp_path, monkeypatch):
+    """Test retrying a session upsert whose reply was lost does not push the turn twice."""
+    monkeypatch.setattr(settings, "chat_storage_mode", SESSION_STORAGE)
+    sessions = ReplyLostCollection()
+    writer = make_writer(tmp_path)
+    await writer.start(SimpleNamespace(chat_sessions=sessions))
+    context = make_context(FakeCollection(), writer)
+    context.session_collection = sessions
+
+    await context.save_message("s1", "a", "b")
+    await context.save_message("s1", "c", "d")
+    await writer.flush()
+
+    [session] = sessions.docs
+    assert [turn["user_message"] for turn in session["turns"]] == ["a", "c"]
+    assert sessions.lost == 0
+    await writer.stop()
+
+
+@pytest.mark.asyncio
+async def test_unwritable_turns_spilled_and_replayed(tmp_path):
+    """Test turns that keep failing go to the spill file and are replayed on start."""
+    down = RecordingCollection(failures=10)
+    writer = make_writer(tmp_path)
+    await writer.start(fake_db(down))
+    await make_context(down, writer).save_message("s1", "Привет", "Здравствуйте!")
+    await writer.stop()
+
+    spill = tmp_path / "spill.jsonl"
+    assert down.docs == []
+    assert len(spill.read_text(encoding="utf-8").splitlines()) == 1
+
+    up = RecordingCollection()
+    restarted = make_writer(tmp_path)
+    await restarted.start(fake_db(up))
+
+    assert [doc["user_message"] for doc in up.docs] == ["Привет"]
+    assert up.docs[0]["timestamp"].tzinfo is None
+    assert not spill.exists()
+    await restarted.stop()
+
+
+@pytest.mark.asyncio
+async def test_overflow_spills_to_disk(tmp_path):
+    """Test writes beyond max_pending go straight to the spill file."""
+    collection = RecordingCollection()
+    writer = make_writer(tmp_path, max_pending=1)
+    await writer.start(fake_db(collection))
+    context = make_context(collection, writer)
+
+    await context.save_message("s1", "a", "b")
+    await context.save_message("s1", "c", "d")
+    await writer.stop()
+
+    assert len((tmp_path / "spill.jsonl").read_text(encoding="utf-8").splitlines()) == 1
+    assert [doc["user_message"] for doc in collection.docs] == ["a"]
+
+
+@pytest.mark.asyncio
+async def test_replay_skips_unparsable_lines(tmp_path):
+    """Test a corrupt spill line is skipped and the rest is replayed."""
+    down = RecordingCollection(failures=10)
+    writer = make_writer(tmp_path)
+    await writer.start(fake_db(down))
+    await make_context(down, writer).save_message("s1", "Привет", "Здравствуйте!")
+    await writer.stop()
+    spill = tmp_path / "spill.jsonl"
+    spill.write_text('{"session_id": "s1", "turn": \n' + spill.read_text(encoding="utf-8"), encoding="utf-8")
+
+    up = RecordingCollection()
+    restarted = make_writer(tmp_path)
+    await restarted.start(fake_db(up))
+
+    assert [doc["user_message"] for doc in up.docs] == ["Привет"]
+    assert list(tmp_path.iterdir()) == []
+    await restarted.stop()
+
+
+@pytest.mark.asyncio
+async def test_spill_replayed_by_one_worker(tmp_path):
+    """Test workers sharing a spill file replay each write exactly once."""
+    down = RecordingCollection(failures=10)
+    writer = make_writer(tmp_path)
+    await writer.start(fake_db(down))
+    await make_context(down, writer).save_message("s1", "Привет", "Здравствуйте!")
+    await writer.stop()
+
+    up = RecordingCollection()
+    workers = [make_writer(tmp_path) for _ in range(3)]
+    await asyncio.gather(*(worker.start(fake_db(up)) for worker in workers))
+
+    assert [doc["user_message"] for doc in up.docs] == ["Привет"]
+    for worker in workers:
+        await worker.stop()
+
+
+@pytest.mark.asyncio
+async def test_spill_without_file_locks(tmp_path, monkeypatch):
+    """Test spilling and replaying still work where fcntl is unavailable."""
+    monkeypatch.setattr(write_behind, "fcntl", None)
+    down = RecordingCollection(failures=10)
+    writer = make_writer(tmp_path)
+    await writer.start(fake_db(down))
+    await make_context(down, writer).save_message("s1", "Привет", "Здравствуйте!")
+    await writer.stop()
+
+    up = RecordingCollection()
+    restarted = make_writer(tmp_path)
+    await restarted.start(fake_db(up))
+
+    assert [doc["user_message"] for doc in up.docs] == ["Привет"]
+    await restarted.stop()